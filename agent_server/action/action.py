@@ -7,15 +7,34 @@ action triggers, parameters, and responses.
 from typing import Dict, List, Optional, Any, Union
 import asyncio
 
+from agent_server.metrics.metrics import REGISTRY, ERRORS, timed
+from agent_server.tracing.tracing import traced
+from agent_server.simulation.simulation import LatencyProfile, SimulatedFailure
+
+ACTION_LATENCY = REGISTRY.histogram("agent_action_execute_seconds", "Latency of Action.execute")
+ACTION_ERRORS = ERRORS.labels("action")
+
 class Action:
     """
     Action class for handling action triggers and execution.
     """
     
-    def __init__(self):
-        """Initialize the action module"""
+    def __init__(self, store=None, worker_id: Optional[str] = None, latency: Optional[LatencyProfile] = None):
+        """
+        Initialize the action module
+        
+        Args:
+            store: Optional shared SQLiteStateStore; when given, the action
+                history is shared across worker processes
+            worker_id: Identifier of this worker process
+            latency: Latency profile simulating actions without a registered
+                handler (0.5 s per action by default)
+        """
         self.registered_actions = {}
         self.action_history = []
+        self.store = store
+        self.worker_id = worker_id
+        self.latency = latency or LatencyProfile()
     
     def register_action(self, trigger: str, handler) -> bool:
         """
@@ -31,6 +50,8 @@ class Action:
         self.registered_actions[trigger] = handler
         return True
     
+    @timed(ACTION_LATENCY, errors=ACTION_ERRORS)
+    @traced("action.execute")
     async def execute(self, action: Dict[str, Any]) -> Dict[str, Any]:
         """
         Execute an action.
@@ -66,11 +87,12 @@ class Action:
                     "response": response,
                     "status": "success"
                 }
-                self.action_history.append(action_record)
+                await self._record(action_record)
                 
                 return response
             except Exception as e:
                 # Handle error
+                ACTION_ERRORS.inc()
                 error_response = {"status": "error", "message": str(e)}
                 
                 # Record the action in history
@@ -82,12 +104,26 @@ class Action:
                     "error": str(e),
                     "status": "failed"
                 }
-                self.action_history.append(action_record)
+                await self._record(action_record)
                 
                 return error_response
         else:
             # Default action handling
-            await asyncio.sleep(0.5)  # Simulate work
+            try:
+                await self.latency.run_trigger(trigger)  # Simulate work
+            except SimulatedFailure as e:
+                ACTION_ERRORS.inc()
+                action_record = {
+                    "trigger": trigger,
+                    "task": task,
+                    "parameters": parameters,
+                    "response": None,
+                    "error": str(e),
+                    "status": "failed"
+                }
+                await self._record(action_record)
+                
+                return {"status": "error", "message": str(e)}
             
             # Create a mock response
             response = {
@@ -105,7 +141,7 @@ class Action:
                 "response": response,
                 "status": "success"
             }
-            self.action_history.append(action_record)
+            await self._record(action_record)
             
             return response
     
@@ -119,4 +155,12 @@ class Action:
         Returns:
             List of action execution records
         """
-        return self.action_history[-limit:] if limit else self.action_history.copy() 
\ No newline at end of file
+        if self.store is not None:
+            return self.store.action_history(limit)
+        return self.action_history[-limit:] if limit else self.action_history.copy()
+    
+    async def _record(self, action_record: Dict[str, Any]) -> None:
+        """Record an executed action in the history"""
+        self.action_history.append(action_record)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.append_action, action_record, self.worker_id) 
\ No newline at end of file
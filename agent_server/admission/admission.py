@@ -0,0 +1,496 @@
+"""
+Admission Module
+
+This module is responsible for bounding the work each tenant can push into the
+agent server:
+
+- a token bucket per tenant limits the request rate of /execute and /research
+- a concurrency quota per tenant limits its in-flight workflows and research
+  requests; requests over either limit are rejected (HTTP 429 with Retry-After)
+- a weighted fair scheduler hands out the process-wide execution slots, so
+  when workflows queue for a slot, tenants are served in proportion to their
+  weights instead of in arrival order
+
+Tenant policies come from the AGENT_SERVER_TENANTS environment variable, a JSON
+object mapping tenant names to policy settings, e.g.
+
+    {"default": {"rate": 20, "burst": 40, "max_concurrent": 16},
+     "acme": {"rate": 100, "burst": 200, "max_concurrent": 64, "weight": 4}}
+
+Tenants without an entry use the "default" policy; settings left out are
+unlimited (weight 1). Quotas and buckets are enforced per worker process.
+
+Tenant IDs come from request headers, so tenants without an entry are not
+given their own metric series: they are reported under the "default" tenant.
+They are still scheduled in a lane of their own (with the default weight),
+whose state is dropped as soon as it has nothing queued or running. Their
+rate buckets are dropped once idle (refilled), and past max_tenants tracked
+buckets further unknown tenants share the default tenant's bucket.
+"""
+from typing import Dict, List, Optional, Any, AsyncIterator, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import heapq
+import json
+import math
+import os
+import time
+
+from agent_server.metrics.metrics import REGISTRY
+
+DEFAULT_TENANT = "default"
+
+# Longest Retry-After (seconds) suggested in a rejection
+MAX_RETRY_AFTER = 3600.0
+
+# Rate buckets tracked before idle ones are evicted (and unknown tenants share one)
+MAX_TENANTS = 10000
+
+# Seconds between sweeps of idle rate buckets
+EVICT_INTERVAL = 60.0
+
+ADMISSIONS = REGISTRY.counter("agent_admission_total", "Admission decisions, by tenant and outcome", ["tenant", "outcome"])
+TENANT_IN_FLIGHT = REGISTRY.gauge("agent_tenant_in_flight", "Admitted requests not finished yet, by tenant", ["tenant"])
+TENANT_UTILIZATION = REGISTRY.gauge("agent_tenant_utilization", "In-flight requests as a fraction of the tenant's quota", ["tenant"])
+TENANT_RUNNING = REGISTRY.gauge("agent_tenant_running", "Workflows holding an execution slot, by tenant", ["tenant"])
+TENANT_QUEUED = REGISTRY.gauge("agent_tenant_queued", "Workflows waiting for an execution slot, by tenant", ["tenant"])
+SCHEDULER_WAIT = REGISTRY.histogram("agent_scheduler_wait_seconds", "Time workflows waited for an execution slot", ["tenant"])
+
+
+class TenantPolicy:
+    """
+    Limits and scheduling weight of a tenant.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_concurrent: Optional[int] = None,
+        weight: float = 1.0
+    ):
+        """
+        Initialize the tenant policy.
+
+        Args:
+            rate: Sustained requests per second (None for no rate limit)
+            burst: Token bucket capacity, i.e. requests accepted at once after
+                idling (defaults to one second's worth of rate)
+            max_concurrent: Maximum in-flight workflows/research requests
+                (None for no quota)
+            weight: Share of the execution slots under contention
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else (max(1, int(rate)) if rate is not None else None)
+        self.max_concurrent = max_concurrent
+        self.weight = weight
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], base: Optional["TenantPolicy"] = None) -> "TenantPolicy":
+        """
+        Build a policy from a plain dict.
+
+        Args:
+            data: Dict with any of the constructor's keyword arguments
+            base: Policy providing the values missing from data
+
+        Returns:
+            The corresponding TenantPolicy
+        """
+        base = base or cls()
+        data = data or {}
+        return cls(
+            rate=data.get("rate", base.rate),
+            burst=data.get("burst", base.burst if "rate" not in data else None),
+            max_concurrent=data.get("max_concurrent", base.max_concurrent),
+            weight=float(data.get("weight", base.weight))
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict representation of the policy"""
+        return {"rate": self.rate, "burst": self.burst, "max_concurrent": self.max_concurrent, "weight": self.weight}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, now: Optional[float] = None) -> float:
+        """
+        Take a token if one is available.
+
+        Args:
+            now: Current monotonic time (defaults to time.monotonic())
+
+        Returns:
+            0.0 if a token was taken, otherwise the seconds until one is available
+        """
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (1.0 - self.tokens) / self.rate
+
+    def give_back(self) -> None:
+        """Return a token taken by a request that was rejected for another reason"""
+        self.tokens = min(self.capacity, self.tokens + 1.0)
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has refilled completely (dropping it changes nothing)"""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class AdmissionRejected(Exception):
+    """Raised when a tenant's request is over its rate or concurrency limit"""
+
+    def __init__(self, tenant: str, reason: str, retry_after: float, message: str):
+        super().__init__(message)
+        self.tenant = tenant
+        self.reason = reason
+        # Capped so a zero-rate policy still yields a usable Retry-After
+        self.retry_after = min(retry_after, MAX_RETRY_AFTER)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Body of the rejection response"""
+        return {
+            "error": self.reason,
+            "tenant": self.tenant,
+            "retry_after": round(self.retry_after, 3),
+            "message": str(self)
+        }
+
+
+class FairScheduler:
+    """
+    FairScheduler class handing out a fixed number of execution slots with
+    weighted fair queuing across tenants.
+
+    Waiting workflows are tagged with a virtual finish time
+    max(virtual_time, tenant's last tag) + 1 / weight and served in tag order,
+    so a tenant with weight 2 gets twice the slots of a tenant with weight 1
+    while both have work queued, and a tenant that queued nothing for a while
+    does not build up credit.
+
+    Every tenant gets its own lane, while metrics are reported under a label
+    that may be shared by several tenants. A lane's state is dropped as soon
+    as it has nothing queued or running, so it is bounded by the work in
+    progress rather than by the number of tenant IDs ever seen.
+    """
+
+    def __init__(self, capacity: Optional[int], weights: Dict[str, float], default_weight: float = 1.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            capacity: Number of workflows executing at once (None for unlimited)
+            weights: Weight per tenant
+            default_weight: Weight of the tenants missing from weights
+        """
+        self.capacity = capacity
+        self.weights = weights
+        self.default_weight = default_weight
+        self.running = 0
+        self.virtual_time = 0.0
+        self.last_tags: Dict[str, float] = {}
+        self.waiting: List[Tuple[float, int, str, asyncio.Future]] = []
+        # Per tenant (entries are dropped at zero) and per metric label
+        self.running_by_tenant: Dict[str, int] = {}
+        self.queued_by_tenant: Dict[str, int] = {}
+        self.running_by_label: Dict[str, int] = {}
+        self.queued_by_label: Dict[str, int] = {}
+        self._sequence = 0
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, label: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Hold an execution slot for the duration of the block.
+
+        Args:
+            tenant: The tenant the work belongs to (its scheduling lane)
+            label: The tenant's metric label (defaults to the tenant)
+        """
+        label = label or tenant
+        # Live waiters only exist while every slot is taken
+        if self.capacity is not None and self.running >= self.capacity:
+            await self._wait(tenant, label)
+        else:
+            self.running += 1
+
+        self._adjust(self.running_by_tenant, self.running_by_label, TENANT_RUNNING, tenant, label, 1)
+        try:
+            yield
+        finally:
+            self._adjust(self.running_by_tenant, self.running_by_label, TENANT_RUNNING, tenant, label, -1)
+            self._release()
+
+    async def _wait(self, tenant: str, label: str) -> None:
+        """Queue for a slot; the releasing workflow hands its slot over directly"""
+        weight = self.weights.get(tenant, self.default_weight)
+        tag = max(self.virtual_time, self.last_tags.get(tenant, 0.0)) + 1.0 / weight
+        self.last_tags[tenant] = tag
+        self._sequence += 1
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (tag, self._sequence, tenant, future))
+
+        self._adjust(self.queued_by_tenant, self.queued_by_label, TENANT_QUEUED, tenant, label, 1)
+        started = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self._release()
+            raise
+        finally:
+            self._adjust(self.queued_by_tenant, self.queued_by_label, TENANT_QUEUED, tenant, label, -1)
+            if tenant not in self.queued_by_tenant:
+                # Nothing queued: every tag of the lane was served (or
+                # cancelled), so the lane restarts from virtual_time anyway
+                self.last_tags.pop(tenant, None)
+            SCHEDULER_WAIT.labels(label).observe(time.perf_counter() - started)
+
+    def _release(self) -> None:
+        """Hand a freed slot to the waiter with the smallest tag, or free it"""
+        while self.waiting:
+            tag, _, _, future = heapq.heappop(self.waiting)
+            if future.cancelled():
+                continue
+            self.virtual_time = max(self.virtual_time, tag)
+            future.set_result(None)
+            return
+        self.running -= 1
+
+    def _adjust(self, counts: Dict[str, int], label_counts: Dict[str, int], gauge: Any, tenant: str, label: str, delta: int) -> None:
+        count = counts.get(tenant, 0) + delta
+        if count > 0:
+            counts[tenant] = count
+        else:
+            counts.pop(tenant, None)
+        label_counts[label] = label_counts.get(label, 0) + delta
+        gauge.labels(label).set(label_counts[label])
+
+
+class AdmissionController:
+    """
+    AdmissionController class applying per-tenant rate limits and concurrency
+    quotas, and owning the fair scheduler of execution slots.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, TenantPolicy]] = None,
+        default_policy: Optional[TenantPolicy] = None,
+        capacity: Optional[int] = None,
+        max_tenants: int = MAX_TENANTS
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            policies: Policy per tenant
+            default_policy: Policy of tenants without an entry
+            capacity: Workflows executing at once across tenants (None for unlimited)
+            max_tenants: Rate buckets tracked at most; beyond it, unknown
+                tenants share the default tenant's bucket
+        """
+        self.default_policy = default_policy or TenantPolicy()
+        self.policies = policies or {}
+        self.max_tenants = max_tenants
+        self.buckets: Dict[str, TokenBucket] = {}
+        # Requests in flight per tenant (entries are dropped at zero) and per metric label
+        self.in_flight: Dict[str, int] = {}
+        self.label_in_flight: Dict[str, int] = {}
+        self.scheduler = FairScheduler(
+            capacity, {name: policy.weight for name, policy in self.policies.items()}, self.default_policy.weight
+        )
+        self._next_eviction = time.monotonic() + EVICT_INTERVAL
+
+        for label in [DEFAULT_TENANT, *self.policies]:
+            TENANT_UTILIZATION.labels(label).set_function(lambda label=label: self.label_utilization(label))
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """
+        Build a controller from AGENT_SERVER_TENANTS (tenant policies as JSON)
+        and AGENT_SERVER_MAX_RUNNING (execution slots; unlimited when unset).
+
+        Returns:
+            The configured controller
+        """
+        data = json.loads(os.environ.get("AGENT_SERVER_TENANTS") or "{}")
+        default_policy = TenantPolicy.from_dict(data.get(DEFAULT_TENANT))
+        policies = {
+            name: TenantPolicy.from_dict(settings, base=default_policy)
+            for name, settings in data.items() if name != DEFAULT_TENANT
+        }
+        capacity = os.environ.get("AGENT_SERVER_MAX_RUNNING")
+        return cls(policies, default_policy, int(capacity) if capacity else None)
+
+    def policy(self, tenant: str) -> TenantPolicy:
+        """Get the policy of a tenant"""
+        return self.policies.get(tenant, self.default_policy)
+
+    def label(self, tenant: str) -> str:
+        """Get the metric label of a tenant (unknown tenants share the default one)"""
+        return tenant if tenant in self.policies else DEFAULT_TENANT
+
+    def admit(self, tenant: str) -> None:
+        """
+        Admit one request of a tenant, reserving a unit of its concurrency
+        quota until release() is called.
+
+        Args:
+            tenant: The tenant
+
+        Raises:
+            AdmissionRejected: If the tenant is over its rate or concurrency limit
+        """
+        policy = self.policy(tenant)
+        label = self.label(tenant)
+        bucket = self._bucket(tenant, policy) if policy.rate is not None else None
+
+        wait = bucket.try_acquire() if bucket is not None else 0.0
+        if wait > 0:
+            ADMISSIONS.labels(label, "rate_limited").inc()
+            raise AdmissionRejected(
+                tenant, "rate_limited", wait,
+                f"Tenant {tenant} exceeded its rate of {policy.rate} requests/s (burst {policy.burst})"
+            )
+
+        if policy.max_concurrent is not None and self.in_flight.get(tenant, 0) >= policy.max_concurrent:
+            if bucket is not None:
+                bucket.give_back()
+            ADMISSIONS.labels(label, "quota_exceeded").inc()
+            raise AdmissionRejected(
+                tenant, "quota_exceeded", 1.0,
+                f"Tenant {tenant} already has {policy.max_concurrent} requests in flight"
+            )
+
+        ADMISSIONS.labels(label, "admitted").inc()
+        self.in_flight[tenant] = self.in_flight.get(tenant, 0) + 1
+        self.label_in_flight[label] = self.label_in_flight.get(label, 0) + 1
+        TENANT_IN_FLIGHT.labels(label).set(self.label_in_flight[label])
+
+    def release(self, tenant: str) -> None:
+        """
+        Release the quota reserved by admit().
+
+        Args:
+            tenant: The tenant
+        """
+        label = self.label(tenant)
+        if self.in_flight.get(tenant, 0) <= 1:
+            self.in_flight.pop(tenant, None)
+        else:
+            self.in_flight[tenant] -= 1
+        self.label_in_flight[label] = max(0, self.label_in_flight.get(label, 0) - 1)
+        TENANT_IN_FLIGHT.labels(label).set(self.label_in_flight[label])
+
+    def _bucket(self, tenant: str, policy: TenantPolicy) -> TokenBucket:
+        """Get (creating if needed) the rate bucket of a tenant, evicting idle buckets periodically"""
+        bucket = self.buckets.get(tenant)
+        if bucket is not None:
+            return bucket
+
+        now = time.monotonic()
+        if now >= self._next_eviction or len(self.buckets) >= self.max_tenants:
+            self.evict_idle(now)
+        if len(self.buckets) >= self.max_tenants and tenant not in self.policies:
+            # Too many tenants tracked: unknown ones share the default bucket
+            tenant = DEFAULT_TENANT
+            bucket = self.buckets.get(tenant)
+            if bucket is not None:
+                return bucket
+        bucket = self.buckets[tenant] = TokenBucket(policy.rate, policy.burst)
+        return bucket
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Drop the rate buckets that refilled completely (a new bucket would be identical).
+
+        Args:
+            now: Current monotonic time (defaults to time.monotonic())
+
+        Returns:
+            The number of buckets dropped
+        """
+        now = time.monotonic() if now is None else now
+        idle = [tenant for tenant, bucket in self.buckets.items() if bucket.is_full(now)]
+        for tenant in idle:
+            del self.buckets[tenant]
+        self._next_eviction = now + EVICT_INTERVAL
+        return len(idle)
+
+    @asynccontextmanager
+    async def admitted(self, tenant: str) -> AsyncIterator[None]:
+        """
+        Admit a request for the duration of the block.
+
+        Args:
+            tenant: The tenant
+
+        Raises:
+            AdmissionRejected: If the tenant is over its rate or concurrency limit
+        """
+        self.admit(tenant)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    def slot(self, tenant: str):
+        """Hold one of the fair scheduler's execution slots (async context manager)"""
+        return self.scheduler.slot(tenant, self.label(tenant))
+
+    def utilization(self, tenant: str) -> float:
+        """In-flight requests of a tenant as a fraction of its quota"""
+        max_concurrent = self.policy(tenant).max_concurrent
+        return self.in_flight.get(tenant, 0) / max_concurrent if max_concurrent else 0.0
+
+    def label_utilization(self, label: str) -> float:
+        """Utilization reported under a metric label (the busiest unknown tenant for the default label)"""
+        if label != DEFAULT_TENANT:
+            return self.utilization(label)
+        return max((self.utilization(tenant) for tenant in list(self.in_flight) if tenant not in self.policies), default=0.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report each known tenant's policy and current usage.
+
+        Returns:
+            Dict with the scheduler state and one entry per tenant
+        """
+        tenants = set(self.policies) | set(self.in_flight) | set(self.scheduler.running_by_tenant)
+        report = {}
+        for tenant in sorted(tenants):
+            bucket = self.buckets.get(tenant)
+            if bucket is not None:
+                bucket._refill(time.monotonic())
+            report[tenant] = {
+                "policy": self.policy(tenant).to_dict(),
+                "in_flight": self.in_flight.get(tenant, 0),
+                "utilization": round(self.utilization(tenant), 3),
+                "running": self.scheduler.running_by_tenant.get(tenant, 0),
+                "queued": self.scheduler.queued_by_tenant.get(tenant, 0),
+                "tokens": round(bucket.tokens, 3) if bucket is not None else self.policy(tenant).burst
+            }
+        return {
+            "capacity": self.scheduler.capacity,
+            "running": self.scheduler.running,
+            "queued": len(self.scheduler.waiting),
+            "default_policy": self.default_policy.to_dict(),
+            "tenants": report
+        }
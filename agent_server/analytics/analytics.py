@@ -0,0 +1,513 @@
+"""
+Analytics Module
+
+This module is responsible for the columnar store of past executions (one row
+per executed workflow node) and the aggregate queries run over it, such as the
+average duration per responsible agent over the last week.
+
+Rows are appended column by column into time-partitioned segments (one per
+day by default):
+
+- timestamp, duration and confidence are float64 columns (NaN when missing)
+- status, agent and tenant are dictionary-encoded int32 columns whose
+  dictionaries are shared by every segment (the layout of Arrow dictionary
+  arrays)
+- workflow_id, task and any extra fields of a row are kept as plain lists
+
+Queries select segments by time range first, then filter and group rows.
+With NumPy installed (the optional "analytics" extra) this is vectorized over
+whole columns; without it the same queries run as loops over the compact
+stdlib arrays. Old data is
+dropped a whole segment at a time, either explicitly (drop_before()) or
+through a retention period set with AGENT_SERVER_EXECUTION_RETENTION_DAYS.
+"""
+from typing import Dict, List, Optional, Any, Iterable, Tuple, Union
+from array import array
+from datetime import datetime
+import math
+import os
+import statistics
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Width of a time partition in seconds
+SEGMENT_SECONDS = 86400.0
+
+NUMERIC_COLUMNS = ("timestamp", "duration", "confidence")
+CATEGORICAL_COLUMNS = ("status", "agent", "tenant")
+OBJECT_COLUMNS = ("workflow_id", "task", "details")
+
+# Aggregates accepted by ExecutionStore.query()
+METRICS = (
+    "count", "duration_mean", "duration_sum", "duration_min", "duration_max",
+    "duration_p50", "duration_p95", "confidence_mean", "failure_rate"
+)
+DEFAULT_METRICS = ("count", "duration_mean", "duration_p95", "confidence_mean", "failure_rate")
+
+# Record fields stored in columns; every other field goes to "details"
+RECORD_FIELDS = NUMERIC_COLUMNS + CATEGORICAL_COLUMNS + ("workflow_id", "task")
+
+Timestamp = Union[float, int, str, datetime, None]
+
+
+def to_timestamp(value: Timestamp) -> Optional[float]:
+    """
+    Convert a time value to epoch seconds.
+
+    Args:
+        value: Epoch seconds (number or numeric string), an ISO 8601 string
+            or a datetime
+
+    Returns:
+        The epoch timestamp, or None for None
+
+    Raises:
+        ValueError: If the value cannot be parsed
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _number(value: Any) -> float:
+    """A float column value (NaN when missing or not numeric)"""
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class Dictionary:
+    """Dictionary encoding of a string column, shared by every segment"""
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self, values: Optional[List[Optional[str]]] = None):
+        self.values: List[Optional[str]] = list(values or [])
+        self.codes: Dict[Optional[str], int] = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value: Optional[str]) -> int:
+        """Get the code of a value, adding it when new"""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: Optional[str]) -> Optional[int]:
+        """Get the code of a value without adding it"""
+        return self.codes.get(value)
+
+
+class Segment:
+    """Rows of one time partition, stored column by column"""
+
+    def __init__(self, start: float, end: float):
+        self.start = start
+        self.end = end
+        self.rows = 0
+        self.numeric = {name: array("d") for name in NUMERIC_COLUMNS}
+        self.codes = {name: array("i") for name in CATEGORICAL_COLUMNS}
+        self.objects: Dict[str, List[Any]] = {name: [] for name in OBJECT_COLUMNS}
+        self._arrays: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def append(self, numeric: Tuple[float, ...], codes: Tuple[int, ...], objects: Tuple[Any, ...]) -> None:
+        """Append one row (values in column order)"""
+        for column, value in zip(self.numeric.values(), numeric):
+            column.append(value)
+        for column, value in zip(self.codes.values(), codes):
+            column.append(value)
+        for column, value in zip(self.objects.values(), objects):
+            column.append(value)
+        # Counted last: readers only look at the first self.rows values
+        self.rows += 1
+        self._arrays = None
+
+    def arrays(self) -> Dict[str, Any]:
+        """NumPy copies of the numeric and code columns (cached until the next append)"""
+        if self._arrays is None:
+            rows = self.rows
+            arrays = {name: numpy.frombuffer(column[:rows], dtype=numpy.float64) for name, column in self.numeric.items()}
+            arrays.update({name: numpy.frombuffer(column[:rows], dtype=numpy.intc) for name, column in self.codes.items()})
+            self._arrays = arrays
+        return self._arrays
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict representation of the segment (consistent while rows are appended)"""
+        rows = self.rows
+        columns = {name: column[:rows].tolist() for name, column in self.numeric.items()}
+        columns.update({name: column[:rows].tolist() for name, column in self.codes.items()})
+        columns.update({name: column[:rows] for name, column in self.objects.items()})
+        # NaN is not valid JSON
+        for name in NUMERIC_COLUMNS:
+            columns[name] = [None if value != value else value for value in columns[name]]
+        return {"start": self.start, "end": self.end, "rows": rows, "columns": columns}
+
+
+class ExecutionStore:
+    """
+    ExecutionStore class holding past executions in time-partitioned columnar segments.
+    """
+
+    def __init__(self, segment_seconds: float = SEGMENT_SECONDS, retention_seconds: Optional[float] = None):
+        """
+        Initialize an empty execution store.
+
+        Args:
+            segment_seconds: Width of a time partition
+            retention_seconds: Drop segments older than this when a new one
+                starts (None to keep everything)
+        """
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self.segments: Dict[float, Segment] = {}
+        self.dictionaries = {name: Dictionary() for name in CATEGORICAL_COLUMNS}
+
+    @classmethod
+    def from_env(cls) -> "ExecutionStore":
+        """
+        Build a store with the retention from AGENT_SERVER_EXECUTION_RETENTION_DAYS
+        (unset keeps everything).
+
+        Returns:
+            The execution store
+        """
+        days = os.environ.get("AGENT_SERVER_EXECUTION_RETENTION_DAYS")
+        return cls(retention_seconds=float(days) * 86400 if days else None)
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments.values())
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Append one execution record.
+
+        Args:
+            record: Dict with any of timestamp (defaults to now), workflow_id,
+                tenant, task, agent (or responsible_agent), status, duration
+                and confidence; other fields are kept as details
+        """
+        timestamp = to_timestamp(record.get("timestamp"))
+        if timestamp is None:
+            timestamp = time.time()
+
+        start = math.floor(timestamp / self.segment_seconds) * self.segment_seconds
+        segment = self.segments.get(start)
+        if segment is None:
+            segment = self.segments[start] = Segment(start, start + self.segment_seconds)
+            if self.retention_seconds is not None:
+                self.drop_before(time.time() - self.retention_seconds)
+
+        details = {key: value for key, value in record.items() if key not in RECORD_FIELDS and key != "responsible_agent"}
+        agent = record.get("agent", record.get("responsible_agent"))
+        segment.append(
+            (timestamp, _number(record.get("duration")), _number(record.get("confidence"))),
+            tuple(
+                self.dictionaries[name].encode(None if value is None else str(value))
+                for name, value in zip(CATEGORICAL_COLUMNS, (record.get("status"), agent, record.get("tenant")))
+            ),
+            (record.get("workflow_id"), record.get("task"), details or None)
+        )
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Append several execution records"""
+        for record in records:
+            self.append(record)
+
+    def drop_before(self, timestamp: Timestamp) -> int:
+        """
+        Drop every segment that ends before a point in time. Only whole
+        segments are dropped, so rows slightly older may remain.
+
+        Args:
+            timestamp: The cut-off time
+
+        Returns:
+            The number of rows dropped
+        """
+        cutoff = to_timestamp(timestamp)
+        dropped = 0
+        for start in [start for start, segment in self.segments.items() if segment.end <= cutoff]:
+            dropped += len(self.segments.pop(start))
+        return dropped
+
+    def records(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Materialize rows as dicts, oldest segment first.
+
+        Args:
+            offset: Index of the first row
+            limit: Maximum number of rows (None for all)
+
+        Returns:
+            The execution records
+        """
+        records = []
+        for start in sorted(self.segments):
+            segment = self.segments[start]
+            rows = len(segment)
+            if offset >= rows:
+                offset -= rows
+                continue
+            end = rows if limit is None else min(rows, offset + limit - len(records))
+            for i in range(offset, end):
+                records.append(self._record(segment, i))
+            offset = 0
+            if limit is not None and len(records) >= limit:
+                break
+        return records
+
+    def query(
+        self,
+        since: Timestamp = None,
+        until: Timestamp = None,
+        filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+        group_by: Optional[List[str]] = None,
+        metrics: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate executions, e.g. the mean duration per agent over a week:
+        query(since=time.time() - 7 * 86400, group_by=["agent"], metrics=["duration_mean"]).
+
+        Args:
+            since: Only rows at or after this time
+            until: Only rows before this time
+            filters: Allowed values per categorical column (status, agent, tenant)
+            group_by: Categorical columns to group by (None for one group)
+            metrics: Aggregates from METRICS (defaults to DEFAULT_METRICS)
+
+        Returns:
+            One dict per group with the group's column values and its metrics
+
+        Raises:
+            ValueError: On an unknown column, metric or time value
+        """
+        group_by = list(group_by or [])
+        metrics = list(metrics or DEFAULT_METRICS)
+        filters = filters or {}
+        for name in group_by + list(filters):
+            if name not in CATEGORICAL_COLUMNS:
+                raise ValueError(f"Unknown column {name} (known: {', '.join(CATEGORICAL_COLUMNS)})")
+        for metric in metrics:
+            if metric not in METRICS:
+                raise ValueError(f"Unknown metric {metric} (known: {', '.join(METRICS)})")
+        since = to_timestamp(since)
+        until = to_timestamp(until)
+
+        # Allowed codes per filtered column; a value never seen matches nothing
+        allowed: Dict[str, List[int]] = {}
+        for name, values in filters.items():
+            values = [values] if isinstance(values, str) else values
+            allowed[name] = [code for code in (self.dictionaries[name].lookup(value) for value in values) if code is not None]
+            if not allowed[name]:
+                return []
+        failed = self.dictionaries["status"].lookup("failed")
+
+        # Per group: duration and confidence values, row and failure counts
+        groups: Dict[Tuple[int, ...], Dict[str, Any]] = {}
+        for start in sorted(self.segments):
+            segment = self.segments[start]
+            if not len(segment) or (since is not None and segment.end <= since) or (until is not None and segment.start >= until):
+                continue
+            if numpy is not None:
+                self._scan_vectorized(segment, since, until, allowed, group_by, failed, groups)
+            else:
+                self._scan(segment, since, until, allowed, group_by, failed, groups)
+
+        results = []
+        for key in sorted(groups, key=lambda key: tuple(str(self.dictionaries[name].values[code]) for name, code in zip(group_by, key))):
+            group = groups[key]
+            row = {name: self.dictionaries[name].values[code] for name, code in zip(group_by, key)}
+            durations = _concat(group["duration"])
+            confidences = _concat(group["confidence"])
+            for metric in metrics:
+                if metric == "count":
+                    row[metric] = group["count"]
+                elif metric == "failure_rate":
+                    row[metric] = round(group["failed"] / group["count"], 6)
+                elif metric == "confidence_mean":
+                    row[metric] = _aggregate(confidences, "mean")
+                else:
+                    row[metric] = _aggregate(durations, metric[len("duration_"):])
+            results.append(row)
+        return results
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Describe the store.
+
+        Returns:
+            A dictionary with the row count, retention and per-segment ranges
+        """
+        return {
+            "rows": len(self),
+            "backend": "numpy" if numpy is not None else "array",
+            "segment_seconds": self.segment_seconds,
+            "retention_seconds": self.retention_seconds,
+            "segments": [
+                {
+                    "start": datetime.fromtimestamp(segment.start).isoformat(),
+                    "end": datetime.fromtimestamp(segment.end).isoformat(),
+                    "rows": len(segment)
+                }
+                for _, segment in sorted(self.segments.items())
+            ]
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Plain-dict representation of the store (for the memory snapshot).
+
+        Safe to call from another thread while rows are appended: segments are
+        copied before the dictionaries, which only ever grow, so every code
+        in the copied segments is covered by the copied dictionaries.
+        """
+        segments = [segment.to_dict() for segment in list(self.segments.values())]
+        return {
+            "segment_seconds": self.segment_seconds,
+            "dictionaries": {name: list(dictionary.values) for name, dictionary in self.dictionaries.items()},
+            "segments": segments
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], retention_seconds: Optional[float] = None) -> "ExecutionStore":
+        """
+        Rebuild a store from to_dict() output.
+
+        Args:
+            data: The dict produced by to_dict()
+            retention_seconds: Retention of the rebuilt store
+
+        Returns:
+            The execution store
+        """
+        store = cls(data.get("segment_seconds", SEGMENT_SECONDS), retention_seconds)
+        store.dictionaries = {
+            name: Dictionary(data.get("dictionaries", {}).get(name)) for name in CATEGORICAL_COLUMNS
+        }
+        for saved in data.get("segments", []):
+            segment = Segment(saved["start"], saved["end"])
+            columns = saved["columns"]
+            rows = saved["rows"]
+            for name in NUMERIC_COLUMNS:
+                segment.numeric[name] = array("d", (math.nan if value is None else value for value in columns[name][:rows]))
+            for name in CATEGORICAL_COLUMNS:
+                segment.codes[name] = array("i", columns[name][:rows])
+            for name in OBJECT_COLUMNS:
+                segment.objects[name] = list(columns[name][:rows])
+            segment.rows = rows
+            store.segments[segment.start] = segment
+        return store
+
+    def _record(self, segment: Segment, i: int) -> Dict[str, Any]:
+        """Decode row i of a segment"""
+        record = {
+            "timestamp": segment.numeric["timestamp"][i],
+            "workflow_id": segment.objects["workflow_id"][i],
+            "tenant": self.dictionaries["tenant"].values[segment.codes["tenant"][i]],
+            "task": segment.objects["task"][i],
+            "agent": self.dictionaries["agent"].values[segment.codes["agent"][i]],
+            "status": self.dictionaries["status"].values[segment.codes["status"][i]]
+        }
+        for name in ("duration", "confidence"):
+            value = segment.numeric[name][i]
+            record[name] = None if math.isnan(value) else value
+        if segment.objects["details"][i]:
+            record.update(segment.objects["details"][i])
+        return record
+
+    def _scan_vectorized(self, segment, since, until, allowed, group_by, failed, groups) -> None:
+        """Filter and group one segment with NumPy"""
+        columns = segment.arrays()
+        mask = numpy.ones(len(columns["timestamp"]), dtype=bool)
+        if since is not None and segment.start < since:
+            mask &= columns["timestamp"] >= since
+        if until is not None and segment.end > until:
+            mask &= columns["timestamp"] < until
+        for name, codes in allowed.items():
+            mask &= numpy.isin(columns[name], codes)
+        if not mask.any():
+            return
+
+        durations = columns["duration"][mask]
+        confidences = columns["confidence"][mask]
+        is_failed = columns["status"][mask] == failed if failed is not None else numpy.zeros(len(durations), dtype=bool)
+        if group_by:
+            keys, inverse = numpy.unique(
+                numpy.stack([columns[name][mask] for name in group_by], axis=1), axis=0, return_inverse=True
+            )
+            inverse = inverse.reshape(-1)
+        else:
+            keys, inverse = numpy.zeros((1, 0), dtype=numpy.intc), numpy.zeros(len(durations), dtype=numpy.intp)
+
+        order = numpy.argsort(inverse, kind="stable")
+        bounds = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(inverse, minlength=len(keys)))))
+        for g, key in enumerate(keys):
+            rows = order[bounds[g]:bounds[g + 1]]
+            group = groups.setdefault(tuple(int(code) for code in key), {"duration": [], "confidence": [], "count": 0, "failed": 0})
+            group_durations = durations[rows]
+            group_confidences = confidences[rows]
+            group["duration"].append(group_durations[~numpy.isnan(group_durations)])
+            group["confidence"].append(group_confidences[~numpy.isnan(group_confidences)])
+            group["count"] += len(rows)
+            group["failed"] += int(is_failed[rows].sum())
+
+    def _scan(self, segment, since, until, allowed, group_by, failed, groups) -> None:
+        """Filter and group one segment row by row (without NumPy)"""
+        timestamps = segment.numeric["timestamp"]
+        durations = segment.numeric["duration"]
+        confidences = segment.numeric["confidence"]
+        statuses = segment.codes["status"]
+        allowed_sets = [(segment.codes[name], set(codes)) for name, codes in allowed.items()]
+        key_columns = [segment.codes[name] for name in group_by]
+        for i in range(len(segment)):
+            if since is not None and timestamps[i] < since:
+                continue
+            if until is not None and timestamps[i] >= until:
+                continue
+            if any(column[i] not in codes for column, codes in allowed_sets):
+                continue
+            group = groups.setdefault(tuple(column[i] for column in key_columns), {"duration": [[]], "confidence": [[]], "count": 0, "failed": 0})
+            if not math.isnan(durations[i]):
+                group["duration"][0].append(durations[i])
+            if not math.isnan(confidences[i]):
+                group["confidence"][0].append(confidences[i])
+            group["count"] += 1
+            if statuses[i] == failed:
+                group["failed"] += 1
+
+
+def _concat(parts: List[Any]) -> Any:
+    """Join the per-segment value chunks of a group"""
+    if numpy is not None:
+        return numpy.concatenate(parts) if parts else numpy.zeros(0)
+    return [value for part in parts for value in part]
+
+
+def _aggregate(values: Any, statistic: str) -> Optional[float]:
+    """Compute mean/sum/min/max/p50/p95 (nearest rank) of a group's values"""
+    if len(values) == 0:
+        return None
+    if statistic in ("p50", "p95"):
+        ordered = numpy.sort(values) if numpy is not None else sorted(values)
+        rank = max(0, math.ceil(int(statistic[1:]) / 100 * len(ordered)) - 1)
+        return round(float(ordered[rank]), 6)
+    if numpy is not None:
+        value = {"mean": numpy.mean, "sum": numpy.sum, "min": numpy.min, "max": numpy.max}[statistic](values)
+    else:
+        value = {"mean": statistics.fmean, "sum": math.fsum, "min": min, "max": max}[statistic](values)
+    return round(float(value), 6)
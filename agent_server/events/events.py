@@ -0,0 +1,208 @@
+"""
+Events Module
+
+This module is responsible for dispatching typed workflow events to the
+handlers subscribed to them. Workflows publish:
+
+- node_started, node_completed, node_failed (with the node index)
+- workflow_completed, workflow_failed
+
+Subscriptions are indexed by (workflow, event type, node), so publishing an
+event only touches the handlers that match it, however many actions are
+subscribed overall. Matching handlers run concurrently in a background task;
+publish() never waits for them.
+
+Actions subscribe through their action_trigger, which names an event type
+(optionally narrowed to one node with "node_index"). The legacy trigger
+"task_complete" is an alias of workflow_completed.
+"""
+from typing import Dict, List, Optional, Any, Awaitable, Callable, Set, Tuple
+import asyncio
+import time
+
+from agent_server.metrics.metrics import REGISTRY, ERRORS
+
+NODE_STARTED = "node_started"
+NODE_COMPLETED = "node_completed"
+NODE_FAILED = "node_failed"
+WORKFLOW_COMPLETED = "workflow_completed"
+WORKFLOW_FAILED = "workflow_failed"
+
+EVENT_TYPES = (NODE_STARTED, NODE_COMPLETED, NODE_FAILED, WORKFLOW_COMPLETED, WORKFLOW_FAILED)
+
+# Older action triggers and the event types they stand for
+TRIGGER_ALIASES = {
+    "task_complete": WORKFLOW_COMPLETED
+}
+
+EVENTS_PUBLISHED = REGISTRY.counter("agent_events_published_total", "Workflow events published, by type", ["type"])
+EVENT_DISPATCHES = REGISTRY.counter("agent_event_handler_calls_total", "Event handler invocations, by event type", ["type"])
+EVENT_ERRORS = ERRORS.labels("events")
+
+Handler = Callable[["WorkflowEvent"], Awaitable[Any]]
+SubscriptionKey = Tuple[Optional[str], str, Optional[int]]
+
+
+def resolve_trigger(trigger: Optional[str]) -> Optional[str]:
+    """
+    Map an action trigger to the event type it subscribes to.
+
+    Args:
+        trigger: The action_trigger value
+
+    Returns:
+        The event type, or None if the trigger is not an event
+    """
+    event_type = TRIGGER_ALIASES.get(trigger, trigger)
+    return event_type if event_type in EVENT_TYPES else None
+
+
+class WorkflowEvent:
+    """An event published by a workflow"""
+
+    __slots__ = ("type", "workflow_id", "node_index", "data", "timestamp")
+
+    def __init__(self, type: str, workflow_id: str, node_index: Optional[int] = None, data: Optional[Dict[str, Any]] = None):
+        self.type = type
+        self.workflow_id = workflow_id
+        self.node_index = node_index
+        self.data = data or {}
+        self.timestamp = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict representation of the event"""
+        return {
+            "type": self.type,
+            "workflow_id": self.workflow_id,
+            "node_index": self.node_index,
+            "data": self.data,
+            "timestamp": self.timestamp
+        }
+
+
+class Subscription:
+    """A handler subscribed to one event type"""
+
+    __slots__ = ("key", "handler")
+
+    def __init__(self, key: SubscriptionKey, handler: Handler):
+        self.key = key
+        self.handler = handler
+
+
+class EventBus:
+    """
+    EventBus class routing workflow events to their subscribed handlers.
+    """
+
+    def __init__(self):
+        """Initialize an event bus without subscriptions"""
+        self.subscriptions: Dict[SubscriptionKey, List[Subscription]] = {}
+        self.by_workflow: Dict[str, List[Subscription]] = {}
+        self.pending: Set[asyncio.Task] = set()
+
+    def subscribe(self, event_type: str, handler: Handler, workflow_id: Optional[str] = None, node_index: Optional[int] = None) -> Subscription:
+        """
+        Subscribe a handler to an event type.
+
+        Args:
+            event_type: One of EVENT_TYPES
+            handler: Coroutine function called with the WorkflowEvent
+            workflow_id: Only receive events of this workflow (None for all)
+            node_index: Only receive events of this node (None for all)
+
+        Returns:
+            The subscription (for unsubscribe())
+        """
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+
+        subscription = Subscription((workflow_id, event_type, node_index), handler)
+        self.subscriptions.setdefault(subscription.key, []).append(subscription)
+        if workflow_id is not None:
+            self.by_workflow.setdefault(workflow_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Remove a subscription.
+
+        Args:
+            subscription: Subscription returned by subscribe()
+        """
+        handlers = self.subscriptions.get(subscription.key)
+        if handlers is not None and subscription in handlers:
+            handlers.remove(subscription)
+            if not handlers:
+                del self.subscriptions[subscription.key]
+
+    def unsubscribe_workflow(self, workflow_id: str) -> None:
+        """
+        Remove every subscription scoped to a workflow.
+
+        Args:
+            workflow_id: The ID of the workflow
+        """
+        for subscription in self.by_workflow.pop(workflow_id, []):
+            self.unsubscribe(subscription)
+
+    def handlers(self, event: WorkflowEvent) -> List[Handler]:
+        """
+        Get the handlers matching an event.
+
+        Args:
+            event: The event
+
+        Returns:
+            The handlers, found with at most four index lookups
+        """
+        keys = [(event.workflow_id, event.type, None), (None, event.type, None)]
+        if event.node_index is not None:
+            keys += [(event.workflow_id, event.type, event.node_index), (None, event.type, event.node_index)]
+
+        matched = []
+        for key in keys:
+            for subscription in self.subscriptions.get(key, ()):
+                matched.append(subscription.handler)
+        return matched
+
+    def publish(self, event: WorkflowEvent) -> Optional[asyncio.Task]:
+        """
+        Publish an event, fanning it out to the matching handlers in the background.
+
+        Args:
+            event: The event
+
+        Returns:
+            The dispatch task, or None if no handler matched
+        """
+        EVENTS_PUBLISHED.labels(event.type).inc()
+        handlers = self.handlers(event)
+        if not handlers:
+            return None
+
+        task = asyncio.ensure_future(self._dispatch(event, handlers))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return task
+
+    async def drain(self) -> None:
+        """Wait until every dispatch in progress has finished"""
+        while self.pending:
+            await asyncio.gather(*list(self.pending), return_exceptions=True)
+
+    async def close(self) -> None:
+        """Cancel the dispatches in progress"""
+        tasks = list(self.pending)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _dispatch(self, event: WorkflowEvent, handlers: List[Handler]) -> None:
+        """Run the handlers of an event concurrently; errors are logged, not raised"""
+        EVENT_DISPATCHES.labels(event.type).inc(len(handlers))
+        results = await asyncio.gather(*(handler(event) for handler in handlers), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                EVENT_ERRORS.inc()
+                print(f"Error handling {event.type} event of workflow {event.workflow_id}: {str(result)}")
@@ -3,26 +3,35 @@ Agent Server - Main Entry Point
 
 This is the main entry point for the agent server, which orchestrates the
 planning, reasoning, memory, and workflow components.
+
+The application is built by create_app(). Components are constructed lazily by
+the Services container and injected into the endpoints; the memory snapshot
+and the A2A research service warm up in the background during startup.
+Responses are rendered compactly by FastJSONResponse (orjson when installed).
 """
 import asyncio
-from fastapi import FastAPI, HTTPException
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any, Union
 
 # Import our modules
 from agent_server.planning.planning import Planning
-from agent_server.reasoning.reasoning import Reasoning
 from agent_server.memory.memory import Memory
 from agent_server.workflow.workflow import Workflow
-from agent_server.action.action import Action
-
-# Import A2A research agents
-from agent_server.agent_server.reasoning.a2a_api import router as a2a_router, initialize_a2a_service
-
-app = FastAPI(
-    title="Agent Server", 
-    description="Agent Execution Server with A2A Research Capabilities",
-    version="1.0.0"
+from agent_server.workflow.context import ContextPolicy
+from agent_server.services import Services
+from agent_server.metrics.metrics import REGISTRY, ERRORS
+from agent_server.tracing.tracing import TRACER
+from agent_server.serialization.serialization import FastJSONResponse
+from agent_server.admission.admission import AdmissionRejected, DEFAULT_TENANT
+from agent_server.reasoning.research_cache import normalize_query
+from agent_server.pagination.pagination import (
+    encode_cursor, page_bounds, paginate, parse_fields, project, should_stream, streaming_json_response
 )
 
 class AgentRequest(BaseModel):
@@ -33,13 +42,18 @@ class AgentRequest(BaseModel):
     tool: Optional[str] = None
     expected_output: Optional[str] = None
     context: Optional[Dict[str, Any]] = None
+    tenant_id: Optional[str] = None
+    subtasks: Optional[List[Union[str, Dict[str, Any]]]] = None
+    context_policy: Optional[Dict[str, Any]] = None
 
 class AgentResponse(BaseModel):
     """Response model from agent execution"""
     task_id: str
     status: str
-    result: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
+    result: Optional[Union[Dict[str, Any], List[Any]]] = None
     error: Optional[str] = None
+    next_cursor: Optional[str] = None
 
 class A2AResearchRequest(BaseModel):
     """Request model for A2A research"""
@@ -48,6 +62,7 @@ class A2AResearchRequest(BaseModel):
     research_type: str = "general"
     depth: str = "moderate"
     sources: Optional[List[str]] = None
+    refresh: bool = False
 
 class A2AResearchResponse(BaseModel):
     """Response model for A2A research"""
@@ -56,30 +71,87 @@ class A2AResearchResponse(BaseModel):
     status: str
     results: Dict[str, Any]
     summary: str
+    cache: Optional[str] = None
+    age_seconds: Optional[float] = None
+
+router = APIRouter()
+
+# Memory types searched by /memory, in order, when none is given
+MEMORY_TYPES = ["short_term", "long_term"]
+
+# Longest long-poll accepted by /status (seconds)
+MAX_STATUS_WAIT = 60.0
+
+STATUS_REQUESTS = REGISTRY.counter("agent_status_requests_total", "Status requests by outcome", ["outcome"])
+
+# Service dependencies
+def get_services(request: Request) -> Services:
+    """Get the service container of the running application"""
+    return request.app.state.services
+
+def get_planning(services: Services = Depends(get_services)) -> Planning:
+    """Get the planning component"""
+    return services.planning
+
+def get_workflow(services: Services = Depends(get_services)) -> Workflow:
+    """Get the workflow component"""
+    return services.workflow
+
+async def get_memory_service(services: Services = Depends(get_services)) -> Memory:
+    """Get the memory component once its snapshot is loaded"""
+    return await services.get_memory()
 
-# Singleton instances
-planning = Planning()
-reasoning = Reasoning()
-memory = Memory()
-workflow = Workflow()
-action = Action()
-
-# Include A2A research router
-app.include_router(a2a_router)
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    # Initialize A2A service with existing memory and workflow services
-    await initialize_a2a_service(memory, workflow)
-    print("Agent Server started with A2A Research Agents")
-
-@app.post("/execute", response_model=AgentResponse)
-async def execute_agent(request: AgentRequest):
+def resolve_tenant(http_request: Request, tenant_id: Optional[str] = None) -> str:
+    """Get the tenant of a request: explicit ID, then the X-Tenant-ID header, then the default tenant"""
+    return tenant_id or http_request.headers.get("x-tenant-id") or DEFAULT_TENANT
+
+def admission_error(e: AdmissionRejected) -> HTTPException:
+    """Turn an admission rejection into a 429 response with Retry-After"""
+    return HTTPException(
+        status_code=429,
+        detail=e.to_dict(),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the loop watchdog, warm up heavy services in the background and clean up on shutdown"""
+    services = app.state.services
+    await services.start_watchdog()
+    services.start_warmup()
+    yield
+    await services.shutdown()
+
+@router.post("/execute", response_model=AgentResponse)
+async def execute_agent(
+    request: AgentRequest,
+    http_request: Request,
+    services: Services = Depends(get_services),
+    planning: Planning = Depends(get_planning),
+    workflow: Workflow = Depends(get_workflow)
+):
     """
     Execute an agent task based on the provided request.
     This orchestrates the planning, reasoning, and execution components.
+    
+    The request counts against its tenant's rate limit and concurrency quota
+    (tenant_id field or X-Tenant-ID header); over either, it is rejected with 429.
+    
+    context_policy (last_n, dependencies_only, max_bytes, max_tokens) overrides
+    the server's policy for the previous results handed to each task; an
+    invalid policy is rejected with 422.
     """
+    try:
+        context_policy = ContextPolicy.from_dict(request.context_policy) if request.context_policy else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    tenant = resolve_tenant(http_request, request.tenant_id)
+    try:
+        services.admission.admit(tenant)
+    except AdmissionRejected as e:
+        raise admission_error(e)
+    
     try:
         # Create planning input
         planning_input = {
@@ -87,25 +159,34 @@ async def execute_agent(request: AgentRequest):
             "agent_role": request.agent_role,
             "task": request.task,
             "tool": request.tool,
-            "expected_output": request.expected_output
+            "expected_output": request.expected_output,
+            "subtasks": request.subtasks
         }
         
-        # Generate plan
-        planning_output = await planning.generate_plan(planning_input)
+        # The task ID doubles as the trace ID of the request and the workflow
+        task_id = str(uuid.uuid4())
         
-        # Create task queue and actions
-        task_queue = planning_output.get("sub_task_queue", [])
-        actions = planning_output.get("actions", [])
+        with TRACER.span("api.execute", trace_id=task_id):
+            # Generate plan
+            planning_output = await planning.generate_plan(planning_input)
+            
+            # Create task queue and actions
+            task_queue = planning_output.get("sub_task_queue", [])
+            actions = planning_output.get("actions", [])
+            
+            # Initialize workflow
+            await workflow.initialize(
+                task_queue=task_queue,
+                actions=actions,
+                context=request.context,
+                context_policy=context_policy,
+                workflow_id=task_id,
+                tenant=tenant
+            )
         
-        # Initialize workflow
-        task_id = await workflow.initialize(
-            task_queue=task_queue,
-            actions=actions,
-            context=request.context
-        )
-        
-        # Start execution in the background
-        asyncio.create_task(execute_workflow(task_id))
+        # Start execution in the background (outside the request span);
+        # the tenant's quota is released when the workflow finishes
+        asyncio.create_task(execute_workflow(services, task_id, tenant))
         
         return AgentResponse(
             task_id=task_id,
@@ -113,51 +194,177 @@ async def execute_agent(request: AgentRequest):
         )
     
     except Exception as e:
+        services.admission.release(tenant)
         raise HTTPException(status_code=500, detail=str(e))
 
-async def execute_workflow(task_id: str):
+async def execute_workflow(services: Services, task_id: str, tenant: str = DEFAULT_TENANT):
     """Background task to execute the workflow"""
     try:
         # Execute workflow
-        await workflow.execute(task_id, reasoning=reasoning, memory=memory)
+        memory = await services.get_memory()
+        with TRACER.span("workflow.execute", trace_id=task_id):
+            await services.workflow.execute_with_lease(task_id, reasoning=services.reasoning, memory=memory)
     except Exception as e:
         # Log error
+        ERRORS.labels("api").inc()
         print(f"Error executing workflow {task_id}: {str(e)}")
+    finally:
+        services.admission.release(tenant)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
 
-@app.get("/status/{task_id}", response_model=AgentResponse)
-async def get_task_status(task_id: str):
-    """Get the status of a running task"""
+@router.get("/status/{task_id}", response_model=AgentResponse)
+async def get_task_status(
+    task_id: str,
+    request: Request,
+    response: Response,
+    wait: Optional[float] = None,
+    since: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None,
+    stream: Optional[bool] = None,
+    workflow: Workflow = Depends(get_workflow)
+):
+    """
+    Get the status of a running task.
+    
+    The response carries the workflow version as its ETag; a matching
+    If-None-Match returns 304 without building the status. With ?wait=<seconds>
+    and since=<version>, the request is parked until the workflow's version
+    differs from since (or the wait expires).
+    
+    ?limit=&cursor= return one page of the results with a next_cursor;
+    ?fields=status,current_task_index projects the full status document;
+    large result lists are streamed in chunks (force with ?stream=true).
+    """
+    version = await workflow.get_version(task_id)
+    if version is not None and wait and since is not None:
+        STATUS_REQUESTS.labels("long_poll").inc()
+        version = await workflow.wait_for_change(task_id, since, min(wait, MAX_STATUS_WAIT))
+    
+    if version is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    
+    etag = f'"{version}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        STATUS_REQUESTS.labels("not_modified").inc()
+        return Response(status_code=304, headers={"ETag": etag})
+    
     status = await workflow.get_status(task_id)
     
     if not status:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
-    return AgentResponse(
-        task_id=task_id,
-        status=status.get("status", "unknown"),
-        result=status.get("result")
-    )
+    STATUS_REQUESTS.labels("full").inc()
+    headers = {"ETag": f'"{status["version"]}"'}
+    
+    if (cursor is not None or limit is not None) and isinstance(status.get("result"), list):
+        try:
+            offset, limit = page_bounds(cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        status["result"], status["next_cursor"] = paginate(status["result"], offset, limit)
+    
+    if fields:
+        body = project({"task_id": task_id, **status}, parse_fields(fields))
+    else:
+        body = {
+            "task_id": task_id,
+            "status": status.get("status", "unknown"),
+            "version": status["version"],
+            "result": status.get("result"),
+            "error": None,
+            "next_cursor": status.get("next_cursor")
+        }
+    
+    if stream or (stream is None and should_stream(status.get("result"))):
+        return streaming_json_response(body, headers=headers)
+    if fields:
+        return FastJSONResponse(body, headers=headers)
+    
+    response.headers.update(headers)
+    return AgentResponse(**body)
 
-@app.get("/memory/{key}")
-async def get_memory(key: str):
-    """Retrieve an item from memory"""
-    value = await memory.get(key)
+@router.get("/memory/{key}")
+async def get_memory(
+    key: str,
+    memory_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None,
+    stream: Optional[bool] = None,
+    memory: Memory = Depends(get_memory_service)
+):
+    """
+    Retrieve an item from memory.
+    
+    ?memory_type=short_term|long_term picks the memory; without it the key is
+    looked up in short-term memory, then in long-term memory.
+    ?limit=&cursor= return one page of a list value with a next_cursor;
+    ?fields= projects a dict value; large values are streamed in chunks
+    (force with ?stream=true).
+    """
+    if memory_type is not None and memory_type not in MEMORY_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown memory_type: {memory_type} (expected one of {', '.join(MEMORY_TYPES)})")
+    memory_types = [memory_type] if memory_type else MEMORY_TYPES
+    
+    if cursor is not None or limit is not None:
+        try:
+            offset, limit = page_bounds(cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        for candidate in memory_types:
+            page = await memory.get_page(key, offset, limit, memory_type=candidate)
+            if page is not None:
+                break
+        if page is None:
+            raise HTTPException(status_code=404, detail=f"Memory key {key} not found")
+        value, has_more = page
+        body = {"key": key, "value": value, "next_cursor": encode_cursor(offset + limit) if has_more else None}
+    else:
+        for candidate in memory_types:
+            value = await memory.get(key, candidate)
+            if value is not None:
+                break
+        if value is None:
+            raise HTTPException(status_code=404, detail=f"Memory key {key} not found")
+        body = {"key": key, "value": value}
+    
+    if fields:
+        body["value"] = project(body["value"], parse_fields(fields))
     
-    if value is None:
-        raise HTTPException(status_code=404, detail=f"Memory key {key} not found")
+    if stream or (stream is None and should_stream(body["value"])):
+        return streaming_json_response(body)
     
-    return {"key": key, "value": value}
+    return body
 
-@app.post("/research", response_model=A2AResearchResponse)
-async def conduct_a2a_research(request: A2AResearchRequest):
+@router.post("/research", response_model=A2AResearchResponse)
+async def conduct_a2a_research(request: A2AResearchRequest, services: Services = Depends(get_services)):
     """
     Conduct research using A2A agents (simplified endpoint)
+    
+    The request counts against the rate limit and concurrency quota of its
+    user_id; over either, it is rejected with 429.
+    
+    Results are cached per user_id under the normalized query, type, depth and
+    sources: a repeated query returns the cached session's results immediately ("hit"),
+    a stale result is returned while it is refreshed in the background
+    ("stale"; the refresh counts against the user's limits), and identical
+    research in progress is joined ("joined").
+    Set refresh to run the research again.
     """
-    try:
-        from agent_server.reasoning.a2a_api import get_a2a_service
-        
-        # Get A2A service
-        service = await get_a2a_service()
+    async def research():
+        # Get A2A service (waits for its background warm-up)
+        service = await services.get_a2a_service()
         
         # Create research session
         session_id = await service.create_research_session(
@@ -173,20 +380,35 @@ async def conduct_a2a_research(request: A2AResearchRequest):
             depth=request.depth,
             sources=request.sources
         )
-        
-        return A2AResearchResponse(
-            session_id=session_id,
-            research_query=request.research_query,
-            status=result.get("status", "completed"),
-            results=result,
-            summary=result.get("summary", "Research completed successfully")
-        )
+        return session_id, result
     
+    try:
+        async with services.admission.admitted(request.user_id):
+            key = normalize_query(
+                request.research_query, request.research_type, request.depth, request.sources, scope=request.user_id
+            )
+            entry, outcome = await services.research_cache.get_or_research(
+                key, research, refresh=request.refresh,
+                refresh_guard=lambda: services.admission.admitted(request.user_id)
+            )
+    except AdmissionRejected as e:
+        raise admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"A2A research failed: {str(e)}")
+    
+    result = entry.result
+    return A2AResearchResponse(
+        session_id=entry.session_id,
+        research_query=request.research_query,
+        status=result.get("status", "completed"),
+        results=result,
+        summary=result.get("summary", "Research completed successfully"),
+        cache=outcome,
+        age_seconds=round(entry.age(), 3)
+    )
 
-@app.get("/")
-async def root():
+@router.get("/")
+async def root(services: Services = Depends(get_services)):
     """Root endpoint with basic server info"""
     return {
         "name": "Agent Server",
@@ -194,20 +416,144 @@ async def root():
         "description": "Agent Execution Server with A2A Research Capabilities",
         "endpoints": [
             {"path": "/execute", "method": "POST", "description": "Execute an agent task"},
-            {"path": "/status/{task_id}", "method": "GET", "description": "Get task status"},
-            {"path": "/memory/{key}", "method": "GET", "description": "Get memory item"},
-            {"path": "/research", "method": "POST", "description": "Conduct A2A research"},
+            {"path": "/status/{task_id}", "method": "GET", "description": "Get task status (ETag, ?wait=&since= long-poll, ?limit=&cursor=, ?fields=)"},
+            {"path": "/memory/{key}", "method": "GET", "description": "Get memory item (?memory_type=, ?limit=&cursor=, ?fields=)"},
+            {"path": "/research", "method": "POST", "description": "Conduct A2A research (cached per normalized query)"},
+            {"path": "/health", "method": "GET", "description": "Service readiness"},
+            {"path": "/metrics", "method": "GET", "description": "Prometheus metrics"},
+            {"path": "/trace/{task_id}", "method": "GET", "description": "Span tree of a task"},
+            {"path": "/debug/blocking", "method": "GET", "description": "Event-loop stalls and blocking functions"},
+            {"path": "/admin/tenants", "method": "GET", "description": "Per-tenant quotas and utilization"},
+            {"path": "/admin/executions", "method": "GET, DELETE", "description": "Aggregate past executions (?last=&group_by=&metrics=&status=&agent=&tenant=); DELETE ?before= drops old partitions"},
+            {"path": "/admin/research-cache", "method": "GET, DELETE", "description": "Research cache size and TTLs; DELETE clears it"},
             {"path": "/a2a-research/*", "method": "Various", "description": "A2A research endpoints"}
         ],
-        "services": {
-            "planning": "active",
-            "reasoning": "active", 
-            "memory": "active",
-            "workflow": "active",
-            "a2a_research": "active"
-        }
+        "services": services.health()["services"]
     }
 
+@router.get("/health")
+async def health(services: Services = Depends(get_services)):
+    """Health check reporting service readiness; never waits for warm-up"""
+    return services.health()
+
+@router.get("/metrics")
+async def metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/trace/{task_id}")
+async def get_trace(task_id: str):
+    """Get the span tree (with durations) of a task for a flamegraph view"""
+    tree = TRACER.get_tree(task_id)
+    
+    if tree is None:
+        raise HTTPException(status_code=404, detail=f"Trace {task_id} not found")
+    
+    return tree
+
+@router.get("/debug/blocking")
+async def debug_blocking(limit: int = 20, services: Services = Depends(get_services)):
+    """Get the event-loop stalls seen by the watchdog, ranked by blocked time"""
+    if services.watchdog is None:
+        raise HTTPException(status_code=404, detail="Event-loop watchdog is disabled")
+    
+    return services.watchdog.report(limit)
+
+@router.get("/admin/tenants")
+async def admin_tenants(services: Services = Depends(get_services)):
+    """Get each tenant's admission policy, in-flight requests, scheduler slots and tokens"""
+    return services.admission.snapshot()
+
+@router.get("/admin/executions")
+async def admin_executions(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    last: Optional[float] = None,
+    group_by: Optional[str] = None,
+    metrics: Optional[str] = None,
+    status: Optional[str] = None,
+    agent: Optional[str] = None,
+    tenant: Optional[str] = None,
+    memory: Memory = Depends(get_memory_service)
+):
+    """
+    Aggregate past executions, e.g. the mean duration per agent over the last
+    week: ?last=604800&group_by=agent&metrics=count,duration_mean
+    
+    since/until take epoch seconds or ISO 8601 times; last (seconds) overrides
+    since. status, agent and tenant filter on comma-separated values.
+    """
+    if last is not None:
+        since = str(time.time() - last)
+    filters = {
+        name: [value.strip() for value in values.split(",")]
+        for name, values in (("status", status), ("agent", agent), ("tenant", tenant)) if values
+    }
+    try:
+        groups = await memory.query_executions(
+            since=since, until=until, filters=filters, group_by=parse_fields(group_by), metrics=parse_fields(metrics)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"groups": groups, "store": memory.executions.summary()}
+
+@router.delete("/admin/executions")
+async def drop_executions(before: str, memory: Memory = Depends(get_memory_service)):
+    """Drop the time partitions of past executions that end before a time (epoch seconds or ISO 8601)"""
+    try:
+        dropped = await memory.drop_executions(before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"dropped": dropped, "store": memory.executions.summary()}
+
+@router.get("/admin/research-cache")
+async def admin_research_cache(services: Services = Depends(get_services)):
+    """Get the research cache size, in-progress research and TTLs per depth"""
+    return services.research_cache.snapshot()
+
+@router.delete("/admin/research-cache")
+async def clear_research_cache(services: Services = Depends(get_services)):
+    """Drop every cached research result"""
+    services.research_cache.invalidate()
+    return services.research_cache.snapshot()
+
+def create_app(services: Optional[Services] = None, include_a2a: bool = True) -> FastAPI:
+    """
+    Create the FastAPI application.
+    
+    Args:
+        services: Optional pre-built service container (e.g. for tests or benchmarks)
+        include_a2a: Whether to mount the A2A research router and warm up its service
+    
+    Returns:
+        The configured application
+    """
+    app = FastAPI(
+        title="Agent Server", 
+        description="Agent Execution Server with A2A Research Capabilities",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse
+    )
+    app.state.services = services or Services(include_a2a=include_a2a)
+    
+    app.include_router(router)
+    
+    # Include A2A research router
+    if include_a2a:
+        try:
+            from agent_server.agent_server.reasoning.a2a_api import router as a2a_router
+            app.include_router(a2a_router)
+        except ImportError as e:
+            app.state.services.status["a2a_research"] = "unavailable"
+            print(f"A2A research router unavailable: {str(e)}")
+    
+    return app
+
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
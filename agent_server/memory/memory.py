@@ -3,28 +3,125 @@ Memory Module
 
 This module is responsible for managing both long-term and short-term memory
 for the agent system, including storing and retrieving information.
+
+Persistence never touches the event loop: set() only bumps a generation
+counter and wakes a writer thread, which writes the latest snapshot atomically
+(temp file plus os.replace). Saves requested while a write is in progress
+collapse into one. Before each write the writer has the event loop copy the
+top two levels of memory (the ones set() changes in place), then serializes
+that copy off the loop. Await flush() at durability points. The storage file
+is read by load(), in a worker thread. The file is encoded
+with the compact serializer from agent_server.serialization unless a
+different one is passed in.
+
+Past executions are kept in a columnar ExecutionStore (agent_server.analytics)
+rather than as a list of dicts; query_executions() aggregates them. With a
+shared store, the columns cache its rows and each query only reads the rows
+appended since the previous one.
 """
-from typing import Dict, List, Optional, Any, Union
-import json
+from typing import Dict, List, Optional, Any, Tuple, Union
+import asyncio
+import atexit
+import concurrent.futures
+import math
 import os
+import threading
 import time
+import weakref
 from datetime import datetime
 
+from agent_server.state.state import CATEGORY_SEPARATOR
+from agent_server.metrics.metrics import REGISTRY, ERRORS, CACHE_REQUESTS, timed
+from agent_server.tracing.tracing import traced
+from agent_server.serialization.serialization import Serializer, get_serializer
+from agent_server.analytics.analytics import ExecutionStore, Timestamp, to_timestamp
+
+MEMORY_LATENCY = REGISTRY.histogram("agent_memory_operation_seconds", "Latency of Memory operations", ["operation"])
+MEMORY_KEYS = REGISTRY.gauge("agent_memory_keys", "Number of top-level memory keys", ["memory_type"])
+MEMORY_ERRORS = ERRORS.labels("memory")
+MEMORY_HITS = CACHE_REQUESTS.labels("memory", "hit")
+MEMORY_MISSES = CACHE_REQUESTS.labels("memory", "miss")
+
+# Categories checked (in order) when looking up a key, per memory type
+CATEGORIES = {
+    "short_term": ["intermediate_outcomes", "context", "recent_interactions", "chat_history"],
+    "long_term": ["retrieval_docs", "knowledge_database", "past_executions", "task_results"]
+}
+
+# Categories holding lists (appended to) rather than dicts (merged into)
+LIST_CATEGORIES = {"recent_interactions", "chat_history", "past_executions"}
+
+# Seconds the writer waits for the event loop's snapshot between liveness checks
+SNAPSHOT_POLL = 0.05
+
+# Seconds an idle writer thread waits for work before exiting
+WRITER_IDLE = 5.0
+
+# Memories with a running writer, closed (pending changes written) at exit
+_OPEN_MEMORIES: "weakref.WeakSet[Memory]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_memories() -> None:
+    """Write the pending changes of every memory at interpreter exit"""
+    for memory in list(_OPEN_MEMORIES):
+        memory.close()
+
+
+def _key_count(ref: "weakref.ref[Memory]", memory_type: str) -> float:
+    """Gauge callback: key count of the latest memory (NaN once it is collected)"""
+    memory = ref()
+    return memory._count_keys(memory_type) if memory is not None else math.nan
+
+
+def _copy_level(value: Any) -> Any:
+    """Shallow-copy a category (dicts and lists are mutated in place by set())"""
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
 class Memory:
     """
     Memory class for handling both long-term and short-term memory.
     """
     
-    def __init__(self):
-        """Initialize the memory module"""
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        autoload: bool = False,
+        store=None,
+        serializer: Optional[Serializer] = None,
+        executions: Optional[ExecutionStore] = None
+    ):
+        """
+        Initialize the memory module
+        
+        Args:
+            storage_path: Path of the JSON storage file (defaults to ./memory_storage.json)
+            autoload: Load the storage file synchronously now (by default it
+                is read off the event loop by load(), awaited on first use)
+            store: Optional shared SQLiteStateStore; when given, memory lives in
+                the store (shared across worker processes) instead of the JSON file
+            serializer: Optional serializer for the storage file (defaults to the
+                compact process-wide one; use get_serializer(pretty=True) for an
+                indented file)
+            executions: Optional columnar store of past executions (defaults
+                to an empty one with the retention from the environment)
+        """
         # Long-term memory store
         self.long_term_memory = {
             "retrieval_docs": {},
             "knowledge_database": {},
-            "past_executions": [],
             "task_results": {}
         }
         
+        # Past executions, stored column by column in time partitions (with a
+        # shared store, a cache of its rows up to sequence number _executions_seq)
+        self.executions = executions or ExecutionStore.from_env()
+        self._executions_seq = 0
+        
         # Short-term memory store
         self.short_term_memory = {
             "intermediate_outcomes": {},
@@ -34,11 +131,57 @@ class Memory:
         }
         
         # File path for persistent storage
-        self.storage_path = os.path.join(os.getcwd(), "memory_storage.json")
+        self.storage_path = storage_path or os.path.join(os.getcwd(), "memory_storage.json")
+        
+        # Shared state backend (multi-worker mode)
+        self.store = store
+        self.serializer = serializer or get_serializer()
         
-        # Load existing memory if available
-        self._load_memory()
+        # Background persistence: generations requested vs. written to disk
+        self._save_condition = threading.Condition()
+        self._requested_generation = 0
+        self._saved_generation = 0
+        self._save_error: Optional[Exception] = None
+        self._writer: Optional[threading.Thread] = None
+        self._closing = False
+        
+        # Loop owning the memory dicts; the writer has it take the snapshots
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._closing_on_loop = False
+        
+        # Top-level key counts of the shared store, refreshed off the loop by
+        # load() and this worker's writes (scrapes only read them)
+        self.key_counts = {memory_type: len(categories) for memory_type, categories in CATEGORIES.items()}
+        
+        # Load existing memory (with a shared store, just its key counts)
+        self.loaded = False
+        self._load_task = None
+        if autoload:
+            self._load_memory()
+            self.loaded = True
+        
+        # Key counts are read at scrape time, never on the hot path; the gauge
+        # holds no reference keeping this memory alive
+        ref = weakref.ref(self)
+        for memory_type in CATEGORIES:
+            MEMORY_KEYS.labels(memory_type).set_function(lambda memory_type=memory_type: _key_count(ref, memory_type))
     
+    async def load(self) -> None:
+        """
+        Load persisted memory in a worker thread. Safe to call concurrently;
+        the file (or, with a shared store, its key counts) is read once and
+        every caller waits for the same load.
+        """
+        if self.loaded:
+            return
+        if self._load_task is None:
+            self._load_task = asyncio.ensure_future(asyncio.to_thread(self._load_memory))
+        await asyncio.shield(self._load_task)
+        self.loaded = True
+    
+    @timed(MEMORY_LATENCY.labels("get"), errors=MEMORY_ERRORS)
+    @traced("memory.get")
     async def get(self, key: str, memory_type: str = "short_term") -> Optional[Any]:
         """
         Retrieve a value from memory.
@@ -50,6 +193,59 @@ class Memory:
         Returns:
             The value associated with the key, or None if not found
         """
+        value = await self._get(key, memory_type)
+        if value is None:
+            MEMORY_MISSES.value += 1
+        else:
+            MEMORY_HITS.value += 1
+        return value
+    
+    @timed(MEMORY_LATENCY.labels("get_page"), errors=MEMORY_ERRORS)
+    @traced("memory.get_page")
+    async def get_page(self, key: str, offset: int = 0, limit: int = 100, memory_type: str = "short_term") -> Optional[Tuple[Any, bool]]:
+        """
+        Retrieve one page of a list-valued entry. Other values are returned whole.
+        
+        Args:
+            key: The key to retrieve
+            offset: Index of the first list item
+            limit: Maximum number of list items
+            memory_type: The type of memory to access ("short_term" or "long_term")
+        
+        Returns:
+            A (value, has_more) tuple, or None if not found
+        """
+        if self.store is not None and key in LIST_CATEGORIES and key in CATEGORIES.get(memory_type, []):
+            if not self.loaded:
+                await self.load()
+            # Only the requested page is read from the shared store
+            items = await asyncio.to_thread(self.store.memory_get_list, memory_type, key, offset, limit + 1)
+            MEMORY_HITS.value += 1
+            return items[:limit], len(items) > limit
+        
+        if self.store is None and key == "past_executions" and memory_type == "long_term":
+            if not self.loaded:
+                await self.load()
+            # Only the requested rows are decoded from the columns
+            items = self.executions.records(offset, limit + 1)
+            MEMORY_HITS.value += 1
+            return items[:limit], len(items) > limit
+        
+        value = await self.get(key, memory_type)
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return value[offset:offset + limit], offset + limit < len(value)
+        return value, False
+    
+    async def _get(self, key: str, memory_type: str) -> Optional[Any]:
+        """Look up a key (see get())"""
+        if not self.loaded:
+            await self.load()
+        
+        if self.store is not None:
+            return await asyncio.to_thread(self._store_get, key, memory_type)
+        
         if memory_type == "short_term":
             # Try to get from specific short-term categories first
             for category in ["intermediate_outcomes", "context", "recent_interactions", "chat_history"]:
@@ -62,6 +258,9 @@ class Memory:
             return self.short_term_memory.get(key)
         
         elif memory_type == "long_term":
+            if key == "past_executions":
+                return self.executions.records()
+            
             # Try to get from specific long-term categories first
             for category in ["retrieval_docs", "knowledge_database", "past_executions", "task_results"]:
                 if category == key:
@@ -74,6 +273,8 @@ class Memory:
         
         return None
     
+    @timed(MEMORY_LATENCY.labels("set"), errors=MEMORY_ERRORS)
+    @traced("memory.set")
     async def set(self, key: str, value: Any, memory_type: str = "short_term") -> bool:
         """
         Store a value in memory.
@@ -86,7 +287,14 @@ class Memory:
         Returns:
             True if successful, False otherwise
         """
+        if not self.loaded:
+            await self.load()
+        
         try:
+            if self.store is not None:
+                await asyncio.to_thread(self._store_set, key, value, memory_type)
+                return True
+            
             if memory_type == "short_term":
                 # Handle special keys
                 if key == "context":
@@ -113,9 +321,9 @@ class Memory:
                     self.long_term_memory["task_results"].update(value if isinstance(value, dict) else {key: value})
                 elif key == "past_executions":
                     if isinstance(value, list):
-                        self.long_term_memory["past_executions"].extend(value)
+                        self.executions.extend(value)
                     else:
-                        self.long_term_memory["past_executions"].append(value)
+                        self.executions.append(value)
                 elif key == "knowledge_database":
                     self.long_term_memory["knowledge_database"].update(value if isinstance(value, dict) else {key: value})
                 elif key == "retrieval_docs":
@@ -124,14 +332,112 @@ class Memory:
                     # Direct key-value
                     self.long_term_memory[key] = value
             
-            # Save memory to storage
-            self._save_memory()
+            # Save memory to storage (in the background)
+            self._request_save()
             return True
         
         except Exception as e:
+            MEMORY_ERRORS.inc()
             print(f"Error setting memory: {str(e)}")
             return False
     
+    @timed(MEMORY_LATENCY.labels("query_executions"), errors=MEMORY_ERRORS)
+    @traced("memory.query_executions")
+    async def query_executions(
+        self,
+        since: Timestamp = None,
+        until: Timestamp = None,
+        filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+        group_by: Optional[List[str]] = None,
+        metrics: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate past executions (see ExecutionStore.query()).
+        
+        Args:
+            since: Only executions at or after this time (epoch seconds or ISO 8601)
+            until: Only executions before this time
+            filters: Allowed values per column (status, agent, tenant)
+            group_by: Columns to group by (status, agent, tenant)
+            metrics: Aggregates to compute (count, duration_mean, duration_p95, ...)
+        
+        Returns:
+            One dict per group with its column values and metrics
+        
+        Raises:
+            ValueError: On an unknown column, metric or time value
+        """
+        if not self.loaded:
+            await self.load()
+        
+        if self.store is not None:
+            # The shared store keeps rows; only the ones appended since the
+            # last query are read and added to the cached columns
+            rows = await asyncio.to_thread(self.store.memory_list_since, "long_term", "past_executions", self._executions_seq)
+            for seq, record in rows:
+                # A concurrent query may have added them while this one read
+                if seq > self._executions_seq:
+                    self.executions.append(record)
+                    self._executions_seq = seq
+        return self.executions.query(since=since, until=until, filters=filters, group_by=group_by, metrics=metrics)
+    
+    async def drop_executions(self, before: Timestamp) -> int:
+        """
+        Drop the time partitions of past executions that end before a point in time.
+        With a shared store, the rows of those partitions are deleted from it.
+        
+        Args:
+            before: The cut-off time (epoch seconds or ISO 8601)
+        
+        Returns:
+            The number of executions dropped
+        """
+        if not self.loaded:
+            await self.load()
+        
+        if self.store is not None:
+            # Rows of the partitions ending before the cut-off, as in drop_before()
+            segment_seconds = self.executions.segment_seconds
+            boundary = math.floor(to_timestamp(before) / segment_seconds) * segment_seconds
+            dropped = await asyncio.to_thread(self.store.memory_list_drop_before, "long_term", "past_executions", boundary)
+            self.executions.drop_before(before)
+            return dropped
+        
+        dropped = self.executions.drop_before(before)
+        if dropped:
+            self._request_save()
+        return dropped
+    
+    async def flush(self) -> bool:
+        """
+        Wait until every change made so far has been written to the storage file.
+        
+        Returns:
+            True if the latest write succeeded, False otherwise
+        """
+        if self.store is not None:
+            return True
+        
+        with self._save_condition:
+            generation = self._requested_generation
+            if self._saved_generation >= generation:
+                return self._save_error is None
+        
+        await asyncio.to_thread(self._wait_saved, generation)
+        return self._save_error is None
+    
+    def close(self) -> None:
+        """Write any pending changes and stop the writer thread"""
+        with self._save_condition:
+            self._closing = True
+            # Called on the loop thread, the loop cannot take the last snapshot
+            # (and cannot change memory while this waits)
+            self._closing_on_loop = threading.get_ident() == self._loop_thread_id
+            writer = self._writer
+            self._save_condition.notify_all()
+        if writer is not None and writer is not threading.current_thread():
+            writer.join()
+    
     async def clear_short_term(self) -> bool:
         """
         Clear short-term memory while preserving long-term memory.
@@ -139,14 +445,21 @@ class Memory:
         Returns:
             True if successful, False otherwise
         """
+        if not self.loaded:
+            await self.load()
+        
         try:
+            if self.store is not None:
+                await asyncio.to_thread(self._store_clear, "short_term")
+                return True
+            
             self.short_term_memory = {
                 "intermediate_outcomes": {},
                 "recent_interactions": [],
                 "context": {},
                 "chat_history": []
             }
-            self._save_memory()
+            self._request_save()
             return True
         except Exception as e:
             print(f"Error clearing short-term memory: {str(e)}")
@@ -234,43 +547,209 @@ class Memory:
         Returns:
             List of matching keys
         """
+        if not self.loaded:
+            await self.load()
+        
         matching_keys = []
         
+        if self.store is not None:
+            short_term_keys = CATEGORIES["short_term"] + await asyncio.to_thread(self.store.memory_keys, "short_term")
+            long_term_keys = CATEGORIES["long_term"] + await asyncio.to_thread(self.store.memory_keys, "long_term")
+        else:
+            short_term_keys = self.short_term_memory.keys()
+            long_term_keys = self.long_term_memory.keys()
+        
         # Check short-term memory
-        for key in self.short_term_memory.keys():
+        for key in short_term_keys:
             if pattern.replace("*", "") in key:
                 matching_keys.append(key)
         
         # Check long-term memory
-        for key in self.long_term_memory.keys():
+        for key in long_term_keys:
             if pattern.replace("*", "") in key:
                 matching_keys.append(key)
         
         return matching_keys
     
+    def _store_get(self, key: str, memory_type: str) -> Optional[Any]:
+        """Look up a key in the shared store, with the same precedence as the in-process lookup"""
+        categories = CATEGORIES.get(memory_type)
+        if categories is None:
+            return None
+        
+        if key in categories:
+            if key in LIST_CATEGORIES:
+                return self.store.memory_get_list(memory_type, key)
+            return self.store.memory_get_category(memory_type, key)
+        
+        candidates = [
+            f"{category}{CATEGORY_SEPARATOR}{key}"
+            for category in categories if category not in LIST_CATEGORIES
+        ]
+        candidates.append(key)
+        found = self.store.memory_get_many(memory_type, candidates)
+        for candidate in candidates:
+            if candidate in found:
+                return found[candidate]
+        return None
+    
+    def _store_set(self, key: str, value: Any, memory_type: str) -> None:
+        """Write a key to the shared store, merging into categories like the in-process set"""
+        categories = CATEGORIES.get(memory_type)
+        if categories is None:
+            return
+        
+        if key in LIST_CATEGORIES and key in categories:
+            self.store.memory_append(memory_type, key, value if isinstance(value, list) else [value])
+        elif key in categories:
+            entries = value if isinstance(value, dict) else {key: value}
+            self.store.memory_set_many(memory_type, {
+                f"{key}{CATEGORY_SEPARATOR}{entry_key}": entry_value
+                for entry_key, entry_value in entries.items()
+            })
+        else:
+            self.store.memory_set_many(memory_type, {key: value})
+            self._refresh_key_counts(memory_type)
+    
+    def _store_clear(self, memory_type: str) -> None:
+        """Clear a memory type of the shared store"""
+        self.store.memory_clear(memory_type)
+        self._refresh_key_counts(memory_type)
+    
+    def _refresh_key_counts(self, *memory_types: str) -> None:
+        """Recount the top-level keys of the shared store (in a worker thread)"""
+        for memory_type in memory_types:
+            self.key_counts[memory_type] = len(CATEGORIES[memory_type]) + self.store.memory_key_count(memory_type)
+    
+    def _count_keys(self, memory_type: str) -> int:
+        """Count the top-level keys of a memory type"""
+        if self.store is not None:
+            return self.key_counts[memory_type]
+        return len(self.short_term_memory if memory_type == "short_term" else self.long_term_memory)
+    
+    def _request_save(self) -> None:
+        """Schedule a save of the current memory on the writer thread"""
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+        except RuntimeError:
+            self._loop = None
+        with self._save_condition:
+            self._requested_generation += 1
+            if self._writer is None:
+                self._closing = False
+                self._closing_on_loop = False
+                self._writer = threading.Thread(target=self._writer_loop, name="memory-writer", daemon=True)
+                self._writer.start()
+                _OPEN_MEMORIES.add(self)
+            self._save_condition.notify_all()
+    
+    def _writer_loop(self) -> None:
+        """Writer thread: write the latest generation until closed or idle with nothing pending"""
+        while True:
+            with self._save_condition:
+                while self._saved_generation >= self._requested_generation and not self._closing:
+                    # Exiting when idle lets an unused memory be collected
+                    if not self._save_condition.wait(WRITER_IDLE) and self._saved_generation >= self._requested_generation:
+                        break
+                if self._saved_generation >= self._requested_generation:
+                    self._writer = None
+                    _OPEN_MEMORIES.discard(self)
+                    self._save_condition.notify_all()
+                    return
+                # Every request up to here is covered by the snapshot written below
+                generation = self._requested_generation
+            
+            self._save_memory()
+            
+            with self._save_condition:
+                self._saved_generation = generation
+                self._save_condition.notify_all()
+    
+    def _wait_saved(self, generation: int) -> None:
+        """Block until the given generation has been written (or the writer stopped)"""
+        with self._save_condition:
+            while self._saved_generation < generation and self._writer is not None:
+                self._save_condition.wait()
+    
+    def _snapshot(self) -> Dict[str, Any]:
+        """Copy the top two levels of memory (cheap; called on the event loop)"""
+        return {
+            memory_type: {key: _copy_level(value) for key, value in dict(memory).items()}
+            for memory_type, memory in (("long_term", self.long_term_memory), ("short_term", self.short_term_memory))
+        }
+    
+    def _loop_snapshot(self) -> Dict[str, Any]:
+        """
+        Take a snapshot on the event loop that changes memory, from the writer
+        thread. Without a running loop nothing changes memory concurrently, so
+        the snapshot is taken here.
+        """
+        loop = self._loop
+        if loop is None or self._closing_on_loop:
+            return self._snapshot()
+        
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        
+        def take() -> None:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self._snapshot())
+                except Exception as e:
+                    future.set_exception(e)
+        
+        try:
+            loop.call_soon_threadsafe(take)
+        except RuntimeError:
+            # The loop is closed
+            return self._snapshot()
+        
+        while True:
+            try:
+                return future.result(timeout=SNAPSHOT_POLL)
+            except concurrent.futures.TimeoutError:
+                if (not loop.is_running() or self._closing_on_loop) and future.cancel():
+                    return self._snapshot()
+    
+    @timed(MEMORY_LATENCY.labels("save"))
     def _save_memory(self) -> None:
-        """Save memory to persistent storage"""
+        """Write memory to persistent storage atomically (runs on the writer thread)"""
         try:
-            memory_data = {
-                "long_term": self.long_term_memory,
-                "short_term": self.short_term_memory,
+            payload = self.serializer.dumps({
+                **self._loop_snapshot(),
+                "executions": self.executions.to_dict(),
                 "last_updated": datetime.now().isoformat()
-            }
+            })
             
-            with open(self.storage_path, 'w') as f:
-                json.dump(memory_data, f, indent=2)
+            temp_path = f"{self.storage_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.storage_path)
+            self._save_error = None
         except Exception as e:
+            self._save_error = e
+            MEMORY_ERRORS.inc()
             print(f"Error saving memory: {str(e)}")
     
     def _load_memory(self) -> None:
         """Load memory from persistent storage"""
+        if self.store is not None:
+            self._refresh_key_counts(*CATEGORIES)
+            return
         try:
             if os.path.exists(self.storage_path):
-                with open(self.storage_path, 'r') as f:
-                    memory_data = json.load(f)
+                with open(self.storage_path, 'rb') as f:
+                    memory_data = self.serializer.loads(f.read())
+                
+                if "executions" in memory_data:
+                    self.executions = ExecutionStore.from_dict(memory_data["executions"], self.executions.retention_seconds)
                 
                 if "long_term" in memory_data:
                     self.long_term_memory = memory_data["long_term"]
+                    # Snapshots written before the columnar store hold a list
+                    self.executions.extend(self.long_term_memory.pop("past_executions", None) or [])
                 
                 if "short_term" in memory_data:
                     self.short_term_memory = memory_data["short_term"]
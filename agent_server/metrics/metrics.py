@@ -0,0 +1,347 @@
+"""
+Metrics Module
+
+This module is responsible for the in-process metrics registry: counters,
+gauges and histograms rendered in the Prometheus text exposition format at
+GET /metrics.
+
+Metric updates are plain attribute and list-slot increments with no locks and
+no per-call allocation beyond the observed value itself. They are meant to be
+made from the event loop thread; increments made concurrently from several
+threads may occasionally be lost, which is acceptable for monitoring data.
+Labelled children should be bound once (e.g. at module level) with labels()
+so the hot path does not look them up on every call.
+"""
+from typing import Dict, List, Optional, Any, Callable, Sequence, Tuple
+from bisect import bisect_left
+import functools
+import inspect
+import math
+import time
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value for the exposition format"""
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format a label set, e.g. {component="memory",le="0.5"}"""
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+class CounterValue:
+    """A single counter time series"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the counter"""
+        self.value += amount
+
+
+class GaugeValue:
+    """A single gauge time series, either set directly or computed at scrape time"""
+
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        """Set the gauge"""
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the gauge"""
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrease the gauge"""
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the gauge by calling function at scrape time"""
+        self.function = function
+
+    def get(self) -> float:
+        """Get the current value"""
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class HistogramValue:
+    """A single histogram time series"""
+
+    __slots__ = ("upper_bounds", "counts", "sum", "count")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # One slot per bucket plus the +Inf bucket; cumulated at render time
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record an observation"""
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """
+    A metric family: a name, help text, label names and one child per label set.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels (empty for an unlabelled metric)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        self._default = None if self.labelnames else self.labels()
+
+    def labels(self, *values: Any) -> Any:
+        """
+        Get (creating if needed) the child for a label set.
+
+        Args:
+            *values: Label values, in the order of labelnames
+
+        Returns:
+            The child time series
+        """
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._new_child()
+            self.children[key] = child
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Render the family in the text exposition format"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self.children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: Tuple[str, ...], child: Any) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing counter"""
+
+    kind = "counter"
+
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the unlabelled counter"""
+        self._default.value += amount
+
+    def _render_child(self, key: Tuple[str, ...], child: CounterValue) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> GaugeValue:
+        return GaugeValue()
+
+    def set(self, value: float) -> None:
+        """Set the unlabelled gauge"""
+        self._default.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the unlabelled gauge"""
+        self._default.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrease the unlabelled gauge"""
+        self._default.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the unlabelled gauge at scrape time"""
+        self._default.function = function
+
+    def _render_child(self, key: Tuple[str, ...], child: GaugeValue) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"]
+
+
+class Histogram(Metric):
+    """Distribution of observed values in fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels
+            buckets: Bucket upper bounds (sorted, without +Inf)
+        """
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> HistogramValue:
+        return HistogramValue(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        """Record an observation on the unlabelled histogram"""
+        self._default.observe(value)
+
+    def _render_child(self, key: Tuple[str, ...], child: HistogramValue) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.upper_bounds + (math.inf,), list(child.counts)):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    MetricsRegistry class holding every metric family of the process.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self.metrics: Dict[str, Metric] = {}
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs: Any) -> Any:
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = cls(name, documentation, labelnames, **kwargs)
+            self.metrics[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Get or create a counter"""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Get or create a gauge"""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            The exposition text
+        """
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide default registry
+REGISTRY = MetricsRegistry()
+
+# Shared families used across modules
+ERRORS = REGISTRY.counter("agent_errors_total", "Errors raised or recorded, by component", ["component"])
+CACHE_REQUESTS = REGISTRY.counter("agent_cache_requests_total", "Cache lookups, by cache and result (hit/miss)", ["cache", "result"])
+
+
+def timed(histogram: Any, errors: Optional[CounterValue] = None) -> Callable:
+    """
+    Decorator recording a function's latency (in seconds) on a histogram.
+
+    Args:
+        histogram: A Histogram or a bound HistogramValue child
+        errors: Optional counter child incremented when the call raises;
+            cancellation (e.g. a client disconnect) is not counted
+
+    Returns:
+        The decorator; works for both coroutine and plain functions
+    """
+    observe = histogram.observe
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    if errors is not None:
+                        errors.value += 1
+                    raise
+                finally:
+                    observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.value += 1
+                raise
+            finally:
+                observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,223 @@
+"""
+Pagination Module
+
+This module is responsible for keeping large API responses small: cursor
+pagination over list values (workflow results, list-valued memory entries),
+field projection of dict values, and chunked streaming of JSON documents too
+large to serialize in one piece.
+
+Cursors are opaque URL-safe strings encoding an offset. Lists served through
+them only grow at the end (workflow results, memory lists), so a cursor stays
+valid while the list keeps growing.
+"""
+from typing import Dict, List, Optional, Any, AsyncIterator, Iterator, Sequence, Tuple
+import asyncio
+import base64
+import binascii
+
+from starlette.responses import StreamingResponse
+
+from agent_server.serialization.serialization import SERIALIZER
+
+# Page size when a cursor is given without a limit, and the largest page served
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Lists/dicts with more elements than this are streamed instead of rendered whole
+STREAM_THRESHOLD = 1000
+
+# Bytes buffered before a streamed chunk is sent
+CHUNK_SIZE = 64 * 1024
+
+
+def encode_cursor(offset: int) -> str:
+    """
+    Encode an offset as an opaque cursor.
+
+    Args:
+        offset: Index of the first item of the next page
+
+    Returns:
+        The cursor string
+    """
+    return base64.urlsafe_b64encode(SERIALIZER.dumps({"offset": offset})).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Args:
+        cursor: The cursor string
+
+    Returns:
+        The offset
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        data = SERIALIZER.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = data["offset"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset
+
+
+def page_bounds(cursor: Optional[str], limit: Optional[int]) -> Tuple[int, int]:
+    """
+    Resolve request parameters into an (offset, limit) pair.
+
+    Args:
+        cursor: Optional cursor (start from the beginning when missing)
+        limit: Optional page size (clamped to 1..MAX_LIMIT)
+
+    Returns:
+        The offset and the page size
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    offset = decode_cursor(cursor) if cursor else 0
+    limit = DEFAULT_LIMIT if limit is None else max(1, min(limit, MAX_LIMIT))
+    return offset, limit
+
+
+def paginate(items: Sequence[Any], offset: int, limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Slice one page out of a list.
+
+    Args:
+        items: The full list
+        offset: Index of the first item
+        limit: Page size
+
+    Returns:
+        The page and the cursor of the next page (None on the last page)
+    """
+    page = list(items[offset:offset + limit])
+    end = offset + len(page)
+    return page, encode_cursor(end) if end < len(items) else None
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated ?fields= parameter.
+
+    Args:
+        fields: e.g. "status,current_task_index,result.confidence"
+
+    Returns:
+        The field paths, or None when no projection was requested
+    """
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def project(value: Any, fields: Optional[List[str]]) -> Any:
+    """
+    Keep only the given fields of a dict. Dotted paths select nested fields
+    (applied to each element of nested lists); missing fields are left out.
+
+    Args:
+        value: The value to project (other values are returned unchanged)
+        fields: Field paths from parse_fields()
+
+    Returns:
+        The projected value
+    """
+    if fields and isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if not fields or not isinstance(value, dict):
+        return value
+
+    projected: Dict[str, Any] = {}
+    for field in fields:
+        head, _, rest = field.partition(".")
+        if head not in value:
+            continue
+        if rest:
+            nested = project(value[head], [rest])
+            previous = projected.get(head)
+            if isinstance(nested, dict) and isinstance(previous, dict):
+                previous.update(nested)
+            elif isinstance(nested, list) and isinstance(previous, list) and len(previous) == len(nested):
+                for merged, item in zip(previous, nested):
+                    if isinstance(merged, dict) and isinstance(item, dict):
+                        merged.update(item)
+            else:
+                projected[head] = nested
+        else:
+            projected[head] = value[head]
+    return projected
+
+
+def should_stream(value: Any) -> bool:
+    """Whether a value is large enough (by element count) to be streamed"""
+    return isinstance(value, (list, dict)) and len(value) > STREAM_THRESHOLD
+
+
+def _json_pieces(value: Any, depth: int) -> Iterator[bytes]:
+    """Encode a value piecewise: containers down to depth are split per element"""
+    if depth <= 0 or not isinstance(value, (list, dict)):
+        yield SERIALIZER.dumps(value)
+        return
+
+    # Shallow copies keep iteration safe while the loop mutates the original
+    if isinstance(value, dict):
+        yield b"{"
+        for i, (key, item) in enumerate(list(value.items())):
+            yield (b"," if i else b"") + SERIALIZER.dumps(str(key)) + b":"
+            yield from _json_pieces(item, depth - 1)
+        yield b"}"
+    else:
+        yield b"["
+        for i, item in enumerate(list(value)):
+            if i:
+                yield b","
+            yield from _json_pieces(item, depth - 1)
+        yield b"]"
+
+
+async def iter_json(value: Any, chunk_size: int = CHUNK_SIZE, depth: int = 3) -> AsyncIterator[bytes]:
+    """
+    Encode a value as a stream of JSON chunks, yielding to the event loop
+    between chunks.
+
+    Args:
+        value: The value to encode
+        chunk_size: Bytes buffered per chunk
+        depth: Container levels encoded element by element
+
+    Yields:
+        Chunks of the JSON document
+    """
+    buffer: List[bytes] = []
+    size = 0
+    for piece in _json_pieces(value, depth):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+            await asyncio.sleep(0)
+    if buffer:
+        yield b"".join(buffer)
+
+
+def streaming_json_response(value: Any, headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Build a chunked JSON response.
+
+    Args:
+        value: The document to stream
+        headers: Optional extra response headers
+
+    Returns:
+        The streaming response
+    """
+    return StreamingResponse(iter_json(value), media_type="application/json", headers=headers)
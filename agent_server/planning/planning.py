@@ -3,15 +3,139 @@ Planning Module
 
 This module is responsible for generating plans based on agent goals, roles, and tasks.
 It creates a structured plan with sub-tasks and actions to be executed.
+
+Plans are hierarchical: a task that lists several parts (explicit "subtasks",
+or a task text holding a marked list with one "- ", "* " or "1. " item per
+line) expands into a sub-plan, and so can each part, down to a depth budget.
+Free text is never split on punctuation or plain line breaks. Every plan node
+carries an id, dependency edges to its earlier siblings, an estimated cost and
+a parallelism hint (how many of its siblings may run at once). Nodes over the
+width budget are grouped, so a plan never has more than max_width ** max_depth
+leaves.
+
+The leaves are also returned as a flat sub_task_queue in dependency order,
+with depends_on given as indices into that queue, and with the id of the
+parallel sub-plan whose hint they carry as parallel_group; Workflow runs it
+as a DAG, enforcing each hint within its group.
 """
-from typing import Dict, List, Optional, Any
-import uuid
+from typing import Dict, List, Optional, Any, Tuple, Union
+import re
+
+from agent_server.metrics.metrics import REGISTRY, ERRORS, timed
+from agent_server.tracing.tracing import traced
+
+PLAN_LATENCY = REGISTRY.histogram("agent_planning_generate_plan_seconds", "Latency of Planning.generate_plan")
+PLAN_LEAVES = REGISTRY.histogram(
+    "agent_planning_plan_leaves", "Executable tasks per generated plan", buckets=(1, 3, 5, 10, 20, 50, 100, 250, 500)
+)
+
+# Default planning budgets: levels of expansion below the work node, and
+# children per node
+MAX_DEPTH = 2
+MAX_WIDTH = 8
+
+# A line starting a list item ("- ", "* ", "1. " or "1) ") of a task text
+LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*])\s+(.*\S)")
+
+Spec = Union[str, Dict[str, Any]]
+
+
+def split_task(task: str) -> List[str]:
+    """
+    Split a task text into the items of the list it holds. Only explicitly
+    marked list items count as parts; unmarked lines after an item continue
+    it, and text before the first item (such as a heading) is not a part.
+
+    Args:
+        task: The task text
+
+    Returns:
+        The list items (the whole text as a single part when it does not
+        list at least two)
+    """
+    parts: List[str] = []
+    for line in task.strip().splitlines():
+        match = LIST_ITEM.match(line)
+        if match:
+            parts.append(match.group(1))
+        elif parts and line.strip():
+            parts[-1] = f"{parts[-1]} {line.strip()}"
+    return parts if len(parts) >= 2 else [task.strip()]
+
+
+def estimate_cost(text: str) -> float:
+    """Estimate the cost of a leaf task in reasoning calls (longer tasks cost more)"""
+    return round(1.0 + len(text.split()) / 20, 2)
+
+
+def flatten_plan(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Turn a hierarchical plan into the flat queue of its leaves.
+
+    A leaf depends on everything its own node and its ancestors depend on;
+    a dependency on a sub-plan is a dependency on all of that sub-plan's
+    leaves. Leaves come out in depth-first order, so every dependency index
+    is smaller than the index of the task depending on it. A leaf's
+    parallelism is the number of leaves of the largest parallel sub-plan it
+    belongs to, whose id is its parallel_group (1 and None when it runs
+    alone).
+
+    Args:
+        plan: The root plan node
+
+    Returns:
+        The leaf tasks, with depends_on as indices into the returned list
+    """
+    leaves: List[Dict[str, Any]] = []
+    leaf_indices: Dict[str, List[int]] = {}
+
+    def visit(node: Dict[str, Any], inherited: List[int]) -> List[int]:
+        depends_on = sorted(set(inherited).union(*(leaf_indices[dependency] for dependency in node["depends_on"])))
+        if not node["children"]:
+            leaves.append({
+                "id": node["id"],
+                "task_description": node["task_description"],
+                "responsible_agent": node["responsible_agent"],
+                "required_tool": node["required_tool"],
+                "expected_output": node["expected_output"],
+                "depends_on": depends_on,
+                "estimated_cost": node["estimated_cost"],
+                "parallelism": 1,
+                "parallel_group": None,
+                "depth": node["depth"]
+            })
+            indices = [len(leaves) - 1]
+        else:
+            indices = []
+            for child in node["children"]:
+                indices += visit(child, depends_on)
+            if node["parallelism"] > 1:
+                for index in indices:
+                    if len(indices) > leaves[index]["parallelism"]:
+                        leaves[index]["parallelism"] = len(indices)
+                        leaves[index]["parallel_group"] = node["id"]
+        leaf_indices[node["id"]] = indices
+        return indices
+
+    visit(plan, [])
+    return leaves
+
+
+def critical_path_cost(queue: List[Dict[str, Any]]) -> float:
+    """Cost of the most expensive dependency chain of a flat queue (its minimum makespan)"""
+    finish: List[float] = []
+    for task in queue:
+        finish.append(max((finish[i] for i in task["depends_on"]), default=0.0) + task["estimated_cost"])
+    return round(max(finish, default=0.0), 2)
+
 
 class Planning:
     """
     Planning class for generating execution plans based on agent input.
     """
     
+    @timed(PLAN_LATENCY, errors=ERRORS.labels("planning"))
+    @traced("planning.generate_plan")
     async def generate_plan(self, planning_input: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate a plan based on the provided input.
@@ -23,39 +147,56 @@ class Planning:
                 - task: The specific task to accomplish
                 - tool: The tool to use (optional)
                 - expected_output: The expected output (optional)
+                - subtasks: Parts of the task (optional); each a string or a
+                  dict with "task" and its own "subtasks"
+                - max_depth: Expansion depth budget (optional)
+                - max_width: Children per node budget (optional)
         
         Returns:
             A dictionary containing:
-                - sub_task_queue: A list of sub-tasks to execute
+                - sub_task_queue: A list of sub-tasks to execute (the plan's
+                  leaves, with id, depends_on, estimated_cost, parallelism
+                  and parallel_group)
                 - actions: A list of actions to execute
+                - plan: The hierarchical plan
+                - estimated_cost: Total estimated cost of the leaves
+                - critical_path_cost: Estimated cost of the longest dependency chain
+                - parallelism: Largest number of tasks that may run at once
         """
-        # For demo purposes, we'll create a simple plan
+        # For demo purposes, we'll decompose the task text heuristically
         # In a real implementation, this would use LLMs or other planning algorithms
         
         agent_goal = planning_input.get("agent_goal", "")
         task = planning_input.get("task", "")
+        tool = planning_input.get("tool")
+        max_depth = planning_input.get("max_depth")
+        max_width = planning_input.get("max_width")
+        max_depth = MAX_DEPTH if max_depth is None else max(0, int(max_depth))
+        max_width = MAX_WIDTH if max_width is None else max(2, int(max_width))
         
-        # Create a simple sub-task queue
-        sub_task_queue = [
-            {
-                "task_description": f"Analyze the task: {task}",
-                "responsible_agent": "analyzer",
-                "required_tool": None,
-                "expected_output": "Task analysis"
-            },
-            {
-                "task_description": f"Execute the task: {task}",
-                "responsible_agent": "executor",
-                "required_tool": planning_input.get("tool"),
-                "expected_output": "Task result"
-            },
-            {
-                "task_description": f"Verify the result matches the goal: {agent_goal}",
-                "responsible_agent": "verifier",
-                "required_tool": None,
-                "expected_output": "Verification result"
-            }
-        ]
+        # Analyze, then do the work (a sub-plan when the task has several parts), then verify
+        analyze = self._leaf("plan.analyze", f"Analyze the task: {task}", "analyzer", None, "Task analysis", 1)
+        work = self._expand(
+            {"task": task, "subtasks": planning_input.get("subtasks")}, "plan.execute", 1, max_depth, max_width, tool
+        )
+        verify = self._leaf("plan.verify", f"Verify the result matches the goal: {agent_goal}", "verifier", None, "Verification result", 1)
+        work["depends_on"] = [analyze["id"]]
+        verify["depends_on"] = [work["id"]]
+        
+        plan = {
+            "id": "plan",
+            "task_description": task,
+            "responsible_agent": None,
+            "required_tool": tool,
+            "expected_output": planning_input.get("expected_output"),
+            "depends_on": [],
+            "estimated_cost": round(analyze["estimated_cost"] + work["estimated_cost"] + verify["estimated_cost"], 2),
+            "parallelism": 1,
+            "depth": 0,
+            "children": [analyze, work, verify]
+        }
+        sub_task_queue = flatten_plan(plan)
+        PLAN_LEAVES.observe(len(sub_task_queue))
         
         # Create simple actions
         actions = [
@@ -69,5 +210,72 @@ class Planning:
         
         return {
             "sub_task_queue": sub_task_queue,
-            "actions": actions
-        } 
\ No newline at end of file
+            "actions": actions,
+            "plan": plan,
+            "estimated_cost": plan["estimated_cost"],
+            "critical_path_cost": critical_path_cost(sub_task_queue),
+            "parallelism": max(task["parallelism"] for task in sub_task_queue)
+        }
+    
+    def _expand(self, spec: Spec, node_id: str, depth: int, max_depth: int, max_width: int, tool: Optional[str]) -> Dict[str, Any]:
+        """
+        Build the plan node of a task, expanding it into a sub-plan when it
+        has several parts and the depth budget allows.
+        """
+        text, parts = self._parts(spec)
+        if depth > max_depth or len(parts) < 2:
+            return self._leaf(node_id, f"Execute the task: {text}", "executor", tool, "Task result", depth)
+        
+        children = [
+            self._expand(part, f"{node_id}.{i}", depth + 1, max_depth, max_width, tool)
+            for i, part in enumerate(self._group(parts, max_width))
+        ]
+        return {
+            "id": node_id,
+            "task_description": text,
+            "responsible_agent": None,
+            "required_tool": tool,
+            "expected_output": "Task result",
+            "depends_on": [],
+            "estimated_cost": round(sum(child["estimated_cost"] for child in children), 2),
+            "parallelism": len(children),
+            "depth": depth,
+            "children": children
+        }
+    
+    def _leaf(self, node_id: str, description: str, agent: str, tool: Optional[str], expected_output: str, depth: int) -> Dict[str, Any]:
+        """Build an executable plan node"""
+        return {
+            "id": node_id,
+            "task_description": description,
+            "responsible_agent": agent,
+            "required_tool": tool,
+            "expected_output": expected_output,
+            "depends_on": [],
+            "estimated_cost": estimate_cost(description),
+            "parallelism": 1,
+            "depth": depth,
+            "children": []
+        }
+    
+    @staticmethod
+    def _parts(spec: Spec) -> Tuple[str, List[Spec]]:
+        """Get the text of a task spec and its parts (explicit subtasks, else split from the text)"""
+        if isinstance(spec, str):
+            return spec, split_task(spec)
+        text = spec.get("task") or spec.get("task_description") or ""
+        subtasks = spec.get("subtasks")
+        return text, list(subtasks) if subtasks else split_task(text)
+    
+    @staticmethod
+    def _group(parts: List[Spec], max_width: int) -> List[Spec]:
+        """Group parts into at most max_width specs (grouped parts become one spec with subtasks)"""
+        if len(parts) <= max_width:
+            return parts
+        size = -(-len(parts) // max_width)
+        groups = []
+        for start in range(0, len(parts), size):
+            group = parts[start:start + size]
+            texts = [part if isinstance(part, str) else (part.get("task") or part.get("task_description") or "") for part in group]
+            groups.append(group[0] if len(group) == 1 else {"task": "; ".join(texts), "subtasks": group})
+        return groups
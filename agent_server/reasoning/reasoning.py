@@ -4,7 +4,13 @@ Reasoning Module
 This module is responsible for executing reasoning tasks, including benchmarks,
 specific reasoning tasks, and applying different reasoning approaches.
 """
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Mapping
+from collections import ChainMap
+
+from agent_server.metrics.metrics import REGISTRY, ERRORS, timed
+from agent_server.tracing.tracing import traced
+
+TASK_LATENCY = REGISTRY.histogram("agent_reasoning_execute_task_seconds", "Latency of Reasoning.execute_task")
 
 # Simple placeholder classes for Agent functionality
 class Agent:
@@ -12,8 +18,15 @@ class Agent:
         self.model_name = model_name
 
 class AgentState:
-    def __init__(self):
-        self.data = {}
+    def __init__(self, context: Optional[Mapping[str, Any]] = None):
+        # Writes go to the local layer; the context is read through, never copied
+        self.data = ChainMap({}, context) if context is not None else ChainMap({})
+
+    def set(self, key: str, value: Any) -> None:
+        self.data[key] = value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
 
 class Function:
     def __init__(self, name: str, description: str):
@@ -51,7 +64,9 @@ class Reasoning:
         # Here we're just creating a placeholder
         self.agent = Agent(model_name=model)
     
-    async def execute_task(self, task: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    @timed(TASK_LATENCY, errors=ERRORS.labels("reasoning"))
+    @traced("reasoning.execute_task")
+    async def execute_task(self, task: Dict[str, Any], context: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
         """
         Execute a reasoning task using the agent.
         
@@ -65,11 +80,8 @@ class Reasoning:
         if not self.agent:
             await self.initialize_agent()
         
-        # Create agent state with context
-        state = AgentState()
-        if context:
-            for key, value in context.items():
-                state.set(key, value)
+        # Create agent state layered over the (read-only) context
+        state = AgentState(context)
         
         # Get task description
         task_description = task.get("task_description", "")
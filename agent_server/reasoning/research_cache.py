@@ -0,0 +1,315 @@
+"""
+Research Cache Module
+
+This module is responsible for answering repeated research queries without
+running the research again. Results of the A2A research service are cached
+under the requesting user (results and sessions are never shared between
+users) and the normalized (research_query, research_type, depth, sources):
+
+- an entry is fresh for a TTL depending on its depth and served as is
+- for a further stale window it is still served immediately, while a single
+  background refresh replaces it (inside the caller's admission accounting,
+  and skipped when the caller is over its limits)
+- identical research already in progress is joined instead of started again
+  (single flight); failures are not cached
+
+TTLs per depth can be overridden with the AGENT_SERVER_RESEARCH_CACHE_TTLS
+environment variable, a JSON object mapping depths to seconds, e.g.
+
+    {"quick": 120, "moderate": 600, "comprehensive": 3600}
+
+A TTL of 0 disables caching for that depth. The cache is per worker process.
+"""
+from typing import Dict, Optional, Any, AsyncContextManager, Awaitable, Callable, Tuple
+from collections import OrderedDict
+from contextlib import nullcontext
+import asyncio
+import json
+import os
+import time
+
+from agent_server.metrics.metrics import REGISTRY, CACHE_REQUESTS
+from agent_server.admission.admission import AdmissionRejected
+
+# Seconds a result stays fresh, by research depth
+DEFAULT_TTLS: Dict[str, float] = {
+    "quick": 300.0,
+    "moderate": 900.0,
+    "comprehensive": 3600.0
+}
+
+# TTL of depths without an entry
+DEFAULT_TTL = 900.0
+
+# Seconds past freshness a result is still served while it is refreshed
+DEFAULT_STALE_FOR = 3600.0
+
+# Entries kept before the least recently used ones are evicted
+MAX_ENTRIES = 1024
+
+RESEARCH_HITS = CACHE_REQUESTS.labels("research", "hit")
+RESEARCH_MISSES = CACHE_REQUESTS.labels("research", "miss")
+RESEARCH_LOOKUPS = REGISTRY.counter(
+    "agent_research_cache_lookups_total", "Research cache lookups, by outcome (hit/stale/joined/miss/bypass)", ["outcome"]
+)
+RESEARCH_REFRESHES = REGISTRY.counter(
+    "agent_research_cache_refreshes_total", "Background refreshes of stale research results, by outcome", ["outcome"]
+)
+
+CacheKey = Tuple[str, str, str, str, Tuple[str, ...]]
+Research = Callable[[], Awaitable[Tuple[str, Dict[str, Any]]]]
+
+# Position of the depth in a cache key
+DEPTH = 3
+
+
+def normalize_query(
+    research_query: str,
+    research_type: str = "general",
+    depth: str = "moderate",
+    sources: Optional[Any] = None,
+    scope: str = ""
+) -> CacheKey:
+    """
+    Build the cache key of a research request. Case and whitespace are
+    ignored, and sources are compared as a set.
+
+    Args:
+        research_query: The research question
+        research_type: The type of research
+        depth: The research depth
+        sources: Optional list of sources
+        scope: Who may see the result (the requesting user); entries are
+            never shared across scopes
+
+    Returns:
+        The (scope, query, type, depth, sources) tuple
+    """
+    return (
+        scope,
+        " ".join(research_query.lower().split()),
+        research_type.strip().lower(),
+        depth.strip().lower(),
+        tuple(sorted({source.strip().lower() for source in sources or () if source.strip()}))
+    )
+
+
+class CachedResearch:
+    """A research result and the session that produced it"""
+
+    __slots__ = ("session_id", "result", "created_at")
+
+    def __init__(self, session_id: str, result: Dict[str, Any], created_at: Optional[float] = None):
+        self.session_id = session_id
+        self.result = result
+        self.created_at = time.monotonic() if created_at is None else created_at
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Seconds since the research finished"""
+        return (time.monotonic() if now is None else now) - self.created_at
+
+
+class ResearchCache:
+    """
+    ResearchCache class holding research results with per-depth freshness,
+    stale-while-revalidate refreshes and single-flight deduplication.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = DEFAULT_TTL,
+        stale_for: float = DEFAULT_STALE_FOR,
+        max_entries: int = MAX_ENTRIES
+    ):
+        """
+        Initialize the research cache.
+
+        Args:
+            ttls: Seconds a result stays fresh, by depth (defaults to DEFAULT_TTLS)
+            default_ttl: Freshness of depths missing from ttls
+            stale_for: Seconds past freshness a result is served while refreshed
+            max_entries: Entries kept before LRU eviction
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_for = stale_for
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[CacheKey, CachedResearch]" = OrderedDict()
+        # Research in progress (first requests and background refreshes), by key
+        self.pending: Dict[CacheKey, asyncio.Task] = {}
+
+    @classmethod
+    def from_env(cls) -> "ResearchCache":
+        """
+        Build a cache, reading TTL overrides from AGENT_SERVER_RESEARCH_CACHE_TTLS.
+
+        Returns:
+            The configured cache
+        """
+        ttls = dict(DEFAULT_TTLS)
+        ttls.update({depth: float(seconds) for depth, seconds in json.loads(
+            os.environ.get("AGENT_SERVER_RESEARCH_CACHE_TTLS") or "{}"
+        ).items()})
+        return cls(ttls=ttls)
+
+    def ttl(self, depth: str) -> float:
+        """Get the freshness TTL of a depth"""
+        return self.ttls.get(depth, self.default_ttl)
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[CachedResearch], str]:
+        """
+        Look up a result without running any research.
+
+        Args:
+            key: Key from normalize_query()
+
+        Returns:
+            The entry (None when missing or expired) and its state:
+            "fresh", "stale" or "miss"
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None, "miss"
+
+        age = entry.age()
+        ttl = self.ttl(key[DEPTH])
+        if age < ttl:
+            self.entries.move_to_end(key)
+            return entry, "fresh"
+        if age < ttl + self.stale_for:
+            self.entries.move_to_end(key)
+            return entry, "stale"
+
+        del self.entries[key]
+        return None, "miss"
+
+    async def get_or_research(
+        self,
+        key: CacheKey,
+        research: Research,
+        refresh: bool = False,
+        refresh_guard: Optional[Callable[[], AsyncContextManager]] = None
+    ) -> Tuple[CachedResearch, str]:
+        """
+        Get a research result, running the research only when needed.
+
+        Args:
+            key: Key from normalize_query()
+            research: Coroutine function running the research and returning
+                (session_id, result)
+            refresh: Skip cached results (identical research in progress is
+                still joined)
+            refresh_guard: Factory of the async context a background refresh
+                runs in, e.g. the caller's admission (a refresh it rejects
+                is skipped and the stale entry kept)
+
+        Returns:
+            The result and how it was obtained: "hit", "stale" (served while a
+            refresh runs in the background), "joined" (waited for identical
+            research in progress), "miss" or "bypass" (caching disabled for
+            the depth)
+
+        Raises:
+            Exception: Whatever the research raised (also for joined requests)
+        """
+        if self.ttl(key[DEPTH]) <= 0:
+            RESEARCH_LOOKUPS.labels("bypass").inc()
+            session_id, result = await research()
+            return CachedResearch(session_id, result), "bypass"
+
+        if not refresh:
+            entry, state = self.lookup(key)
+            if state == "fresh":
+                RESEARCH_HITS.inc()
+                RESEARCH_LOOKUPS.labels("hit").inc()
+                return entry, "hit"
+            if state == "stale":
+                RESEARCH_HITS.inc()
+                RESEARCH_LOOKUPS.labels("stale").inc()
+                if key not in self.pending:
+                    self._start(key, research, refresh_guard).add_done_callback(self._log_refresh)
+                return entry, "stale"
+
+        task = self.pending.get(key)
+        if task is not None:
+            RESEARCH_HITS.inc()
+            RESEARCH_LOOKUPS.labels("joined").inc()
+            outcome = "joined"
+        else:
+            RESEARCH_MISSES.inc()
+            RESEARCH_LOOKUPS.labels("miss").inc()
+            task = self._start(key, research)
+            outcome = "miss"
+
+        # Shielded: a disconnecting client must not cancel research others wait for
+        return await asyncio.shield(task), outcome
+
+    def invalidate(self, key: Optional[CacheKey] = None) -> None:
+        """
+        Drop one cached result, or all of them.
+
+        Args:
+            key: Key to drop (None for every entry)
+        """
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    async def close(self) -> None:
+        """Cancel the research still in progress"""
+        tasks = list(self.pending.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.pending.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report the cache size and configuration.
+
+        Returns:
+            A dictionary with the entry and in-progress counts and the TTLs
+        """
+        return {
+            "entries": len(self.entries),
+            "in_progress": len(self.pending),
+            "ttls": dict(self.ttls),
+            "default_ttl": self.default_ttl,
+            "stale_for": self.stale_for,
+            "max_entries": self.max_entries
+        }
+
+    def _start(self, key: CacheKey, research: Research, guard: Optional[Callable[[], AsyncContextManager]] = None) -> asyncio.Task:
+        """Run the research for a key in a task shared by every request for it"""
+        task = asyncio.ensure_future(self._run(key, research, guard))
+        self.pending[key] = task
+        return task
+
+    async def _run(self, key: CacheKey, research: Research, guard: Optional[Callable[[], AsyncContextManager]] = None) -> CachedResearch:
+        """Run the research (inside the guard, if any) and store its result"""
+        try:
+            async with guard() if guard is not None else nullcontext():
+                session_id, result = await research()
+            entry = CachedResearch(session_id, result)
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return entry
+        finally:
+            self.pending.pop(key, None)
+
+    @staticmethod
+    def _log_refresh(task: asyncio.Task) -> None:
+        """Record the outcome of a background refresh (the stale entry is kept on failure)"""
+        if task.cancelled():
+            RESEARCH_REFRESHES.labels("cancelled").inc()
+        elif isinstance(task.exception(), AdmissionRejected):
+            RESEARCH_REFRESHES.labels("rejected").inc()
+        elif task.exception() is not None:
+            RESEARCH_REFRESHES.labels("failed").inc()
+            print(f"Error refreshing research result: {str(task.exception())}")
+        else:
+            RESEARCH_REFRESHES.labels("completed").inc()
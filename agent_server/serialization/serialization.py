@@ -0,0 +1,214 @@
+"""
+Serialization Module
+
+This module is responsible for the JSON encoding used by the API responses,
+Memory persistence and the shared state store. Serializers are pluggable:
+
+- "orjson": orjson (Rust), used by default when installed
+- "msgspec": msgspec.json, used by default when installed and orjson is not
+- "json": the standard library, always available
+
+Output is compact by default; pass pretty=True to get_serializer() for
+indented output. AGENT_SERVER_SERIALIZER selects the process-wide serializer
+("auto" by default). Every serializer produces UTF-8 bytes, stringifies
+values it cannot encode natively (e.g. datetimes) and accepts non-string keys.
+The "json" fallback matches orjson byte for byte on these: datetimes are
+ISO 8601, non-finite floats become null and keys are stringified.
+
+orjson is a core dependency; msgspec comes with the "serialization" extra.
+"""
+from typing import Dict, List, Optional, Any, Union
+import json
+import math
+import os
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class Serializer:
+    """
+    Serializer base class encoding values to JSON bytes.
+    """
+
+    name = "base"
+
+    def __init__(self, pretty: bool = False):
+        """
+        Initialize the serializer.
+
+        Args:
+            pretty: Indent the output (slower and larger; for human-read files)
+        """
+        self.pretty = pretty
+
+    def dumps(self, value: Any) -> bytes:
+        """
+        Encode a value.
+
+        Args:
+            value: The value to encode
+
+        Returns:
+            The JSON document as UTF-8 bytes
+        """
+        raise NotImplementedError
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        Decode a JSON document.
+
+        Args:
+            data: The document as bytes or str
+
+        Returns:
+            The decoded value
+        """
+        raise NotImplementedError
+
+
+def _encode_default(value: Any) -> Any:
+    """Encode a value json cannot: ISO 8601 for dates and times, else str()"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _normalize(value: Any) -> Any:
+    """
+    Rewrite what json encodes differently from orjson.
+
+    Non-finite floats become None and keys json rejects are stringified
+    with _encode_default.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, (str, int, float, bool)) or key is None else _encode_default(key): _normalize(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+class JSONSerializer(Serializer):
+    """Standard library json serializer"""
+
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        try:
+            return self._dumps(value)
+        except (ValueError, TypeError):
+            # NaN/Infinity or keys json rejects; only then pay for a rewrite
+            return self._dumps(_normalize(value))
+
+    def _dumps(self, value: Any) -> bytes:
+        if self.pretty:
+            text = json.dumps(value, indent=2, ensure_ascii=False, allow_nan=False, default=_encode_default)
+        else:
+            text = json.dumps(value, separators=(",", ":"), ensure_ascii=False, allow_nan=False, default=_encode_default)
+        return text.encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class ORJSONSerializer(Serializer):
+    """orjson serializer"""
+
+    name = "orjson"
+
+    def __init__(self, pretty: bool = False):
+        super().__init__(pretty)
+        self.option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=self.option)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecSerializer(Serializer):
+    """msgspec.json serializer"""
+
+    name = "msgspec"
+
+    def __init__(self, pretty: bool = False):
+        super().__init__(pretty)
+        self.encoder = msgspec.json.Encoder(enc_hook=str)
+        self.decoder = msgspec.json.Decoder()
+
+    def dumps(self, value: Any) -> bytes:
+        data = self.encoder.encode(value)
+        return msgspec.json.format(data, indent=2) if self.pretty else data
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self.decoder.decode(data)
+
+
+# Serializer classes by name, in order of preference
+SERIALIZERS: Dict[str, type] = {}
+if orjson is not None:
+    SERIALIZERS["orjson"] = ORJSONSerializer
+if msgspec is not None:
+    SERIALIZERS["msgspec"] = MsgspecSerializer
+SERIALIZERS["json"] = JSONSerializer
+
+
+def available_serializers() -> List[str]:
+    """Get the names of the serializers usable in this environment"""
+    return list(SERIALIZERS)
+
+
+def get_serializer(name: Optional[str] = None, pretty: bool = False) -> Serializer:
+    """
+    Build a serializer.
+
+    Args:
+        name: "orjson", "msgspec", "json" or "auto" (defaults to the
+            AGENT_SERVER_SERIALIZER environment variable, then "auto")
+        pretty: Indent the output
+
+    Returns:
+        The serializer; "auto" picks the fastest one installed
+    """
+    name = name or os.environ.get("AGENT_SERVER_SERIALIZER", "auto")
+    if name == "auto":
+        name = next(iter(SERIALIZERS))
+    if name not in SERIALIZERS:
+        raise ValueError(f"Serializer {name} is not available (available: {', '.join(SERIALIZERS)})")
+    return SERIALIZERS[name](pretty=pretty)
+
+
+# Process-wide compact serializer
+SERIALIZER = get_serializer()
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a value with the process-wide serializer"""
+    return SERIALIZER.dumps(value)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode a document with the process-wide serializer"""
+    return SERIALIZER.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the process-wide serializer (compact, UTF-8)"""
+
+    def render(self, content: Any) -> bytes:
+        return SERIALIZER.dumps(content)
@@ -0,0 +1,267 @@
+"""
+Services Module
+
+This module is responsible for constructing the agent server's components
+lazily. Cheap components are built on first use; heavy ones (the memory
+snapshot and the A2A research service) are warmed up in the background so the
+application can answer root and health requests immediately.
+
+Setting AGENT_SERVER_STATE_DB to a SQLite file path enables the multi-worker
+mode: workflow state, memory and action history go through a shared
+SQLiteStateStore, and every worker runs a claim loop that picks up workflows
+by lease. Run several processes with e.g.
+
+    AGENT_SERVER_STATE_DB=/var/lib/agent/state.db \
+        uvicorn agent_server.main:app --workers 4
+
+An event-loop watchdog runs alongside the application and reports stalls
+longer than AGENT_SERVER_LOOP_STALL_MS milliseconds (default 100; 0 disables it).
+
+Per-tenant admission limits are read from AGENT_SERVER_TENANTS and the number
+of concurrently executing workflows from AGENT_SERVER_MAX_RUNNING (see
+agent_server.admission). Research results are cached per worker, with
+freshness TTLs per depth from AGENT_SERVER_RESEARCH_CACHE_TTLS (see
+agent_server.reasoning.research_cache). Simulated task and action latencies
+come from AGENT_SERVER_LATENCY_PROFILE (see agent_server.simulation). The
+default policy selecting the previous results handed to each task comes from
+AGENT_SERVER_CONTEXT_POLICY (see agent_server.workflow.context).
+"""
+from typing import Dict, Optional, Any
+import asyncio
+import os
+import time
+
+from agent_server.planning.planning import Planning
+from agent_server.reasoning.reasoning import Reasoning
+from agent_server.memory.memory import Memory
+from agent_server.workflow.workflow import Workflow
+from agent_server.workflow.context import ContextPolicy
+from agent_server.action.action import Action
+from agent_server.state.state import SQLiteStateStore, make_worker_id
+from agent_server.watchdog.watchdog import LoopWatchdog
+from agent_server.admission.admission import AdmissionController
+from agent_server.reasoning.research_cache import ResearchCache
+from agent_server.simulation.simulation import LatencyProfile
+
+
+class Services:
+    """
+    Services class holding the lazily constructed component instances.
+    """
+
+    def __init__(self, include_a2a: bool = True, memory_path: Optional[str] = None, state_path: Optional[str] = None):
+        """
+        Initialize the service container without constructing any component.
+
+        Args:
+            include_a2a: Whether to warm up the A2A research service
+            memory_path: Optional path of the memory storage file
+            state_path: Optional path of the shared SQLite state database
+                (defaults to the AGENT_SERVER_STATE_DB environment variable)
+        """
+        self.include_a2a = include_a2a
+        self.memory_path = memory_path
+        self.state_path = state_path or os.environ.get("AGENT_SERVER_STATE_DB")
+        self.worker_id = make_worker_id()
+        self.admission = AdmissionController.from_env()
+        self.research_cache = ResearchCache.from_env()
+        self.latency = LatencyProfile.from_env()
+        self.context_policy = ContextPolicy.from_env()
+        self._store: Optional[SQLiteStateStore] = None
+        self._claim_task: Optional[asyncio.Task] = None
+
+        self._planning: Optional[Planning] = None
+        self._reasoning: Optional[Reasoning] = None
+        self._memory: Optional[Memory] = None
+        self._workflow: Optional[Workflow] = None
+        self._action: Optional[Action] = None
+
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._a2a_task: Optional[asyncio.Task] = None
+
+        stall_ms = float(os.environ.get("AGENT_SERVER_LOOP_STALL_MS", "100"))
+        self.watchdog: Optional[LoopWatchdog] = (
+            LoopWatchdog(interval=0.1, threshold=stall_ms / 1000) if stall_ms > 0 else None
+        )
+
+        # Readiness and warm-up timings per service
+        self.status: Dict[str, str] = {
+            "planning": "idle",
+            "reasoning": "idle",
+            "memory": "idle",
+            "workflow": "idle",
+            "action": "idle",
+            "a2a_research": "idle" if include_a2a else "disabled"
+        }
+        self.warmup_seconds: Dict[str, float] = {}
+
+    @property
+    def store(self) -> Optional[SQLiteStateStore]:
+        """The shared state store in multi-worker mode, None otherwise"""
+        if self._store is None and self.state_path:
+            self._store = SQLiteStateStore(self.state_path)
+        return self._store
+
+    @property
+    def planning(self) -> Planning:
+        """The planning component, constructed on first access"""
+        if self._planning is None:
+            self._planning = Planning()
+            self.status["planning"] = "active"
+        return self._planning
+
+    @property
+    def reasoning(self) -> Reasoning:
+        """The reasoning component, constructed on first access"""
+        if self._reasoning is None:
+            self._reasoning = Reasoning()
+            self.status["reasoning"] = "active"
+        return self._reasoning
+
+    @property
+    def workflow(self) -> Workflow:
+        """The workflow component, constructed on first access"""
+        if self._workflow is None:
+            self._workflow = Workflow(context_policy=self.context_policy, store=self.store, worker_id=self.worker_id, admission=self.admission, action=self.action, latency=self.latency)
+            self.status["workflow"] = "active"
+        return self._workflow
+
+    @property
+    def action(self) -> Action:
+        """The action component, constructed on first access"""
+        if self._action is None:
+            self._action = Action(store=self.store, worker_id=self.worker_id, latency=self.latency)
+            self.status["action"] = "active"
+        return self._action
+
+    @property
+    def memory(self) -> Memory:
+        """
+        The memory component, constructed on first access without reading the
+        storage file. Use get_memory() to obtain a loaded instance.
+        """
+        if self._memory is None:
+            self._memory = Memory(storage_path=self.memory_path, autoload=False, store=self.store)
+            self.status["memory"] = "active" if self._memory.loaded else "loading"
+        return self._memory
+
+    async def get_memory(self) -> Memory:
+        """
+        Get the memory component once its snapshot has been loaded.
+
+        Returns:
+            The loaded memory instance
+        """
+        memory = self.memory
+        if not memory.loaded:
+            await self._timed("memory", memory.load())
+        return memory
+
+    async def get_a2a_service(self) -> Any:
+        """
+        Wait for the A2A research service to finish warming up.
+
+        Returns:
+            The A2A service instance
+        """
+        if not self.include_a2a:
+            raise RuntimeError("A2A research service is disabled")
+        if self._a2a_task is None:
+            self._a2a_task = asyncio.ensure_future(self._init_a2a())
+        await asyncio.shield(self._a2a_task)
+
+        from agent_server.reasoning.a2a_api import get_a2a_service
+        return await get_a2a_service()
+
+    def start_warmup(self) -> asyncio.Task:
+        """
+        Start warming up the heavy services in the background.
+
+        Returns:
+            The background warm-up task
+        """
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(self._warmup())
+        return self._warmup_task
+
+    async def start_watchdog(self) -> None:
+        """Start the event-loop watchdog on the running loop (if enabled)"""
+        if self.watchdog is not None:
+            await self.watchdog.start()
+
+    async def wait_ready(self) -> None:
+        """Wait until the background warm-up has finished"""
+        await asyncio.shield(self.start_warmup())
+
+    async def shutdown(self) -> None:
+        """Cancel any pending warm-up work, research, action dispatches and the claim loop, write pending memory changes and stop the watchdog"""
+        for task in (self._warmup_task, self._a2a_task, self._claim_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        await self.research_cache.close()
+        if self._workflow is not None:
+            await self._workflow.events.close()
+        if self._memory is not None:
+            await asyncio.to_thread(self._memory.close)
+        if self.watchdog is not None:
+            await self.watchdog.stop()
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Report the readiness of each service without constructing anything.
+
+        Returns:
+            A dictionary with the overall status, per-service status and warm-up timings
+        """
+        warming = any(state in ("loading", "warming_up") for state in self.status.values())
+        return {
+            "status": "warming_up" if warming else "ok",
+            "worker_id": self.worker_id,
+            "mode": "shared" if self.state_path else "single_process",
+            "services": dict(self.status),
+            "warmup_seconds": dict(self.warmup_seconds)
+        }
+
+    async def _warmup(self) -> None:
+        """Load the memory snapshot, start claiming shared workflows, then initialize the A2A service"""
+        try:
+            await self.get_memory()
+        except Exception as e:
+            self.status["memory"] = "failed"
+            print(f"Error warming up memory: {str(e)}")
+            return
+
+        if self.store is not None and self._claim_task is None:
+            self._claim_task = asyncio.create_task(
+                self.workflow.run_claim_loop(reasoning=self.reasoning, memory=self.memory)
+            )
+
+        if self.include_a2a and self.status["a2a_research"] != "unavailable":
+            try:
+                await self.get_a2a_service()
+            except Exception as e:
+                print(f"Error warming up A2A research service: {str(e)}")
+
+    async def _init_a2a(self) -> None:
+        """Import and initialize the A2A research service"""
+        self.status["a2a_research"] = "warming_up"
+        try:
+            from agent_server.agent_server.reasoning.a2a_api import initialize_a2a_service
+            memory = await self.get_memory()
+            await self._timed("a2a_research", initialize_a2a_service(memory, self.workflow))
+            print("Agent Server started with A2A Research Agents")
+        except Exception:
+            self.status["a2a_research"] = "failed"
+            raise
+
+    async def _timed(self, name: str, awaitable) -> Any:
+        """Await a warm-up step, recording its duration and marking the service active"""
+        started = time.perf_counter()
+        result = await awaitable
+        self.warmup_seconds[name] = round(time.perf_counter() - started, 6)
+        self.status[name] = "active"
+        return result
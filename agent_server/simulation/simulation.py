@@ -0,0 +1,368 @@
+"""
+Simulation Module
+
+This module is responsible for the simulated work done when no real backend is
+involved: tasks executed without a reasoning module and actions without a
+registered handler. Their latency and failures come from a LatencyProfile:
+
+- a latency model per task (by responsible_agent) and per action trigger,
+  with a default for each; models are "constant", "uniform", "exponential"
+  and "lognormal", each with an optional failure rate
+- a seeded random generator, so a profile replays the same delays and
+  failures for the same sequence of calls
+
+The default profile reproduces the fixed delays used before (1 s per task,
+0.5 s per action, no failures). A profile can be given as JSON in the
+AGENT_SERVER_LATENCY_PROFILE environment variable, e.g.
+
+    {"seed": 7,
+     "tasks": {"default": {"distribution": "lognormal", "median": 0.8, "sigma": 0.6},
+               "verifier": {"distribution": "uniform", "low": 0.1, "high": 0.3, "failure_rate": 0.01}},
+     "triggers": {"default": 0.5}}
+
+(a bare number is a constant latency).
+
+VirtualEventLoop runs asyncio on a virtual clock: whenever the loop would wait
+for a timer, the clock jumps to it instead, so simulated delays take no wall
+time and thousands of workflows run in seconds (see
+benchmarks/bench_simulation.py). Work handed to threads still takes real time
+and no virtual time.
+"""
+from typing import Dict, Optional, Any, Awaitable, Union
+import asyncio
+import json
+import math
+import os
+import random
+import selectors
+
+
+class SimulatedFailure(RuntimeError):
+    """Failure injected by a latency model"""
+
+
+class LatencyModel:
+    """
+    LatencyModel base class sampling delays and failures.
+    """
+
+    distribution = "base"
+
+    def __init__(self, failure_rate: float = 0.0):
+        """
+        Initialize the latency model.
+
+        Args:
+            failure_rate: Probability (0..1) that a call fails after its delay
+        """
+        self.failure_rate = failure_rate
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        Draw a delay.
+
+        Args:
+            rng: The random generator of the profile
+
+        Returns:
+            The delay in seconds
+        """
+        raise NotImplementedError
+
+    def fails(self, rng: random.Random) -> bool:
+        """Draw whether a call fails"""
+        return self.failure_rate > 0 and rng.random() < self.failure_rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict representation of the model"""
+        return {"distribution": self.distribution, "failure_rate": self.failure_rate}
+
+
+class ConstantLatency(LatencyModel):
+    """The same delay every time"""
+
+    distribution = "constant"
+
+    def __init__(self, seconds: float, failure_rate: float = 0.0):
+        super().__init__(failure_rate)
+        self.seconds = seconds
+
+    def sample(self, rng: random.Random) -> float:
+        return self.seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**super().to_dict(), "seconds": self.seconds}
+
+
+class UniformLatency(LatencyModel):
+    """Delays uniformly distributed between low and high"""
+
+    distribution = "uniform"
+
+    def __init__(self, low: float, high: float, failure_rate: float = 0.0):
+        super().__init__(failure_rate)
+        self.low = low
+        self.high = high
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.uniform(self.low, self.high)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**super().to_dict(), "low": self.low, "high": self.high}
+
+
+class ExponentialLatency(LatencyModel):
+    """Exponentially distributed delays on top of a fixed minimum"""
+
+    distribution = "exponential"
+
+    def __init__(self, mean: float, minimum: float = 0.0, failure_rate: float = 0.0):
+        super().__init__(failure_rate)
+        self.mean = mean
+        self.minimum = minimum
+
+    def sample(self, rng: random.Random) -> float:
+        return self.minimum + rng.expovariate(1.0 / self.mean)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**super().to_dict(), "mean": self.mean, "minimum": self.minimum}
+
+
+class LogNormalLatency(LatencyModel):
+    """Log-normally distributed delays (long right tail), given by median and sigma"""
+
+    distribution = "lognormal"
+
+    def __init__(self, median: float, sigma: float, failure_rate: float = 0.0):
+        super().__init__(failure_rate)
+        self.median = median
+        self.sigma = sigma
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.lognormvariate(math.log(self.median), self.sigma)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**super().to_dict(), "median": self.median, "sigma": self.sigma}
+
+
+# Latency model classes by distribution name
+MODELS: Dict[str, type] = {
+    model.distribution: model
+    for model in (ConstantLatency, UniformLatency, ExponentialLatency, LogNormalLatency)
+}
+
+
+def parse_model(spec: Union[float, int, Dict[str, Any], LatencyModel]) -> LatencyModel:
+    """
+    Build a latency model from its JSON form.
+
+    Args:
+        spec: A number (constant seconds) or a dict with "distribution" and
+            the model's parameters (plus an optional "failure_rate")
+
+    Returns:
+        The latency model
+    """
+    if isinstance(spec, LatencyModel):
+        return spec
+    if isinstance(spec, (int, float)):
+        return ConstantLatency(float(spec))
+
+    params = dict(spec)
+    distribution = params.pop("distribution", "constant")
+    if distribution not in MODELS:
+        raise ValueError(f"Unknown latency distribution: {distribution} (known: {', '.join(MODELS)})")
+    return MODELS[distribution](**params)
+
+
+class LatencyProfile:
+    """
+    LatencyProfile class simulating task and action latencies.
+    """
+
+    def __init__(
+        self,
+        tasks: Optional[Dict[str, LatencyModel]] = None,
+        triggers: Optional[Dict[str, LatencyModel]] = None,
+        default_task: Optional[LatencyModel] = None,
+        default_trigger: Optional[LatencyModel] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize the latency profile.
+
+        Args:
+            tasks: Latency model per responsible_agent of a task
+            triggers: Latency model per action trigger
+            default_task: Model of other tasks (1 s constant by default)
+            default_trigger: Model of other triggers (0.5 s constant by default)
+            seed: Seed of the random generator (None for a random seed)
+        """
+        self.tasks = tasks or {}
+        self.triggers = triggers or {}
+        self.default_task = default_task or ConstantLatency(1.0)
+        self.default_trigger = default_trigger or ConstantLatency(0.5)
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "LatencyProfile":
+        """
+        Build a profile from its JSON form.
+
+        Args:
+            data: Dict with optional "seed", "tasks" and "triggers" (each a
+                mapping of names, or "default", to model specs)
+
+        Returns:
+            The latency profile
+        """
+        data = data or {}
+        tasks = {name: parse_model(spec) for name, spec in (data.get("tasks") or {}).items()}
+        triggers = {name: parse_model(spec) for name, spec in (data.get("triggers") or {}).items()}
+        return cls(
+            tasks=tasks,
+            triggers=triggers,
+            default_task=tasks.pop("default", None),
+            default_trigger=triggers.pop("default", None),
+            seed=data.get("seed")
+        )
+
+    @classmethod
+    def from_env(cls) -> "LatencyProfile":
+        """
+        Build a profile from AGENT_SERVER_LATENCY_PROFILE (the default profile when unset).
+
+        Returns:
+            The latency profile
+        """
+        return cls.from_dict(json.loads(os.environ.get("AGENT_SERVER_LATENCY_PROFILE") or "{}"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict representation of the profile"""
+        return {
+            "seed": self.seed,
+            "tasks": {"default": self.default_task.to_dict(), **{name: model.to_dict() for name, model in self.tasks.items()}},
+            "triggers": {"default": self.default_trigger.to_dict(), **{name: model.to_dict() for name, model in self.triggers.items()}}
+        }
+
+    def task_model(self, task: Dict[str, Any]) -> LatencyModel:
+        """Get the latency model of a task"""
+        return self.tasks.get(task.get("responsible_agent"), self.default_task)
+
+    def trigger_model(self, trigger: str) -> LatencyModel:
+        """Get the latency model of an action trigger"""
+        return self.triggers.get(trigger, self.default_trigger)
+
+    async def run_task(self, task: Dict[str, Any]) -> float:
+        """
+        Simulate the execution of a task.
+
+        Args:
+            task: The task
+
+        Returns:
+            The simulated delay in seconds
+
+        Raises:
+            SimulatedFailure: If the model injected a failure
+        """
+        return await self._run(self.task_model(task), f"task {task.get('task_description')}")
+
+    async def run_trigger(self, trigger: str) -> float:
+        """
+        Simulate the execution of an action.
+
+        Args:
+            trigger: The action trigger
+
+        Returns:
+            The simulated delay in seconds
+
+        Raises:
+            SimulatedFailure: If the model injected a failure
+        """
+        return await self._run(self.trigger_model(trigger), f"action {trigger}")
+
+    async def _run(self, model: LatencyModel, name: str) -> float:
+        """Sleep for a sampled delay, then fail if the model says so"""
+        delay = max(0.0, model.sample(self.rng))
+        failed = model.fails(self.rng)
+        await asyncio.sleep(delay)
+        if failed:
+            raise SimulatedFailure(f"Simulated failure of {name}")
+        return delay
+
+
+class VirtualClock:
+    """Monotonic virtual time, advanced by the event loop"""
+
+    __slots__ = ("now",)
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward"""
+        self.now += seconds
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Selector that advances the virtual clock instead of blocking on timers"""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout: Optional[float] = None):
+        if timeout is None:
+            # No timer pending: only threads or real I/O can wake the loop
+            return super().select(None)
+        events = super().select(0)
+        if not events and timeout > 0:
+            self.clock.advance(timeout)
+        return events
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose time() is a virtual clock that jumps to the next timer
+    whenever nothing is ready to run.
+    """
+
+    def __init__(self, start: float = 0.0):
+        """
+        Initialize the virtual-time event loop.
+
+        Args:
+            start: Initial virtual time in seconds
+        """
+        self.clock = VirtualClock(start)
+        super().__init__(VirtualSelector(self.clock))
+
+    def time(self) -> float:
+        return self.clock.now
+
+
+def run_simulated(main: Awaitable[Any], start: float = 0.0) -> Any:
+    """
+    Run a coroutine to completion on a new VirtualEventLoop.
+
+    Args:
+        main: The coroutine
+        start: Initial virtual time in seconds
+
+    Returns:
+        The coroutine's result
+    """
+    loop = VirtualEventLoop(start)
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
@@ -0,0 +1,494 @@
+"""
+State Module
+
+This module is responsible for the shared state backend used when the agent
+server runs with several uvicorn worker processes. Workflow state, memory and
+action history are kept in a SQLite database (WAL mode) on the local host, and
+workflow execution is coordinated through time-limited leases so any worker
+can claim a workflow and take over one whose owner died.
+
+Writes to a workflow are fenced by its lease: the owner's writes only apply
+while its lease is live, and nobody else may overwrite a workflow under a live
+lease. A rejected write raises LeaseLost, so a worker whose lease expired (and
+was claimed by another worker) cannot save over the new owner's state.
+
+All methods are synchronous and safe to call from worker threads; async
+callers should run them through asyncio.to_thread().
+"""
+from typing import Dict, List, Optional, Any, Callable, Tuple
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from agent_server.serialization.serialization import dumps, loads
+from agent_server.analytics.analytics import to_timestamp
+
+# Separator between a memory category and an entry key in the memory table
+CATEGORY_SEPARATOR = "\x1f"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    nodes TEXT NOT NULL,
+    status TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workflows_claimable ON workflows (status, lease_expires);
+CREATE TABLE IF NOT EXISTS memory (
+    memory_type TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (memory_type, key)
+);
+CREATE TABLE IF NOT EXISTS memory_lists (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    memory_type TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS memory_lists_key ON memory_lists (memory_type, key, seq);
+CREATE TABLE IF NOT EXISTS action_history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    worker_id TEXT,
+    record TEXT NOT NULL
+);
+"""
+
+
+class LeaseLost(RuntimeError):
+    """Raised when a workflow write is rejected because the writer does not hold its lease"""
+
+
+def make_worker_id() -> str:
+    """
+    Build an identifier unique to this worker process.
+
+    Returns:
+        A "<host>:<pid>:<random>" string
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def encode(value: Any) -> str:
+    """Encode a value for storage"""
+    return dumps(value).decode("utf-8")
+
+
+def decode(raw: Optional[str]) -> Any:
+    """Decode a stored value"""
+    return None if raw is None else loads(raw)
+
+
+class SQLiteStateStore:
+    """
+    SQLiteStateStore class for sharing workflow, memory and action state
+    between worker processes on one host.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 30.0):
+        """
+        Initialize the store and create the schema if needed.
+
+        Args:
+            path: Path of the SQLite database file
+            lease_seconds: How long a workflow claim stays valid without renewal
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get the connection of the calling thread, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run func inside an immediate (write-locked) transaction"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    # Workflows
+
+    def save_workflow(self, workflow_id: str, data: Dict[str, Any], nodes: List[Dict[str, Any]], worker_id: Optional[str] = None) -> int:
+        """
+        Save a workflow, fenced by its lease.
+
+        With a worker_id this is an owner write: it only applies while that
+        worker holds a live lease on the workflow, and renews the lease.
+        Without one, the workflow is inserted, or updated only if no worker
+        holds a live lease on it.
+
+        Args:
+            workflow_id: The ID of the workflow
+            data: The workflow dictionary
+            nodes: The workflow's nodes
+            worker_id: The lease owner writing (None for writes outside a lease)
+
+        Returns:
+            The new version of the stored workflow
+
+        Raises:
+            LeaseLost: If the write was rejected by the lease
+        """
+        now = time.time()
+        params = (encode(data), encode(nodes), data.get("status", "unknown"), now)
+
+        def save(conn: sqlite3.Connection) -> int:
+            if worker_id:
+                cursor = conn.execute(
+                    "UPDATE workflows SET data = ?, nodes = ?, status = ?, version = version + 1, updated_at = ?, "
+                    "lease_expires = ? WHERE id = ? AND lease_owner = ? AND lease_expires > ?",
+                    (*params, now + self.lease_seconds, workflow_id, worker_id, now)
+                )
+            else:
+                cursor = conn.execute(
+                    "INSERT INTO workflows (id, data, nodes, status, version, updated_at) VALUES (?, ?, ?, ?, 1, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET data = excluded.data, nodes = excluded.nodes, "
+                    "status = excluded.status, version = workflows.version + 1, updated_at = excluded.updated_at "
+                    "WHERE workflows.lease_owner IS NULL OR workflows.lease_expires <= ?",
+                    (workflow_id, *params, now)
+                )
+            if cursor.rowcount != 1:
+                raise LeaseLost(f"Write to workflow {workflow_id} rejected: " + (
+                    f"worker {worker_id} does not hold its lease" if worker_id else "another worker holds its lease"
+                ))
+            row = conn.execute("SELECT version FROM workflows WHERE id = ?", (workflow_id,)).fetchone()
+            return row[0]
+
+        return self._transaction(save)
+
+    def load_workflow(self, workflow_id: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]], int]]:
+        """
+        Load a workflow.
+
+        Args:
+            workflow_id: The ID of the workflow
+
+        Returns:
+            A (workflow, nodes, version) tuple, or None if not found
+        """
+        row = self._connect().execute(
+            "SELECT data, nodes, version FROM workflows WHERE id = ?", (workflow_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return decode(row[0]), decode(row[1]), row[2]
+
+    def workflow_version(self, workflow_id: str) -> Optional[int]:
+        """
+        Get the version of a workflow without loading it.
+
+        Args:
+            workflow_id: The ID of the workflow
+
+        Returns:
+            The version, or None if not found
+        """
+        row = self._connect().execute("SELECT version FROM workflows WHERE id = ?", (workflow_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def claim_workflow(self, worker_id: str, workflow_id: Optional[str] = None) -> Optional[str]:
+        """
+        Claim a runnable workflow whose lease is free or expired.
+
+        Args:
+            worker_id: The claiming worker
+            workflow_id: Claim this specific workflow instead of the oldest runnable one
+
+        Returns:
+            The ID of the claimed workflow, or None if nothing could be claimed
+        """
+        now = time.time()
+
+        def claim(conn: sqlite3.Connection) -> Optional[str]:
+            query = (
+                "SELECT id FROM workflows WHERE status IN ('initialized', 'running') "
+                "AND (lease_owner IS NULL OR lease_expires <= ?)"
+            )
+            params: list = [now]
+            if workflow_id is not None:
+                query += " AND id = ?"
+                params.append(workflow_id)
+            row = conn.execute(query + " ORDER BY updated_at LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE workflows SET lease_owner = ?, lease_expires = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, row[0])
+            )
+            return row[0]
+
+        return self._transaction(claim)
+
+    def renew_lease(self, workflow_id: str, worker_id: str) -> bool:
+        """
+        Extend a lease held by the worker.
+
+        Args:
+            workflow_id: The ID of the workflow
+            worker_id: The worker holding the lease
+
+        Returns:
+            True if the worker still held a live lease, False otherwise (an
+            expired lease is not revived, since another worker may claim it)
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE workflows SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND lease_expires > ?",
+            (now + self.lease_seconds, workflow_id, worker_id, now)
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, workflow_id: str, worker_id: str) -> None:
+        """
+        Release a lease held by the worker.
+
+        Args:
+            workflow_id: The ID of the workflow
+            worker_id: The worker holding the lease
+        """
+        self._connect().execute(
+            "UPDATE workflows SET lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ?",
+            (workflow_id, worker_id)
+        )
+
+    # Memory
+
+    def memory_get_many(self, memory_type: str, keys: List[str]) -> Dict[str, Any]:
+        """
+        Get several scalar memory entries at once.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+            keys: Entry keys (top-level keys or category-qualified keys)
+
+        Returns:
+            Dict of the keys that exist and their values
+        """
+        if not keys:
+            return {}
+        placeholders = ",".join("?" for _ in keys)
+        rows = self._connect().execute(
+            f"SELECT key, value FROM memory WHERE memory_type = ? AND key IN ({placeholders})",
+            [memory_type, *keys]
+        ).fetchall()
+        return {key: decode(value) for key, value in rows}
+
+    def memory_get_category(self, memory_type: str, category: str) -> Dict[str, Any]:
+        """
+        Get every entry of a dict-valued memory category.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+            category: The category name
+
+        Returns:
+            The category as a dict
+        """
+        prefix = category + CATEGORY_SEPARATOR
+        rows = self._connect().execute(
+            "SELECT key, value FROM memory WHERE memory_type = ? AND key >= ? AND key < ?",
+            (memory_type, prefix, category + chr(ord(CATEGORY_SEPARATOR) + 1))
+        ).fetchall()
+        return {key[len(prefix):]: decode(value) for key, value in rows}
+
+    def memory_set_many(self, memory_type: str, entries: Dict[str, Any]) -> None:
+        """
+        Insert or replace several memory entries in one transaction.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+            entries: Entry keys and values
+        """
+        def save(conn: sqlite3.Connection) -> None:
+            conn.executemany(
+                "INSERT OR REPLACE INTO memory (memory_type, key, value) VALUES (?, ?, ?)",
+                [(memory_type, key, encode(value)) for key, value in entries.items()]
+            )
+
+        self._transaction(save)
+
+    def memory_get_list(self, memory_type: str, key: str, offset: int = 0, limit: Optional[int] = None) -> List[Any]:
+        """
+        Get a list-valued memory category in insertion order.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+            key: The category name
+            offset: Number of items to skip
+            limit: Maximum number of items (all when None)
+
+        Returns:
+            The list items
+        """
+        rows = self._connect().execute(
+            "SELECT value FROM memory_lists WHERE memory_type = ? AND key = ? ORDER BY seq LIMIT ? OFFSET ?",
+            (memory_type, key, -1 if limit is None else limit, offset)
+        ).fetchall()
+        return [decode(row[0]) for row in rows]
+
+    def memory_list_since(self, memory_type: str, key: str, after: int = 0) -> List[Tuple[int, Any]]:
+        """
+        Get the items appended to a list-valued memory category after a sequence number.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+            key: The category name
+            after: Sequence number of the last item already read (0 for all)
+
+        Returns:
+            (sequence number, item) pairs in insertion order
+        """
+        rows = self._connect().execute(
+            "SELECT seq, value FROM memory_lists WHERE memory_type = ? AND key = ? AND seq > ? ORDER BY seq",
+            (memory_type, key, after)
+        ).fetchall()
+        return [(row[0], decode(row[1])) for row in rows]
+
+    def memory_append(self, memory_type: str, key: str, items: List[Any]) -> None:
+        """
+        Append items to a list-valued memory category.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+            key: The category name
+            items: Items to append
+        """
+        def append(conn: sqlite3.Connection) -> None:
+            conn.executemany(
+                "INSERT INTO memory_lists (memory_type, key, value) VALUES (?, ?, ?)",
+                [(memory_type, key, encode(item)) for item in items]
+            )
+
+        self._transaction(append)
+
+    def memory_keys(self, memory_type: str) -> List[str]:
+        """
+        List the top-level (non-category) memory keys.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+
+        Returns:
+            The keys
+        """
+        rows = self._connect().execute(
+            "SELECT key FROM memory WHERE memory_type = ? AND instr(key, ?) = 0",
+            (memory_type, CATEGORY_SEPARATOR)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def memory_list_drop_before(self, memory_type: str, key: str, cutoff: float) -> int:
+        """
+        Delete the items of a list-valued memory category whose "timestamp"
+        is before a point in time (items without one are kept).
+
+        Args:
+            memory_type: "short_term" or "long_term"
+            key: The category name
+            cutoff: Epoch seconds
+
+        Returns:
+            The number of items deleted
+        """
+        def drop(conn: sqlite3.Connection) -> int:
+            rows = conn.execute(
+                "SELECT seq, json_extract(value, '$.timestamp') FROM memory_lists WHERE memory_type = ? AND key = ?",
+                (memory_type, key)
+            ).fetchall()
+            stale = []
+            for seq, timestamp in rows:
+                try:
+                    if timestamp is not None and to_timestamp(timestamp) < cutoff:
+                        stale.append((seq,))
+                except ValueError:
+                    continue
+            conn.executemany("DELETE FROM memory_lists WHERE seq = ?", stale)
+            return len(stale)
+
+        return self._transaction(drop)
+
+    def memory_key_count(self, memory_type: str) -> int:
+        """
+        Count the top-level (non-category) memory keys.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+
+        Returns:
+            The number of keys
+        """
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM memory WHERE memory_type = ? AND instr(key, ?) = 0",
+            (memory_type, CATEGORY_SEPARATOR)
+        ).fetchone()[0]
+
+    def memory_clear(self, memory_type: str) -> None:
+        """
+        Delete every memory entry of a type.
+
+        Args:
+            memory_type: "short_term" or "long_term"
+        """
+        def clear(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM memory WHERE memory_type = ?", (memory_type,))
+            conn.execute("DELETE FROM memory_lists WHERE memory_type = ?", (memory_type,))
+
+        self._transaction(clear)
+
+    # Action history
+
+    def append_action(self, record: Dict[str, Any], worker_id: Optional[str] = None) -> None:
+        """
+        Append an action execution record.
+
+        Args:
+            record: The action record
+            worker_id: The worker that executed the action
+        """
+        self._connect().execute(
+            "INSERT INTO action_history (worker_id, record) VALUES (?, ?)",
+            (worker_id, encode(record))
+        )
+
+    def action_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recent action records, oldest first.
+
+        Args:
+            limit: Maximum number of records (all records if falsy)
+
+        Returns:
+            The action records
+        """
+        if limit:
+            rows = self._connect().execute(
+                "SELECT record FROM (SELECT seq, record FROM action_history ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+                (limit,)
+            ).fetchall()
+        else:
+            rows = self._connect().execute("SELECT record FROM action_history ORDER BY seq").fetchall()
+        return [decode(row[0]) for row in rows]
@@ -0,0 +1,356 @@
+"""
+Tracing Module
+
+This module is responsible for lightweight per-workflow tracing. Spans are
+opened around planning, workflow nodes, memory operations and actions, and
+propagate through contextvars (so they follow asyncio tasks automatically).
+Finished spans go into a bounded in-memory ring buffer, indexed by trace ID
+(evicted together with the buffer); a trace can be returned as a span tree for a flamegraph view or exported as OTLP-compatible
+JSON.
+
+Finished traces are exported by a single background thread fed through a
+bounded queue; when the exporter falls behind, traces are dropped (and
+counted in agent_trace_exports_dropped_total) rather than piling up.
+
+Spans are only recorded inside a trace: a span opened with no trace ID and no
+current parent is a no-op, so untraced calls (e.g. GET /memory) cost one
+contextvar lookup.
+"""
+from typing import Dict, List, Optional, Any, Callable, Iterator
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+from agent_server.metrics.metrics import REGISTRY, ERRORS
+
+TRACE_EXPORTS_DROPPED = REGISTRY.counter(
+    "agent_trace_exports_dropped_total", "Finished traces not exported because the export queue was full"
+)
+TRACE_EXPORT_ERRORS = ERRORS.labels("trace_export")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("agent_current_span", default=None)
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "status")
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span"""
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        """Duration in milliseconds (up to now if the span is still open)"""
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict representation of the span"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+def current_span() -> Optional[Span]:
+    """Get the span active in the current context"""
+    return _current_span.get()
+
+
+class Tracer:
+    """
+    Tracer class recording spans into a bounded ring buffer.
+    """
+
+    def __init__(self, max_spans: int = 10000, export_path: Optional[str] = None, export_queue_size: int = 1000):
+        """
+        Initialize the tracer.
+
+        Args:
+            max_spans: Capacity of the ring buffer of finished spans
+            export_path: Optional file to which each finished trace is appended
+                as one line of OTLP-compatible JSON
+            export_queue_size: Finished traces waiting for the exporter thread
+                beyond which new ones are dropped
+        """
+        self.buffer: deque = deque(maxlen=max_spans)
+        # trace_id -> that trace's buffered spans, in buffer order
+        self.traces: Dict[str, deque] = {}
+        self._buffer_lock = threading.Lock()
+        self.export_path = export_path
+        self._export_lock = threading.Lock()
+        self.export_queue: queue.Queue = queue.Queue(maxsize=export_queue_size)
+        self._exporter: Optional[threading.Thread] = None
+        self._exporter_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        Open a span as a child of the current one.
+
+        Args:
+            name: Span name, e.g. "memory.set"
+            trace_id: Start (or join) this trace instead of the current span's trace;
+                the span becomes a root span
+            **attributes: Span attributes
+
+        Yields:
+            The span, or None when not inside a trace
+        """
+        parent = _current_span.get()
+        if trace_id is None and parent is None:
+            yield None
+            return
+
+        if trace_id is not None:
+            span = Span(trace_id, name, None, attributes)
+        else:
+            span = Span(parent.trace_id, name, parent.span_id, attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error"] = str(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self._record(span)
+            if span.parent_id is None and self.export_path:
+                self._export_async(span.trace_id, span.span_id)
+
+    def _record(self, span: Span) -> None:
+        """Append a finished span to the ring buffer and the trace index"""
+        if not self.buffer.maxlen:
+            return
+        with self._buffer_lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                evicted = self.buffer.popleft()
+                # The buffer is FIFO, so the evicted span is the oldest of its trace
+                spans = self.traces[evicted.trace_id]
+                spans.popleft()
+                if not spans:
+                    del self.traces[evicted.trace_id]
+            self.buffer.append(span)
+            self.traces.setdefault(span.trace_id, deque()).append(span)
+
+    def get_spans(self, trace_id: str) -> List[Span]:
+        """
+        Get the finished spans of a trace still held in the ring buffer.
+
+        Args:
+            trace_id: The trace ID (the workflow/task ID)
+
+        Returns:
+            The spans ordered by start time
+        """
+        with self._buffer_lock:
+            spans = list(self.traces.get(trace_id, ()))
+        spans.sort(key=lambda span: span.start_ns)
+        return spans
+
+    def get_tree(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Build the span tree of a trace for a flamegraph view.
+
+        Args:
+            trace_id: The trace ID
+
+        Returns:
+            Dict with the trace's extent and its root spans (each with nested
+            "children"), or None if no span of the trace is buffered
+        """
+        spans = self.get_spans(trace_id)
+        if not spans:
+            return None
+
+        nodes = {span.span_id: {**span.to_dict(), "children": []} for span in spans}
+        roots = []
+        for span in spans:
+            node = nodes[span.span_id]
+            parent = nodes.get(span.parent_id) if span.parent_id else None
+            if parent is not None:
+                parent["children"].append(node)
+            else:
+                # Root spans, or children whose parent was evicted from the buffer
+                roots.append(node)
+
+        start_ns = min(span.start_ns for span in spans)
+        end_ns = max(span.end_ns for span in spans)
+        return {
+            "trace_id": trace_id,
+            "start_ns": start_ns,
+            "end_ns": end_ns,
+            "duration_ms": round((end_ns - start_ns) / 1e6, 3),
+            "span_count": len(spans),
+            "roots": roots
+        }
+
+    def get_subtree(self, trace_id: str, root_span_id: str) -> List[Span]:
+        """
+        Get a root span and all of its buffered descendants.
+
+        Args:
+            trace_id: The trace ID
+            root_span_id: The ID of the root span
+
+        Returns:
+            The spans ordered by start time
+        """
+        spans = self.get_spans(trace_id)
+        included = {root_span_id}
+        # Spans are ordered by start time, so parents are seen before children
+        for span in spans:
+            if span.parent_id in included:
+                included.add(span.span_id)
+        return [span for span in spans if span.span_id in included]
+
+    def to_otlp(self, trace_id: str, spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+        """
+        Encode a trace as OTLP/JSON (ExportTraceServiceRequest).
+
+        Args:
+            trace_id: The trace ID
+            spans: The spans to encode (defaults to every buffered span of the trace)
+
+        Returns:
+            The OTLP JSON document
+        """
+        otlp_trace_id = uuid.uuid5(uuid.NAMESPACE_OID, trace_id).hex
+        otlp_spans = []
+        for span in spans if spans is not None else self.get_spans(trace_id):
+            otlp_spans.append({
+                "traceId": otlp_trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}}
+                    for key, value in {**span.attributes, "agent.trace_id": trace_id}.items()
+                ],
+                "status": {"code": 2 if span.status == "error" else 1}
+            })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "agent-server"}}]},
+                "scopeSpans": [{"scope": {"name": "agent_server.tracing"}, "spans": otlp_spans}]
+            }]
+        }
+
+    def export(self, trace_id: str, path: Optional[str] = None, spans: Optional[List[Span]] = None) -> None:
+        """
+        Append a trace as one line of OTLP JSON to a file.
+
+        Args:
+            trace_id: The trace ID
+            path: Target file (defaults to the tracer's export_path)
+            spans: The spans to export (defaults to every buffered span of the trace)
+        """
+        path = path or self.export_path
+        if not path:
+            return
+        line = json.dumps(self.to_otlp(trace_id, spans), separators=(",", ":"))
+        with self._export_lock:
+            with open(path, "a") as f:
+                f.write(line + "\n")
+
+    def flush(self) -> None:
+        """Block until every queued trace has been exported"""
+        self.export_queue.join()
+
+    def _export_async(self, trace_id: str, root_span_id: str) -> None:
+        """Queue a finished root span's subtree for the exporter thread (dropped when the queue is full)"""
+        try:
+            self.export_queue.put_nowait((trace_id, self.get_subtree(trace_id, root_span_id)))
+        except queue.Full:
+            TRACE_EXPORTS_DROPPED.inc()
+            return
+
+        if self._exporter is None:
+            with self._exporter_lock:
+                if self._exporter is None:
+                    self._exporter = threading.Thread(target=self._exporter_loop, name="trace-export", daemon=True)
+                    self._exporter.start()
+
+    def _exporter_loop(self) -> None:
+        """Exporter thread: append queued traces to the export file, one at a time"""
+        while True:
+            trace_id, spans = self.export_queue.get()
+            try:
+                self.export(trace_id, spans=spans)
+            except Exception as e:
+                TRACE_EXPORT_ERRORS.inc()
+                print(f"Error exporting trace {trace_id}: {str(e)}")
+            finally:
+                self.export_queue.task_done()
+
+
+# Process-wide tracer (AGENT_SERVER_TRACE_EXPORT enables file export)
+TRACER = Tracer(
+    max_spans=int(os.environ.get("AGENT_SERVER_TRACE_BUFFER", "10000")),
+    export_path=os.environ.get("AGENT_SERVER_TRACE_EXPORT"),
+    export_queue_size=int(os.environ.get("AGENT_SERVER_TRACE_EXPORT_QUEUE", "1000"))
+)
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator opening a span around each call of a function.
+
+    Args:
+        name: The span name
+
+    Returns:
+        The decorator; works for both coroutine and plain functions
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with TRACER.span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with TRACER.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,228 @@
+"""
+Watchdog Module
+
+This module is responsible for detecting event-loop stalls. A heartbeat task
+measures how late the loop wakes it up (scheduling lag); a sampling thread
+notices when the heartbeat stops beating and captures the stack of the event
+loop thread while it is still blocked, so the offending function can be
+reported along with the stall's duration.
+
+For tests, assert_no_blocking() runs a strict watchdog around a block of code
+and raises BlockingCallError if the loop was blocked longer than the limit.
+"""
+from typing import Dict, List, Optional, Any
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+from agent_server.metrics.metrics import REGISTRY
+
+LOOP_LAG = REGISTRY.histogram(
+    "agent_event_loop_lag_seconds",
+    "Event loop scheduling lag measured by the watchdog heartbeat",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_STALLS = REGISTRY.counter("agent_event_loop_stalls_total", "Event loop stalls longer than the watchdog threshold")
+
+# Frames from these paths are skipped when naming the offending function
+_INTERNAL_PATHS = (os.path.dirname(asyncio.__file__), os.path.dirname(threading.__file__) + os.sep + "threading.py")
+
+
+class BlockingCallError(AssertionError):
+    """Raised in strict mode when the event loop was blocked longer than allowed"""
+
+
+class LoopWatchdog:
+    """
+    LoopWatchdog class measuring event-loop lag and capturing blocking frames.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.1, max_offenders: int = 100, stack_depth: int = 15):
+        """
+        Initialize the watchdog.
+
+        Args:
+            interval: Seconds between heartbeats
+            threshold: Lag (seconds) above which a heartbeat counts as a stall
+            max_offenders: Number of recent stalls kept with their stacks
+            stack_depth: Number of frames kept per captured stack
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+
+        self.recent: deque = deque(maxlen=max_offenders)
+        self.offenders: Dict[str, Dict[str, Any]] = {}
+        self.stalls = 0
+        self.max_lag = 0.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._captured: Optional[List[str]] = None
+        self._captured_frame: Optional[Dict[str, str]] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self) -> None:
+        """Start the heartbeat task and the sampling thread on the running loop"""
+        if self._heartbeat_task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._sampler = threading.Thread(target=self._sample, name="loop-watchdog", daemon=True)
+        self._sampler.start()
+        # Let the heartbeat take its first reading before returning
+        await asyncio.sleep(0)
+
+    async def stop(self) -> None:
+        """Stop the heartbeat task and the sampling thread"""
+        self._stopped.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        if self._sampler is not None:
+            self._sampler.join(timeout=1.0)
+            self._sampler = None
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        """
+        Summarize the stalls seen so far.
+
+        Args:
+            limit: Maximum number of offenders and recent stalls to include
+
+        Returns:
+            Dict with the stall count, maximum lag, offenders ranked by total
+            blocked time and the most recent stalls with their stacks
+        """
+        offenders = sorted(self.offenders.values(), key=lambda o: o["total_ms"], reverse=True)
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "offenders": offenders[:limit],
+            "recent": list(self.recent)[-limit:]
+        }
+
+    def check(self, max_ms: Optional[float] = None) -> None:
+        """
+        Raise if any stall exceeded the limit (strict/debug mode).
+
+        Args:
+            max_ms: Limit in milliseconds (defaults to the watchdog threshold)
+
+        Raises:
+            BlockingCallError: If the loop was blocked longer than the limit
+        """
+        limit = max_ms if max_ms is not None else self.threshold * 1000
+        violations = [stall for stall in self.recent if stall["duration_ms"] > limit]
+        if violations:
+            lines = [f"Event loop blocked longer than {limit} ms:"]
+            for stall in violations:
+                lines.append(f"  {stall['duration_ms']} ms in {stall['function']} ({stall['location']})")
+            raise BlockingCallError("\n".join(lines))
+
+    async def _heartbeat(self) -> None:
+        """Measure scheduling lag; record a stall when it passes the threshold"""
+        loop = self._loop
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._last_beat = time.monotonic()
+            LOOP_LAG.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self.threshold:
+                self._record_stall(lag, self._captured, self._captured_frame)
+            self._captured = None
+            self._captured_frame = None
+
+    def _sample(self) -> None:
+        """Sampling thread: capture the loop thread's stack while the heartbeat is overdue"""
+        poll = max(self.threshold / 4, 0.001)
+        while not self._stopped.wait(poll):
+            overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue > self.threshold / 2 and self._captured is None:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    stack = traceback.extract_stack(frame)[-self.stack_depth:]
+                    self._captured_frame = self._offending_frame(stack)
+                    self._captured = [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in stack]
+
+    def _offending_frame(self, stack: traceback.StackSummary) -> Dict[str, str]:
+        """Pick the innermost frame outside asyncio/threading internals"""
+        for entry in reversed(stack):
+            if not entry.filename.startswith(_INTERNAL_PATHS):
+                return {"function": entry.name, "location": f"{entry.filename}:{entry.lineno}"}
+        entry = stack[-1]
+        return {"function": entry.name, "location": f"{entry.filename}:{entry.lineno}"}
+
+    def _record_stall(self, lag: float, stack: Optional[List[str]], offender: Optional[Dict[str, str]]) -> None:
+        """Record a stall and aggregate it per offending function"""
+        LOOP_STALLS.inc()
+        self.stalls += 1
+        duration_ms = round(lag * 1000, 3)
+
+        if not stack or offender is None:
+            # The stall ended before the sampler caught it
+            offender = {"function": "unknown", "location": "unknown"}
+
+        self.recent.append({
+            **offender,
+            "duration_ms": duration_ms,
+            "at": time.time(),
+            "stack": stack or []
+        })
+
+        key = f"{offender['function']} ({offender['location']})"
+        entry = self.offenders.setdefault(key, {**offender, "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + duration_ms, 3)
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+
+@asynccontextmanager
+async def assert_no_blocking(max_ms: float = 50.0, interval: float = 0.005):
+    """
+    Fail if the event loop is blocked longer than max_ms inside the block.
+
+    Usage in a test:
+
+        async with assert_no_blocking(max_ms=20):
+            await memory.set("key", large_value)
+
+    Args:
+        max_ms: Maximum tolerated stall in milliseconds
+        interval: Heartbeat interval in seconds
+
+    Yields:
+        The strict watchdog
+
+    Raises:
+        BlockingCallError: If a stall longer than max_ms was observed
+    """
+    watchdog = LoopWatchdog(interval=interval, threshold=max_ms / 1000)
+    await watchdog.start()
+    try:
+        yield watchdog
+        # Let the heartbeat observe a stall caused by the last awaited call
+        await asyncio.sleep(interval * 2)
+    finally:
+        await watchdog.stop()
+    watchdog.check(max_ms)
@@ -0,0 +1,377 @@
+"""
+Workflow Context Module
+
+This module is responsible for assembling the context handed to the reasoning
+module for each task in a workflow. Instead of copying the full workflow context
+and every previous result into a new dict per task, it builds read-only views
+and applies a configurable selection policy to the previous results.
+
+Without a byte budget the previous results are handed out as a ResultsView
+over the workflow's results list, so building a task's context costs O(1)
+however many tasks ran before it. The default policy can be set as JSON in
+the AGENT_SERVER_CONTEXT_POLICY environment variable, e.g.
+
+    {"last_n": 5, "max_tokens": 2000}
+
+and overridden per request.
+"""
+from typing import Dict, List, Optional, Any, Callable, Iterator, Sequence, Tuple, Union
+from collections import ChainMap
+from collections.abc import Sequence as SequenceABC
+from types import MappingProxyType
+import json
+import os
+
+# Rough bytes-per-token ratio used when a token budget is configured
+BYTES_PER_TOKEN = 4
+
+# Keys accepted by ContextPolicy.from_dict
+POLICY_FIELDS = {"last_n", "dependencies_only", "max_bytes", "max_tokens"}
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the serialized size of a value in bytes.
+
+    Args:
+        value: The value to measure
+
+    Returns:
+        The length of the compact JSON encoding of the value
+    """
+    try:
+        return len(json.dumps(value, separators=(",", ":"), default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class ResultsView(SequenceABC):
+    """
+    Read-only view of selected entries of a results list (nothing is copied).
+    """
+
+    __slots__ = ("results", "indices")
+
+    def __init__(self, results: Sequence[Any], indices: Sequence[int]):
+        """
+        Initialize the view.
+
+        Args:
+            results: The results list (index-aligned with the task queue)
+            indices: Indices of the visible results (a range is not copied)
+        """
+        self.results = results
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, item: Union[int, slice]) -> Any:
+        if isinstance(item, slice):
+            return ResultsView(self.results, self.indices[item])
+        return self.results[self.indices[item]]
+
+    def __iter__(self) -> Iterator[Any]:
+        results = self.results
+        for i in self.indices:
+            yield results[i]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (ResultsView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ResultsView({list(self)!r})"
+
+
+class ContextPolicy:
+    """
+    Policy describing which previous results are visible to a task.
+    """
+
+    def __init__(
+        self,
+        last_n: Optional[int] = None,
+        dependencies_only: bool = False,
+        max_bytes: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        summarizer: Optional[Callable[[Dict[str, Any], int], Dict[str, Any]]] = None
+    ):
+        """
+        Initialize the context policy.
+
+        Args:
+            last_n: Only expose the last N previous results
+            dependencies_only: Only expose results of the tasks listed in the
+                task's "depends_on" field (task indices)
+            max_bytes: Byte budget for the previous results
+            max_tokens: Token budget for the previous results (approximated
+                as BYTES_PER_TOKEN bytes per token)
+            summarizer: Optional hook called as summarizer(result, index) for
+                results that do not fit the budget; its return value is used
+                in place of the dropped result
+        """
+        self.last_n = last_n
+        self.dependencies_only = dependencies_only
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+
+    @property
+    def byte_budget(self) -> Optional[int]:
+        """The effective byte budget, combining max_bytes and max_tokens"""
+        budgets = [b for b in (self.max_bytes, self.max_tokens and self.max_tokens * BYTES_PER_TOKEN) if b]
+        return min(budgets) if budgets else None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ContextPolicy":
+        """
+        Build a policy from a plain dict (e.g. a request's context settings).
+
+        Args:
+            data: Dict with any of last_n, dependencies_only, max_bytes and
+                max_tokens
+
+        Returns:
+            The corresponding ContextPolicy
+
+        Raises:
+            ValueError: If data has unknown keys, or a count is not a
+                non-negative integer, or dependencies_only is not a boolean
+        """
+        if not data:
+            return cls()
+        if not isinstance(data, dict):
+            raise ValueError(f"Context policy must be an object, got {type(data).__name__}")
+        unknown = set(data) - POLICY_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown context policy fields: {', '.join(sorted(unknown))}")
+        for field in ("last_n", "max_bytes", "max_tokens"):
+            value = data.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 0):
+                raise ValueError(f"Context policy {field} must be a non-negative integer, got {value!r}")
+        if not isinstance(data.get("dependencies_only", False), bool):
+            raise ValueError(f"Context policy dependencies_only must be a boolean, got {data['dependencies_only']!r}")
+        return cls(
+            last_n=data.get("last_n"),
+            dependencies_only=data.get("dependencies_only", False),
+            max_bytes=data.get("max_bytes"),
+            max_tokens=data.get("max_tokens")
+        )
+
+    @classmethod
+    def from_env(cls) -> "ContextPolicy":
+        """
+        Build the policy from AGENT_SERVER_CONTEXT_POLICY (unbounded when unset).
+
+        Returns:
+            The context policy
+        """
+        return cls.from_dict(json.loads(os.environ.get("AGENT_SERVER_CONTEXT_POLICY") or "{}"))
+
+
+class ContextAssembler:
+    """
+    ContextAssembler class for building per-task context views.
+    """
+
+    def __init__(self, policy: Optional[ContextPolicy] = None):
+        """
+        Initialize the context assembler.
+
+        Args:
+            policy: The default policy applied to every workflow
+        """
+        self.policy = policy or ContextPolicy()
+
+        # Cached result sizes, keyed by workflow ID and aligned with the results list
+        self.result_sizes: Dict[str, List[int]] = {}
+
+        # Running sums of the cached sizes (prefix_sizes[k] = size of results[:k]),
+        # extended lazily as prefixes of completed results are handed out
+        self.prefix_sizes: Dict[str, List[int]] = {}
+
+        # Cached size of each workflow's base context
+        self.base_sizes: Dict[str, int] = {}
+
+        # Context bytes handed out per call, keyed by workflow ID
+        self.stats: Dict[str, List[Dict[str, Any]]] = {}
+
+        # Totals across all workflows
+        self.total_calls = 0
+        self.total_context_bytes = 0
+
+    def record_result(self, workflow_id: str, result: Any, index: Optional[int] = None) -> None:
+        """
+        Record the size of a newly produced task result.
+
+        Args:
+            workflow_id: The ID of the workflow
+            result: The task result that was appended to the results list
+            index: Index of the result in the results list, when results are
+                produced out of order (defaults to the next index)
+        """
+        sizes = self.result_sizes.setdefault(workflow_id, [])
+        if index is None:
+            sizes.append(estimate_size(result))
+            return
+        if index >= len(sizes):
+            sizes.extend([estimate_size(None)] * (index + 1 - len(sizes)))
+        sizes[index] = estimate_size(result)
+
+    def assemble(
+        self,
+        workflow_id: str,
+        base_context: Dict[str, Any],
+        task: Dict[str, Any],
+        task_index: int,
+        total_tasks: int,
+        results: Sequence[Any],
+        policy: Optional[ContextPolicy] = None,
+        visible: Optional[Sequence[int]] = None
+    ) -> MappingProxyType:
+        """
+        Build the read-only context for a single task.
+
+        Args:
+            workflow_id: The ID of the workflow
+            base_context: The workflow-level context (not copied)
+            task: The task about to be executed
+            task_index: The index of the task in the queue
+            total_tasks: Total number of tasks in the workflow
+            results: Results produced so far (index-aligned with the task queue)
+            policy: Optional policy overriding the assembler default
+            visible: Indices of the results the task may see, all completed
+                (all of results by default; a range is not copied)
+
+        Returns:
+            A read-only mapping layering the per-task keys over the base context
+        """
+        policy = policy or self.policy
+        sizes = self.result_sizes.setdefault(workflow_id, [])
+        if workflow_id not in self.base_sizes:
+            self.base_sizes[workflow_id] = estimate_size(base_context)
+
+        selected = self._select(policy, task, range(len(results)) if visible is None else visible)
+        previous_results, results_bytes = self._apply_budget(workflow_id, policy, selected, results, sizes)
+
+        overlay = {
+            "previous_results": previous_results,
+            "current_task_index": task_index,
+            "total_tasks": total_tasks
+        }
+
+        context_bytes = self.base_sizes[workflow_id] + results_bytes
+        self.stats.setdefault(workflow_id, []).append({
+            "task_index": task_index,
+            "results_included": len(previous_results),
+            "results_available": len(results) if visible is None else len(visible),
+            "context_bytes": context_bytes
+        })
+        self.total_calls += 1
+        self.total_context_bytes += context_bytes
+
+        return MappingProxyType(ChainMap(overlay, base_context))
+
+    def get_stats(self, workflow_id: str) -> List[Dict[str, Any]]:
+        """
+        Get per-call context size instrumentation for a workflow.
+
+        Args:
+            workflow_id: The ID of the workflow
+
+        Returns:
+            List of per-call records with the context bytes handed out
+        """
+        return list(self.stats.get(workflow_id, []))
+
+    def last_stat(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the instrumentation record of a workflow's latest assemble() call.
+
+        Args:
+            workflow_id: The ID of the workflow
+
+        Returns:
+            The record, or None if no context was assembled yet
+        """
+        stats = self.stats.get(workflow_id)
+        return stats[-1] if stats else None
+
+    def release(self, workflow_id: str) -> None:
+        """
+        Drop cached sizes and stats for a finished workflow.
+
+        Args:
+            workflow_id: The ID of the workflow
+        """
+        self.result_sizes.pop(workflow_id, None)
+        self.prefix_sizes.pop(workflow_id, None)
+        self.base_sizes.pop(workflow_id, None)
+        self.stats.pop(workflow_id, None)
+
+    def _select(
+        self,
+        policy: ContextPolicy,
+        task: Dict[str, Any],
+        visible: Sequence[int]
+    ) -> Sequence[int]:
+        """Select the indices of the previous results visible to a task (ranges stay ranges)"""
+        indices = visible
+
+        if policy.dependencies_only:
+            allowed = visible if isinstance(visible, range) else set(visible)
+            depends_on = task.get("depends_on") or []
+            indices = [i for i in depends_on if isinstance(i, int) and i in allowed]
+
+        if policy.last_n is not None:
+            indices = indices[-policy.last_n:] if policy.last_n > 0 else []
+
+        return indices
+
+    def _apply_budget(
+        self,
+        workflow_id: str,
+        policy: ContextPolicy,
+        indices: Sequence[int],
+        results: Sequence[Any],
+        sizes: List[int]
+    ) -> Tuple[Sequence[Any], int]:
+        """Apply the byte budget, keeping the most recent results first"""
+        budget = policy.byte_budget
+
+        def size_of(i: int) -> int:
+            return sizes[i] if i < len(sizes) else estimate_size(results[i])
+
+        if budget is None:
+            if isinstance(indices, range) and indices.step == 1:
+                prefix = self._prefix_sizes(workflow_id, indices.stop, size_of)
+                used = prefix[indices.stop] - prefix[indices.start] if indices else 0
+            else:
+                used = sum(size_of(i) for i in indices)
+            return ResultsView(results, indices), used
+
+        kept = []
+        used = 0
+        for i in reversed(indices):
+            size = size_of(i)
+            if used + size <= budget:
+                kept.append(results[i])
+                used += size
+            elif policy.summarizer:
+                summary = policy.summarizer(results[i], i)
+                summary_size = estimate_size(summary)
+                if used + summary_size <= budget:
+                    kept.append(summary)
+                    used += summary_size
+
+        kept.reverse()
+        return tuple(kept), used
+
+    def _prefix_sizes(self, workflow_id: str, stop: int, size_of: Callable[[int], int]) -> List[int]:
+        """Extend a workflow's running size sums up to results[:stop] (amortized O(1) per task)"""
+        prefix = self.prefix_sizes.setdefault(workflow_id, [0])
+        for i in range(len(prefix) - 1, stop):
+            prefix.append(prefix[-1] + size_of(i))
+        return prefix
@@ -3,20 +3,78 @@ Workflow Module
 
 This module is responsible for managing the workflow execution, including tracking
 nodes, variables, and workflow types.
+
+Every state transition bumps the workflow's version (the shared store's row
+version in multi-worker mode) and wakes the coroutines parked in
+wait_for_change(), which backs the ETag and long-poll support of /status.
+
+Node and workflow transitions are published as events on the workflow's
+EventBus; each action subscribes to the event named by its action_trigger and
+is executed (through Action.execute when an Action is given) when it fires.
+The workflow's final write waits for the actions it triggered, so it carries
+their responses.
+
+Tasks run as a DAG: a task carrying depends_on (indices of earlier tasks, as
+produced by Planning) starts as soon as those tasks completed. Parallelism
+hints apply per group: the tasks sharing a parallel_group (the parallel
+sub-plan Planning put them in) run at most that many at a time, and so do
+the tasks without one, so a wide sub-plan does not widen the rest of the
+plan. A task without depends_on waits for the previous one, so plain queues
+still run in order.
+A task's context only holds the results of the tasks it (transitively)
+depends on, never those of unrelated tasks that happened to finish first.
 """
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Sequence, Union
 import uuid
 import asyncio
+import heapq
 import time
+from contextlib import nullcontext
 from datetime import datetime
 
+from agent_server.workflow.context import ContextAssembler, ContextPolicy
+from agent_server.state.state import LeaseLost, make_worker_id
+from agent_server.metrics.metrics import REGISTRY, ERRORS
+from agent_server.tracing.tracing import TRACER
+from agent_server.admission.admission import DEFAULT_TENANT
+from agent_server.simulation.simulation import LatencyProfile
+from agent_server.events.events import (
+    EventBus, WorkflowEvent, resolve_trigger,
+    NODE_STARTED, NODE_COMPLETED, NODE_FAILED, WORKFLOW_COMPLETED, WORKFLOW_FAILED
+)
+
+ACTIVE_WORKFLOWS = REGISTRY.gauge("agent_workflows_active", "Workflows currently executing in this process")
+QUEUE_DEPTH = REGISTRY.gauge("agent_workflow_queue_depth", "Workflows initialized in this process but not started yet")
+WORKFLOW_ERRORS = ERRORS.labels("workflow")
+LEASES_LOST = REGISTRY.counter("agent_workflow_leases_lost_total", "Workflow executions stopped because their lease was lost")
+CONTEXT_BYTES = REGISTRY.histogram(
+    "agent_workflow_context_bytes", "Bytes of context handed to each workflow node",
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+
 class Workflow:
     """
     Workflow class for managing the execution of agent tasks and workflows.
     """
     
-    def __init__(self):
-        """Initialize the workflow module"""
+    def __init__(self, context_policy: Optional[ContextPolicy] = None, store=None, worker_id: Optional[str] = None, admission=None, action=None, events: Optional[EventBus] = None, latency: Optional[LatencyProfile] = None, max_parallel_nodes: int = 16):
+        """
+        Initialize the workflow module
+
+        Args:
+            context_policy: Default policy for the context handed to each task
+            store: Optional shared SQLiteStateStore for multi-worker deployments
+            worker_id: Identifier of this worker process (used for leases)
+            admission: Optional AdmissionController whose fair scheduler hands
+                out execution slots across tenants
+            action: Optional Action module executing the workflow actions
+                (without it, triggered actions just record a success response)
+            events: Optional EventBus the workflow events are published on
+            latency: Latency profile simulating tasks executed without a
+                reasoning module (1 s per task by default)
+            max_parallel_nodes: Upper bound on the tasks of one workflow
+                running at once, whatever the plan's parallelism hints
+        """
         # Store for active workflows
         self.active_workflows = {}
         
@@ -28,8 +86,41 @@ class Workflow:
         
         # Supported workflow types
         self.workflow_types = ["sequential", "parallel", "conditional"]
+
+        # Builds the per-task context views
+        self.context_assembler = ContextAssembler(context_policy)
+        
+        # Per-workflow context policy overrides
+        self.context_policies = {}
+        
+        # Shared state backend and the workflows this worker currently owns
+        self.store = store
+        self.worker_id = worker_id or make_worker_id()
+        self.owned = set()
+        
+        # Execution slots are shared fairly across tenants
+        self.admission = admission
+        
+        # Workflows initialized here and not started yet (queue depth gauge)
+        self.queued = set()
+        
+        # Version of each workflow and the events waking wait_for_change()
+        self.versions = {}
+        self._changed = {}
+        self._waiting = {}
+        
+        # Actions subscribe to the node/workflow events of their workflow
+        self.action = action
+        self.events = events or EventBus()
+        self.dispatches = {}
+        
+        # Simulated latency and failures of tasks run without reasoning
+        self.latency = latency or LatencyProfile()
+        
+        # Tasks with depends_on run as a DAG, bounded by the parallelism hint of their group
+        self.max_parallel_nodes = max_parallel_nodes
     
-    async def initialize(self, task_queue: List[Dict[str, Any]], actions: List[Dict[str, Any]], context: Optional[Dict[str, Any]] = None) -> str:
+    async def initialize(self, task_queue: List[Dict[str, Any]], actions: List[Dict[str, Any]], context: Optional[Dict[str, Any]] = None, context_policy: Optional[ContextPolicy] = None, workflow_id: Optional[str] = None, tenant: Optional[str] = None) -> str:
         """
         Initialize a new workflow.
         
@@ -37,16 +128,20 @@ class Workflow:
             task_queue: List of tasks to execute
             actions: List of actions to perform
             context: Optional context for the workflow
+            context_policy: Optional policy overriding the default task context policy
+            workflow_id: Optional pre-generated ID (e.g. when a trace was started under it)
+            tenant: The tenant the workflow belongs to (for fair scheduling)
         
         Returns:
             The ID of the new workflow
         """
         # Generate a unique ID for this workflow
-        workflow_id = str(uuid.uuid4())
+        workflow_id = workflow_id or str(uuid.uuid4())
         
         # Create workflow structure
         workflow = {
             "id": workflow_id,
+            "tenant": tenant or DEFAULT_TENANT,
             "type": "sequential",  # Default type
             "task_queue": task_queue,
             "actions": actions,
@@ -72,13 +167,25 @@ class Workflow:
                 "status": "pending",
                 "index": i,
                 "result": None,
-                "error": None
+                "error": None,
+                "context_bytes": None,
+                "duration": None,
+                "finished_at": None
             }
             self.nodes[workflow_id].append(node)
         
+        if context_policy:
+            self.context_policies[workflow_id] = context_policy
+        
         # Initialize variables for this workflow
         self.variables[workflow_id] = context.copy() if context else {}
         
+        self.queued.add(workflow_id)
+        QUEUE_DEPTH.inc()
+        
+        # Publish the workflow so any worker can claim it
+        await self._persist(workflow_id)
+        
         return workflow_id
     
     async def execute(self, workflow_id: str, reasoning=None, memory=None) -> Dict[str, Any]:
@@ -96,61 +203,95 @@ class Workflow:
         if workflow_id not in self.active_workflows:
             raise ValueError(f"Workflow {workflow_id} not found")
         
+        # Wait (queued) for an execution slot when the scheduler is saturated
+        tenant = self.active_workflows[workflow_id].get("tenant", DEFAULT_TENANT)
+        slot = self.admission.slot(tenant) if self.admission is not None else nullcontext()
+        async with slot:
+            if workflow_id in self.queued:
+                self.queued.discard(workflow_id)
+                QUEUE_DEPTH.dec()
+            
+            ACTIVE_WORKFLOWS.inc()
+            try:
+                return await self._execute(workflow_id, reasoning, memory)
+            finally:
+                ACTIVE_WORKFLOWS.dec()
+    
+    async def _execute(self, workflow_id: str, reasoning, memory) -> Dict[str, Any]:
+        """Run the workflow's tasks (see execute())"""
         workflow = self.active_workflows[workflow_id]
         workflow["status"] = "running"
+        await self._persist(workflow_id)
         
         # Save workflow status to memory if available
         if memory:
             await memory.set(f"workflow_{workflow_id}", workflow, "short_term")
         
-        # Execute each task in the queue
-        task_results = []
-        
-        for i, task in enumerate(workflow["task_queue"]):
-            workflow["current_task_index"] = i
-            
-            # Update node status
-            self.nodes[workflow_id][i]["status"] = "running"
-            
-            try:
-                # Execute the task using reasoning if available
-                if reasoning:
-                    # Include any workflow context and previous results as context
-                    context = {
-                        **workflow["context"],
-                        "previous_results": task_results,
-                        "current_task_index": i,
-                        "total_tasks": len(workflow["task_queue"])
-                    }
-                    
-                    result = await reasoning.execute_task(task, context)
-                    
-                    # Save result
-                    task_results.append(result)
-                    
-                    # Update node with result
-                    self.nodes[workflow_id][i]["result"] = result
-                    self.nodes[workflow_id][i]["status"] = "completed"
-                    
-                    # Save to memory if available
-                    if memory:
-                        await memory.set(f"task_result_{task.get('task_description')}", result, "long_term")
-                        await memory.set("intermediate_outcomes", {f"task_{i}": result}, "short_term")
-                else:
-                    # Mock execution
-                    await asyncio.sleep(1)  # Simulate work
-                    result = {"status": "success", "message": f"Executed task {i}: {task.get('task_description')}"}
-                    task_results.append(result)
-                    self.nodes[workflow_id][i]["result"] = result
-                    self.nodes[workflow_id][i]["status"] = "completed"
-            
-            except Exception as e:
-                # Handle error
-                error = {"message": str(e), "task_index": i, "task": task}
-                workflow["errors"].append(error)
-                self.nodes[workflow_id][i]["status"] = "failed"
-                self.nodes[workflow_id][i]["error"] = error
-                break
+        # Subscribe the actions to the events named by their triggers
+        self._subscribe_actions(workflow_id)
+        
+        # Execute the task queue as a DAG: a task starts once the tasks it
+        # depends on have completed, up to its group's parallelism limit at a time
+        task_queue = workflow["task_queue"]
+        task_results: List[Any] = [None] * len(task_queue)
+        
+        # Nodes completed before a lease takeover are not re-executed
+        done = {i for i, node in enumerate(self.nodes[workflow_id]) if node["status"] == "completed"}
+        for i in sorted(done):
+            task_results[i] = self.nodes[workflow_id][i]["result"]
+            self.context_assembler.record_result(workflow_id, task_results[i], i)
+        
+        dependencies = [self._dependencies(task, i) for i, task in enumerate(task_queue)]
+        ancestors = self._ancestors(dependencies)
+        waiting_on = [sum(1 for dependency in deps if dependency not in done) for deps in dependencies]
+        dependents: List[List[int]] = [[] for _ in task_queue]
+        for i, deps in enumerate(dependencies):
+            for dependency in deps:
+                dependents[dependency].append(i)
+        ready = [i for i in range(len(task_queue)) if i not in done and waiting_on[i] == 0]
+        heapq.heapify(ready)
+        
+        def completed(i: int) -> None:
+            for dependent in dependents[i]:
+                waiting_on[dependent] -= 1
+                if waiting_on[dependent] == 0:
+                    heapq.heappush(ready, dependent)
+        
+        groups = [task.get("parallel_group") for task in task_queue]
+        limits = self._group_limits(task_queue)
+        in_group = dict.fromkeys(limits, 0)
+        running: Dict[asyncio.Task, int] = {}
+        failed = False
+        try:
+            while True:
+                # Ready tasks of a group at its limit wait for one of its tasks
+                blocked = []
+                while ready and not failed and len(running) < self.max_parallel_nodes:
+                    i = heapq.heappop(ready)
+                    if in_group[groups[i]] >= limits[groups[i]]:
+                        blocked.append(i)
+                        continue
+                    in_group[groups[i]] += 1
+                    workflow["current_task_index"] = i
+                    running[asyncio.ensure_future(self._run_node(workflow_id, i, task_results, ancestors[i], reasoning, memory))] = i
+                for i in blocked:
+                    heapq.heappush(ready, i)
+                if not running:
+                    break
+                
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    i = running.pop(task)
+                    in_group[groups[i]] -= 1
+                    if task.result():
+                        completed(i)
+                    else:
+                        # No new task starts after a failure; running ones finish
+                        failed = True
+        finally:
+            # Only left over when the workflow itself is cancelled
+            for task in running:
+                task.cancel()
         
         # Update workflow status
         if len(workflow["errors"]) > 0:
@@ -160,21 +301,233 @@ class Workflow:
             workflow["results"] = task_results
         
         workflow["completed_at"] = datetime.now().isoformat()
-        
-        # Execute any "task_complete" actions
-        if workflow["status"] == "completed":
-            for action in workflow["actions"]:
-                if action.get("action_trigger") == "task_complete":
-                    action["action_response"] = {"status": "success", "message": "Action executed"}
-        
-        # Save final workflow status to memory if available
+        self.context_assembler.release(workflow_id)
+        self.context_policies.pop(workflow_id, None)
+        
+        # Fan out to the subscribed actions ("task_complete" ones included)
+        # and wait for every action of this run, so the final write below
+        # carries their responses
+        self._publish(
+            WORKFLOW_COMPLETED if workflow["status"] == "completed" else WORKFLOW_FAILED,
+            workflow_id,
+            data={"status": workflow["status"], "errors": len(workflow["errors"])}
+        )
+        dispatches = self.dispatches.pop(workflow_id, None)
+        if dispatches:
+            await asyncio.gather(*dispatches, return_exceptions=True)
+        self.events.unsubscribe_workflow(workflow_id)
+        
+        await self._persist(workflow_id)
+        
+        # Save final workflow status (and one execution record per node) to memory if available
         if memory:
+            await memory.set("past_executions", self._execution_records(workflow_id), "long_term")
             await memory.set(f"workflow_{workflow_id}", workflow, "long_term")
             # Also save the last completed workflow
             await memory.set("last_completed_workflow", workflow_id, "short_term")
         
         return workflow
     
+    async def _run_node(self, workflow_id: str, i: int, task_results: List[Any], visible: Sequence[int], reasoning, memory) -> bool:
+        """Execute a workflow node inside its trace span"""
+        task = self.active_workflows[workflow_id]["task_queue"][i]
+        with TRACER.span("workflow.node", node_index=i, task_description=task.get("task_description")) as span:
+            if await self._execute_node(workflow_id, i, task, task_results, visible, reasoning, memory):
+                return True
+            if span is not None:
+                span.status = "error"
+            return False
+    
+    def _dependencies(self, task: Dict[str, Any], i: int) -> List[int]:
+        """
+        Get the indices of the tasks a task waits for: its depends_on entries
+        that point to earlier tasks, or the previous task when it has none.
+        """
+        if "depends_on" not in task:
+            return [i - 1] if i > 0 else []
+        return sorted({d for d in task["depends_on"] or [] if isinstance(d, int) and 0 <= d < i})
+    
+    def _ancestors(self, dependencies: List[List[int]]) -> List[Sequence[int]]:
+        """
+        Get the indices of the tasks each task transitively depends on (all
+        completed by the time it starts), as a range when they are all the
+        tasks before it, as in a sequential queue.
+        """
+        ancestors: List[Sequence[int]] = []
+        for i, deps in enumerate(dependencies):
+            if i - 1 in deps and ancestors[i - 1] == range(i - 1):
+                ancestors.append(range(i))
+                continue
+            found = set(deps).union(*(ancestors[d] for d in deps))
+            ancestors.append(range(i) if len(found) == i else sorted(found))
+        return ancestors
+    
+    def _group_limits(self, task_queue: List[Dict[str, Any]]) -> Dict[Optional[str], int]:
+        """
+        Get how many tasks of each parallel group may run at once (the largest
+        hint in the group, capped); tasks without a group form the None group.
+        """
+        limits: Dict[Optional[str], int] = {}
+        for task in task_queue:
+            group = task.get("parallel_group")
+            hint = max(1, min(int(task.get("parallelism") or 1), self.max_parallel_nodes))
+            limits[group] = max(limits.get(group, 1), hint)
+        return limits
+    
+    async def _execute_node(self, workflow_id: str, i: int, task: Dict[str, Any], task_results: List[Any], visible: Sequence[int], reasoning, memory) -> bool:
+        """
+        Execute a single workflow node.
+        
+        Args:
+            workflow_id: The ID of the workflow
+            i: Index of the node
+            task: The node's task
+            task_results: Results of the workflow's tasks, index-aligned with
+                the task queue (None for tasks not completed yet)
+            visible: Indices of the tasks the node transitively depends on,
+                whose results its context may include
+            reasoning: The reasoning module instance
+            memory: The memory module instance
+        
+        Returns:
+            True if the node completed, False if it failed
+        """
+        workflow = self.active_workflows[workflow_id]
+        
+        # Update node status
+        self.nodes[workflow_id][i]["status"] = "running"
+        started = asyncio.get_running_loop().time()
+        await self._persist(workflow_id)
+        self._publish(NODE_STARTED, workflow_id, i, {"task_description": task.get("task_description")})
+        
+        try:
+            # Execute the task using reasoning if available
+            if reasoning:
+                # Build a read-only view of the workflow context and the
+                # previous results selected by the context policy
+                context = self.context_assembler.assemble(
+                    workflow_id,
+                    workflow["context"],
+                    task,
+                    i,
+                    len(workflow["task_queue"]),
+                    task_results,
+                    policy=self.context_policies.get(workflow_id),
+                    visible=visible
+                )
+                context_bytes = self.context_assembler.last_stat(workflow_id)["context_bytes"]
+                self.nodes[workflow_id][i]["context_bytes"] = context_bytes
+                CONTEXT_BYTES.observe(context_bytes)
+                
+                result = await reasoning.execute_task(task, context)
+                
+                # Save result
+                task_results[i] = result
+                self.context_assembler.record_result(workflow_id, result, i)
+                
+                # Update node with result
+                self.nodes[workflow_id][i]["result"] = result
+                self.nodes[workflow_id][i]["status"] = "completed"
+                
+                # Save to memory if available
+                if memory:
+                    await memory.set(f"task_result_{task.get('task_description')}", result, "long_term")
+                    await memory.set("intermediate_outcomes", {f"task_{i}": result}, "short_term")
+            else:
+                # Mock execution
+                await self.latency.run_task(task)  # Simulate work
+                result = {"status": "success", "message": f"Executed task {i}: {task.get('task_description')}"}
+                task_results[i] = result
+                self.nodes[workflow_id][i]["result"] = result
+                self.nodes[workflow_id][i]["status"] = "completed"
+            
+            self._finish_node(workflow_id, i, started)
+            await self._persist(workflow_id)
+            self._publish(NODE_COMPLETED, workflow_id, i, {"task_description": task.get("task_description"), "result": result})
+        
+        except LeaseLost:
+            # Another worker owns the workflow now; stop without writing
+            raise
+        
+        except Exception as e:
+            # Handle error
+            WORKFLOW_ERRORS.inc()
+            error = {"message": str(e), "task_index": i, "task": task}
+            workflow["errors"].append(error)
+            self.nodes[workflow_id][i]["status"] = "failed"
+            self.nodes[workflow_id][i]["error"] = error
+            self._finish_node(workflow_id, i, started)
+            await self._persist(workflow_id)
+            self._publish(NODE_FAILED, workflow_id, i, {"task_description": task.get("task_description"), "error": error["message"]})
+            return False
+        
+        return True
+    
+    def _finish_node(self, workflow_id: str, i: int, started: float) -> None:
+        """Record when a node finished and how long it ran (in event-loop time)"""
+        node = self.nodes[workflow_id][i]
+        node["duration"] = round(asyncio.get_running_loop().time() - started, 6)
+        node["finished_at"] = time.time()
+    
+    def _execution_records(self, workflow_id: str) -> List[Dict[str, Any]]:
+        """Build the past-execution records (one per finished node) of a workflow"""
+        workflow = self.active_workflows[workflow_id]
+        records = []
+        for node in self.nodes[workflow_id]:
+            if node["status"] not in ("completed", "failed"):
+                continue
+            result = node["result"] if isinstance(node["result"], dict) else {}
+            records.append({
+                "timestamp": node.get("finished_at"),
+                "workflow_id": workflow_id,
+                "tenant": workflow.get("tenant", DEFAULT_TENANT),
+                "task": node["task"].get("task_description"),
+                "agent": node["task"].get("responsible_agent"),
+                "status": node["status"],
+                "duration": node.get("duration"),
+                "confidence": result.get("confidence")
+            })
+        return records
+    
+    def _subscribe_actions(self, workflow_id: str) -> None:
+        """Subscribe each action of a workflow to the event its trigger names"""
+        self.events.unsubscribe_workflow(workflow_id)
+        for action in self.active_workflows[workflow_id]["actions"]:
+            event_type = resolve_trigger(action.get("action_trigger"))
+            if event_type is None:
+                continue
+            self.events.subscribe(event_type, self._action_handler(action), workflow_id, action.get("node_index"))
+    
+    def _action_handler(self, action: Dict[str, Any]):
+        """Build the event handler executing an action and recording its response"""
+        async def handle(event: WorkflowEvent) -> None:
+            if self.action is None:
+                action["action_response"] = {"status": "success", "message": "Action executed"}
+            else:
+                parameters = {**action.get("parameters", {}), "event": event.to_dict()}
+                action["action_response"] = await self.action.execute({**action, "parameters": parameters})
+            # Once the workflow finished, its final write (which waits for
+            # this handler) saves the response
+            workflow = self.active_workflows.get(event.workflow_id)
+            if workflow is not None and workflow["status"] == "running":
+                await self._persist(event.workflow_id)
+        return handle
+    
+    def _publish(self, event_type: str, workflow_id: str, node_index: Optional[int] = None, data: Optional[Dict[str, Any]] = None) -> None:
+        """Publish a workflow event on the event bus, tracking its dispatch until the workflow finishes"""
+        dispatch = self.events.publish(WorkflowEvent(event_type, workflow_id, node_index, data))
+        if dispatch is not None:
+            self.dispatches.setdefault(workflow_id, set()).add(dispatch)
+            dispatch.add_done_callback(lambda done: self._dispatched(workflow_id, done))
+    
+    def _dispatched(self, workflow_id: str, dispatch: asyncio.Task) -> None:
+        """Forget a finished dispatch (and the workflow's entry with its last one)"""
+        dispatches = self.dispatches.get(workflow_id)
+        if dispatches is not None:
+            dispatches.discard(dispatch)
+            if not dispatches:
+                del self.dispatches[workflow_id]
+    
     async def get_status(self, workflow_id: str) -> Optional[Dict[str, Any]]:
         """
         Get the status of a workflow.
@@ -185,14 +538,32 @@ class Workflow:
         Returns:
             The status of the workflow, or None if not found
         """
-        if workflow_id not in self.active_workflows:
+        if self.store is not None and workflow_id not in self.owned:
+            # Another worker may own this workflow; the store is authoritative
+            loaded = await asyncio.to_thread(self.store.load_workflow, workflow_id)
+            if loaded is None:
+                return None
+            workflow, _, version = loaded
+        elif workflow_id not in self.active_workflows:
             return None
-        
-        workflow = self.active_workflows[workflow_id]
+        else:
+            workflow = self.active_workflows[workflow_id]
+            version = self.versions.get(workflow_id, 0)
+        
+        if "task_queue" not in workflow:
+            # Task entries registered through update_task_status()
+            return {
+                "id": workflow["id"],
+                "status": workflow["status"],
+                "version": version,
+                "result": workflow.get("result"),
+                "completed_at": workflow.get("completed_at")
+            }
         
         return {
             "id": workflow["id"],
             "status": workflow["status"],
+            "version": version,
             "current_task_index": workflow["current_task_index"],
             "total_tasks": len(workflow["task_queue"]),
             "started_at": workflow["started_at"],
@@ -201,6 +572,197 @@ class Workflow:
             "errors": workflow.get("errors", [])
         }
     
+    async def get_version(self, workflow_id: str) -> Optional[int]:
+        """
+        Get the version of a workflow without building its status.
+        
+        Args:
+            workflow_id: The ID of the workflow
+        
+        Returns:
+            The version, or None if not found
+        """
+        if self.store is not None and workflow_id not in self.owned:
+            return await asyncio.to_thread(self.store.workflow_version, workflow_id)
+        if workflow_id not in self.active_workflows:
+            return None
+        return self.versions.get(workflow_id, 0)
+    
+    async def wait_for_change(self, workflow_id: str, since: int, timeout: float, poll_interval: float = 0.5) -> Optional[int]:
+        """
+        Wait until a workflow's version differs from a known one.
+        
+        Args:
+            workflow_id: The ID of the workflow
+            since: The version the caller already has
+            timeout: Maximum seconds to wait
+            poll_interval: Seconds between store checks for workflows owned by
+                another worker (multi-worker mode only)
+        
+        Returns:
+            The current version (equal to since on timeout), or None if not found
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            version = await self.get_version(workflow_id)
+            remaining = deadline - loop.time()
+            if version is None or version != since or remaining <= 0:
+                return version
+            
+            if self.store is not None and workflow_id not in self.owned:
+                # Owned by another worker: its transitions only show in the store
+                await asyncio.sleep(min(remaining, poll_interval))
+                continue
+            
+            # The local version was read without suspending, so no transition
+            # happened since; the event is dropped with its last waiter
+            changed = self._changed.setdefault(workflow_id, asyncio.Event())
+            self._waiting[workflow_id] = self._waiting.get(workflow_id, 0) + 1
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiting[workflow_id] -= 1
+                if not self._waiting[workflow_id]:
+                    del self._waiting[workflow_id]
+                    if self._changed.get(workflow_id) is changed:
+                        del self._changed[workflow_id]
+    
+    async def execute_with_lease(self, workflow_id: str, reasoning=None, memory=None) -> Optional[Dict[str, Any]]:
+        """
+        Claim a workflow's lease and execute it, renewing the lease while it runs.
+        Without a shared store this is the same as execute().
+        
+        Args:
+            workflow_id: The ID of the workflow to execute
+            reasoning: The reasoning module instance
+            memory: The memory module instance
+        
+        Returns:
+            The result of the workflow execution, or None if another worker holds the lease
+        """
+        if self.store is None:
+            return await self.execute(workflow_id, reasoning=reasoning, memory=memory)
+        
+        claimed = await asyncio.to_thread(self.store.claim_workflow, self.worker_id, workflow_id)
+        if claimed is None:
+            return None
+        return await self._run_claimed(claimed, reasoning, memory)
+    
+    async def run_claim_loop(self, reasoning=None, memory=None, poll_interval: float = 1.0, max_concurrent: int = 8) -> None:
+        """
+        Keep claiming runnable workflows (new ones, or ones whose owner's lease
+        expired) from the shared store and execute them. Runs until cancelled.
+        
+        Args:
+            reasoning: The reasoning module instance
+            memory: The memory module instance
+            poll_interval: Seconds to wait when nothing is claimable
+            max_concurrent: Maximum workflows this worker executes at once
+        """
+        if self.store is None:
+            return
+        
+        slots = asyncio.Semaphore(max_concurrent)
+        running = set()
+        
+        async def run(claimed_id: str) -> None:
+            try:
+                await self._run_claimed(claimed_id, reasoning, memory)
+            except Exception as e:
+                print(f"Error executing claimed workflow {claimed_id}: {str(e)}")
+            finally:
+                slots.release()
+        
+        while True:
+            await slots.acquire()
+            claimed = await asyncio.to_thread(self.store.claim_workflow, self.worker_id)
+            if claimed is None:
+                slots.release()
+                await asyncio.sleep(poll_interval)
+                continue
+            task = asyncio.create_task(run(claimed))
+            running.add(task)
+            task.add_done_callback(running.discard)
+    
+    async def _run_claimed(self, workflow_id: str, reasoning, memory) -> Dict[str, Any]:
+        """
+        Execute a workflow whose lease this worker holds.
+        
+        Raises:
+            LeaseLost: If the lease was lost (and the execution stopped) before it finished
+        """
+        # The store is authoritative: another worker may have progressed the
+        # workflow since this worker last saw it
+        loaded = await asyncio.to_thread(self.store.load_workflow, workflow_id)
+        if loaded is None:
+            await asyncio.to_thread(self.store.release_lease, workflow_id, self.worker_id)
+            raise ValueError(f"Workflow {workflow_id} not found")
+        self.active_workflows[workflow_id], self.nodes[workflow_id], self.versions[workflow_id] = loaded
+        
+        self.owned.add(workflow_id)
+        execution = asyncio.ensure_future(self.execute(workflow_id, reasoning=reasoning, memory=memory))
+        heartbeat = asyncio.create_task(self._renew_lease(workflow_id, execution))
+        try:
+            return await execution
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                self._abandon(workflow_id)
+                raise LeaseLost(f"Lost lease on workflow {workflow_id}") from None
+            raise
+        except LeaseLost:
+            LEASES_LOST.inc()
+            self._abandon(workflow_id)
+            raise
+        finally:
+            heartbeat.cancel()
+            execution.cancel()
+            self.owned.discard(workflow_id)
+            await asyncio.to_thread(self.store.release_lease, workflow_id, self.worker_id)
+    
+    async def _renew_lease(self, workflow_id: str, execution: asyncio.Future) -> None:
+        """Renew a lease periodically while the workflow executes; cancel the execution once it is lost"""
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            if not await asyncio.to_thread(self.store.renew_lease, workflow_id, self.worker_id):
+                LEASES_LOST.inc()
+                execution.cancel()
+                return
+    
+    def _abandon(self, workflow_id: str) -> None:
+        """Drop the local state of a workflow whose lease was lost (its new owner's state is in the store)"""
+        self.events.unsubscribe_workflow(workflow_id)
+        self.dispatches.pop(workflow_id, None)
+        self.context_assembler.release(workflow_id)
+        self.context_policies.pop(workflow_id, None)
+        self.active_workflows.pop(workflow_id, None)
+        self.nodes.pop(workflow_id, None)
+        self.variables.pop(workflow_id, None)
+        self.versions.pop(workflow_id, None)
+    
+    async def _persist(self, workflow_id: str) -> None:
+        """
+        Publish a state transition: bump the workflow's version, write it to the
+        shared store (if any) and wake the waiters in wait_for_change().
+        """
+        if self.store is None:
+            self.versions[workflow_id] = self.versions.get(workflow_id, 0) + 1
+        else:
+            # Writes under this worker's lease are fenced by it (LeaseLost once it is gone)
+            self.versions[workflow_id] = await asyncio.to_thread(
+                self.store.save_workflow,
+                workflow_id,
+                self.active_workflows[workflow_id],
+                self.nodes.get(workflow_id, []),
+                self.worker_id if workflow_id in self.owned else None
+            )
+        
+        changed = self._changed.pop(workflow_id, None)
+        if changed is not None:
+            changed.set()
+    
     # A2A Workflow Support Methods
     async def register_workflow(self, workflow_name: str, workflow_definition: Dict[str, Any]) -> None:
         """
@@ -232,6 +794,7 @@ class Workflow:
                 workflow["result"] = result
             if status == "completed":
                 workflow["completed_at"] = datetime.now().isoformat()
+            await self._persist(task_id)
         else:
             # Create new task entry
             self.active_workflows[task_id] = {
@@ -241,6 +804,8 @@ class Workflow:
                 "created_at": datetime.now().isoformat(),
                 "completed_at": datetime.now().isoformat() if status == "completed" else None
             }
+            self.nodes.setdefault(task_id, [])
+            await self._persist(task_id)
     
     async def get_workflow_template(self, workflow_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -0,0 +1,212 @@
+"""
+API Load Benchmark
+
+Drives the /execute -> /status flow end to end at several concurrency levels:
+each client submits a task, then polls /status until the workflow finishes.
+With --long-poll, clients park on /status?wait=&since=<version> instead of
+polling on an interval.
+
+Two transports are supported:
+
+- asgi: the app runs in-process and requests go through httpx's ASGI transport
+  (measures the application without socket overhead)
+- uvicorn: a local uvicorn server is started in a subprocess (optionally with
+  several workers and the shared state backend) and driven over HTTP
+
+Usage:
+    python -m benchmarks.bench_api --mode asgi uvicorn --concurrency 1 8 32 \\
+        --workflows 200 --baseline benchmarks/baselines/api.json
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import add_arguments, finish, make_report, summarize
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EXECUTE_PAYLOAD = {
+    "agent_goal": "Benchmark the agent server",
+    "agent_role": "benchmark",
+    "task": "Summarize the benchmark input",
+    "expected_output": "A summary"
+}
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    concurrency: int,
+    workflows: int,
+    poll_interval: float,
+    long_poll: bool = False
+) -> Dict[str, float]:
+    """
+    Run the submit-and-poll loop with a fixed number of concurrent clients.
+
+    Args:
+        client: HTTP client bound to the app
+        concurrency: Number of concurrent clients
+        workflows: Total number of workflows to submit
+        poll_interval: Seconds between status polls of one client
+        long_poll: Wait for the next version change instead of sleeping between polls
+
+    Returns:
+        Latency summaries, throughput and error counts
+    """
+    execute_samples: List[float] = []
+    status_samples: List[float] = []
+    end_to_end_samples: List[float] = []
+    errors = 0
+    remaining = iter(range(workflows))
+
+    async def client_loop() -> None:
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.post("/execute", json=EXECUTE_PAYLOAD)
+            execute_samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+                continue
+            task_id = response.json()["task_id"]
+
+            params = {}
+            while True:
+                polled = time.perf_counter()
+                response = await client.get(f"/status/{task_id}", params=params)
+                status_samples.append(time.perf_counter() - polled)
+                if response.status_code != 200:
+                    errors += 1
+                    break
+                body = response.json()
+                if body["status"] in ("completed", "failed"):
+                    break
+                if long_poll:
+                    params = {"wait": 30, "since": body["version"]}
+                else:
+                    await asyncio.sleep(poll_interval)
+            end_to_end_samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    results = {
+        "workflows_per_sec": round(len(end_to_end_samples) / elapsed, 3) if elapsed else 0.0,
+        "errors": errors
+    }
+    results.update(summarize("execute", execute_samples))
+    results.update(summarize("status", status_samples))
+    results.update(summarize("end_to_end", end_to_end_samples))
+    return results
+
+
+async def run_asgi(levels: List[int], workflows: int, poll_interval: float, long_poll: bool = False) -> Dict[str, float]:
+    """Benchmark the app in-process through the ASGI transport"""
+    from agent_server.main import create_app
+    from agent_server.services import Services
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        services = Services(include_a2a=False, memory_path=os.path.join(directory, "memory_storage.json"))
+        app = create_app(services=services, include_a2a=False)
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for level in levels:
+                    level_results = await drive(client, level, workflows, poll_interval, long_poll)
+                    results.update({f"asgi_c{level}_{key}": value for key, value in level_results.items()})
+    return results
+
+
+def free_port() -> int:
+    """Pick a free local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(base_url: str, timeout: float = 30.0) -> None:
+    """Wait for the server's health endpoint to answer"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s")
+
+
+async def run_uvicorn(levels: List[int], workflows: int, poll_interval: float, workers: int, long_poll: bool = False) -> Dict[str, float]:
+    """Benchmark a local uvicorn server started in a subprocess"""
+    results = {}
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+        if workers > 1:
+            env["AGENT_SERVER_STATE_DB"] = os.path.join(directory, "state.db")
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "agent_server.main:app",
+             "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=directory,
+            env=env
+        )
+        try:
+            await wait_until_up(base_url)
+            limits = httpx.Limits(max_connections=max(levels) * 2)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+                for level in levels:
+                    level_results = await drive(client, level, workflows, poll_interval, long_poll)
+                    results.update({f"uvicorn_w{workers}_c{level}_{key}": value for key, value in level_results.items()})
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, float]:
+    results = {}
+    if "asgi" in args.mode:
+        results.update(await run_asgi(args.concurrency, args.workflows, args.poll_interval, args.long_poll))
+    if "uvicorn" in args.mode:
+        results.update(await run_uvicorn(args.concurrency, args.workflows, args.poll_interval, args.workers, args.long_poll))
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent server /execute -> /status load benchmark")
+    parser.add_argument("--mode", nargs="+", choices=["asgi", "uvicorn"], default=["asgi"], help="Transports to benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrent client counts")
+    parser.add_argument("--workflows", type=int, default=200, help="Workflows submitted per concurrency level")
+    parser.add_argument("--poll-interval", type=float, default=0.01, help="Seconds between status polls")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (uvicorn mode)")
+    parser.add_argument("--long-poll", action="store_true", help="Long-poll /status instead of polling on an interval")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = make_report(
+        "api", results,
+        mode=args.mode, concurrency=args.concurrency, workflows=args.workflows,
+        poll_interval=args.poll_interval, workers=args.workers, long_poll=args.long_poll
+    )
+    return finish(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
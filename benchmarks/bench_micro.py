@@ -0,0 +1,159 @@
+"""
+Micro-benchmarks
+
+Measures the hot paths of the components directly, without HTTP:
+
+- Memory.set / Memory.get at several store sizes (entries already stored), and
+  the final Memory.flush that waits for the background writes
+- Workflow.initialize and Workflow.execute (with the Reasoning module)
+- Action.execute through a registered no-op handler
+- EventBus.publish of an event matching one handler, with as many other
+  workflows' actions subscribed as the memory store sizes
+
+Usage:
+    python -m benchmarks.bench_micro --sizes 100 1000 10000 --iterations 200 \\
+        --baseline benchmarks/baselines/micro.json
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from benchmarks.common import add_arguments, finish, make_report, summarize, time_async_calls
+from agent_server.memory.memory import Memory
+from agent_server.workflow.workflow import Workflow
+from agent_server.reasoning.reasoning import Reasoning
+from agent_server.action.action import Action
+from agent_server.events.events import EventBus, WorkflowEvent, NODE_COMPLETED, WORKFLOW_COMPLETED
+
+
+def make_task_queue(length: int) -> List[Dict[str, str]]:
+    """Build a task queue shaped like Planning's output"""
+    return [
+        {
+            "task_description": f"Step {i} of the benchmark task",
+            "responsible_agent": "executor",
+            "required_tool": None,
+            "expected_output": "Task result"
+        }
+        for i in range(length)
+    ]
+
+
+async def bench_memory(sizes: List[int], iterations: int) -> Dict[str, float]:
+    """Benchmark Memory.set/get against stores of the given sizes"""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            memory = Memory(storage_path=os.path.join(directory, f"memory_{size}.json"))
+            memory.long_term_memory["task_results"].update({
+                f"task {i}": {"reasoning_output": f"Reasoning complete for: task {i}", "confidence": 0.85}
+                for i in range(size)
+            })
+
+            counter = iter(range(10 ** 9))
+            set_samples = await time_async_calls(
+                lambda: memory.set("intermediate_outcomes", {f"bench_{next(counter)}": {"value": 1}}),
+                iterations
+            )
+            get_samples = await time_async_calls(lambda: memory.get(f"task {size // 2}", "long_term"), iterations)
+            flush_samples = await time_async_calls(memory.flush, 1)
+            memory.close()
+
+            results.update(summarize(f"memory_set_{size}", set_samples))
+            results.update(summarize(f"memory_get_{size}", get_samples))
+            results.update(summarize(f"memory_flush_{size}", flush_samples))
+    return results
+
+
+async def bench_workflow(iterations: int, tasks: int) -> Dict[str, float]:
+    """Benchmark Workflow.initialize/execute with the Reasoning module"""
+    with tempfile.TemporaryDirectory() as directory:
+        memory = Memory(storage_path=os.path.join(directory, "memory.json"))
+        workflow = Workflow()
+        reasoning = Reasoning()
+        task_queue = make_task_queue(tasks)
+        actions = [{"action_trigger": "task_complete", "actual_task": "bench", "parameters": {}, "action_response": None}]
+
+        workflow_ids = []
+
+        async def initialize() -> None:
+            workflow_ids.append(await workflow.initialize(task_queue=task_queue, actions=actions, context={"bench": True}))
+
+        init_samples = await time_async_calls(initialize, iterations)
+
+        pending = iter(workflow_ids)
+        execute_samples = await time_async_calls(
+            lambda: workflow.execute(next(pending), reasoning=reasoning, memory=memory),
+            iterations
+        )
+        await memory.flush()
+        memory.close()
+
+    results = {}
+    results.update(summarize("workflow_initialize", init_samples))
+    results.update(summarize(f"workflow_execute_{tasks}_tasks", execute_samples))
+    return results
+
+
+async def bench_action(iterations: int) -> Dict[str, float]:
+    """Benchmark Action.execute through a registered handler"""
+    action = Action()
+
+    async def handler(task, parameters):
+        return {"status": "success"}
+
+    action.register_action("bench", handler)
+    payload = {"action_trigger": "bench", "actual_task": "bench task", "parameters": {"goal": "bench"}}
+    samples = await time_async_calls(lambda: action.execute(payload), iterations)
+    return summarize("action_execute", samples)
+
+
+async def bench_events(sizes: List[int], iterations: int) -> Dict[str, float]:
+    """Benchmark publishing (and dispatching) an event with many unrelated subscriptions"""
+    results = {}
+    for size in sizes:
+        bus = EventBus()
+
+        async def handler(event):
+            return None
+
+        for i in range(size):
+            bus.subscribe(WORKFLOW_COMPLETED, handler, f"workflow {i}")
+            bus.subscribe(NODE_COMPLETED, handler, f"workflow {i}", node_index=0)
+        bus.subscribe(NODE_COMPLETED, handler, "bench")
+
+        async def publish():
+            await bus.publish(WorkflowEvent(NODE_COMPLETED, "bench", 0))
+
+        samples = await time_async_calls(publish, iterations)
+        results.update(summarize(f"event_publish_{size}_subscribed", samples))
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, float]:
+    results = {}
+    results.update(await bench_memory(args.sizes, args.iterations))
+    results.update(await bench_workflow(args.iterations, args.tasks))
+    results.update(await bench_action(args.iterations))
+    results.update(await bench_events(args.sizes, args.iterations))
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent server micro-benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Memory store sizes")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per measurement")
+    parser.add_argument("--tasks", type=int, default=3, help="Tasks per benchmarked workflow")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = make_report("micro", results, sizes=args.sizes, iterations=args.iterations, tasks=args.tasks)
+    return finish(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Serialization Benchmark
+
+Compares the available serializers (orjson, msgspec, stdlib json) and the
+previous pretty-printed stdlib configuration on representative payloads:
+
+- workflow: a finished workflow (Workflow.initialize + execute with Reasoning)
+- status: the /status response body of that workflow
+- memory: a Memory snapshot holding --memory-entries task results
+
+For each payload and serializer it reports encode and decode throughput
+(documents per second) and the encoded size in bytes.
+
+Usage:
+    python -m benchmarks.bench_serialization --tasks 10 --memory-entries 10000 \\
+        --baseline benchmarks/baselines/serialization.json
+"""
+from typing import Dict, Any
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import add_arguments, finish, make_report
+from benchmarks.bench_micro import make_task_queue
+from agent_server.memory.memory import Memory
+from agent_server.workflow.workflow import Workflow
+from agent_server.reasoning.reasoning import Reasoning
+from agent_server.serialization.serialization import available_serializers, get_serializer
+
+
+async def build_payloads(tasks: int, memory_entries: int) -> Dict[str, Any]:
+    """Build the workflow, status and memory payloads"""
+    with tempfile.TemporaryDirectory() as directory:
+        memory = Memory(storage_path=os.path.join(directory, "memory.json"))
+        workflow = Workflow()
+        actions = [{"action_trigger": "task_complete", "actual_task": "bench", "parameters": {}, "action_response": None}]
+        workflow_id = await workflow.initialize(task_queue=make_task_queue(tasks), actions=actions, context={"bench": True})
+        await workflow.execute(workflow_id, reasoning=Reasoning(), memory=memory)
+        await workflow.events.drain()
+        await memory.flush()
+        memory.close()
+
+    task_results = {
+        f"task_result_task {i}": {
+            "reasoning_output": f"Reasoning complete for: task {i}",
+            "approach": "direct",
+            "confidence": 0.85,
+            "task_id": f"{i}"
+        }
+        for i in range(memory_entries)
+    }
+    return {
+        "workflow": workflow.active_workflows[workflow_id],
+        "status": await workflow.get_status(workflow_id),
+        "memory": {
+            "long_term": {"retrieval_docs": {}, "knowledge_database": {}, "task_results": task_results},
+            "short_term": {"intermediate_outcomes": {}, "recent_interactions": [], "context": {}, "chat_history": []},
+            "executions": memory.executions.to_dict(),
+            "last_updated": "2025-01-01T00:00:00"
+        }
+    }
+
+
+def throughput(func, min_seconds: float) -> float:
+    """Call func repeatedly for at least min_seconds; return calls per second"""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return round(calls / elapsed, 3)
+
+
+def bench(payloads: Dict[str, Any], min_seconds: float) -> Dict[str, float]:
+    """Measure encode/decode throughput and size per payload and serializer"""
+    serializers = {name: get_serializer(name) for name in available_serializers()}
+    serializers["json_pretty"] = get_serializer("json", pretty=True)
+
+    results = {}
+    for payload_name, payload in payloads.items():
+        for serializer_name, serializer in serializers.items():
+            encoded = serializer.dumps(payload)
+            prefix = f"{payload_name}_{serializer_name}"
+            results[f"{prefix}_bytes"] = len(encoded)
+            results[f"{prefix}_encode_per_sec"] = throughput(lambda: serializer.dumps(payload), min_seconds)
+            results[f"{prefix}_decode_per_sec"] = throughput(lambda: serializer.loads(encoded), min_seconds)
+    return results
+
+
+def run(args: argparse.Namespace) -> Dict[str, float]:
+    payloads = asyncio.run(build_payloads(args.tasks, args.memory_entries))
+    return bench(payloads, args.min_seconds)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent server serialization benchmark")
+    parser.add_argument("--tasks", type=int, default=10, help="Tasks in the benchmarked workflow")
+    parser.add_argument("--memory-entries", type=int, default=10000, help="Task results in the memory snapshot")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="Minimum time per measurement")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    results = run(args)
+    report = make_report(
+        "serialization", results,
+        tasks=args.tasks, memory_entries=args.memory_entries, serializers=available_serializers()
+    )
+    return finish(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
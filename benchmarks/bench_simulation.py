@@ -0,0 +1,166 @@
+"""
+Simulation Benchmark
+
+Runs a production-scale workload through the real Workflow, Action, Memory
+and fair scheduler on a virtual clock (agent_server.simulation), so hours of
+simulated traffic finish in seconds of wall time:
+
+- workflows arrive as a Poisson process at --arrival-rate per second, each
+  with the plan Planning generates, from tenants picked by --tenants weights
+- tasks and actions take the latencies (and fail at the rates) of the
+  --profile latency profile instead of calling a real backend
+- at most --capacity workflows execute at once; the rest queue in the
+  weighted fair scheduler
+
+It reports the simulated makespan and throughput, end-to-end and queueing
+latencies (overall and per tenant, in simulated milliseconds), failures, the
+memory snapshot size and the wall time the simulation took.
+
+Usage:
+    python -m benchmarks.bench_simulation --workflows 5000 --arrival-rate 50 --capacity 64 \\
+        --tenants acme:3 globex:1 --profile '{"seed": 7, "tasks": {"default": {"distribution": "lognormal", "median": 0.8, "sigma": 0.6}}}'
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.common import add_arguments, finish, make_report, summarize
+from agent_server.memory.memory import Memory
+from agent_server.workflow.workflow import Workflow
+from agent_server.planning.planning import Planning
+from agent_server.action.action import Action
+from agent_server.admission.admission import AdmissionController, TenantPolicy
+from agent_server.events.events import NODE_STARTED
+from agent_server.simulation.simulation import LatencyProfile, run_simulated
+
+
+def parse_tenants(specs: List[str]) -> List[Tuple[str, float]]:
+    """Parse "name:weight" tenant specs (weight defaults to 1)"""
+    tenants = []
+    for spec in specs:
+        name, _, weight = spec.partition(":")
+        tenants.append((name, float(weight or 1)))
+    return tenants
+
+
+async def simulate(
+    workflows: int,
+    arrival_rate: float,
+    capacity: Optional[int],
+    tenants: List[Tuple[str, float]],
+    profile: LatencyProfile,
+    seed: int,
+    use_memory: bool
+) -> Dict[str, float]:
+    """Run the simulated workload on the current (virtual-time) loop"""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    admission = AdmissionController(
+        policies={name: TenantPolicy(weight=weight) for name, weight in tenants},
+        capacity=capacity
+    )
+    workflow = Workflow(admission=admission, action=Action(latency=profile), latency=profile)
+    planning = Planning()
+
+    submitted: Dict[str, float] = {}
+    started: Dict[str, float] = {}
+    finished: Dict[str, float] = {}
+    tenant_of: Dict[str, str] = {}
+    failed = 0
+
+    async def on_started(event):
+        started[event.workflow_id] = loop.time()
+
+    workflow.events.subscribe(NODE_STARTED, on_started, node_index=0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        memory = Memory(storage_path=os.path.join(directory, "memory.json")) if use_memory else None
+
+        async def run(workflow_id: str) -> None:
+            nonlocal failed
+            result = await workflow.execute(workflow_id, memory=memory)
+            finished[workflow_id] = loop.time()
+            if result["status"] != "completed":
+                failed += 1
+
+        names = [name for name, _ in tenants]
+        weights = [weight for _, weight in tenants]
+        running = []
+        wall_started = time.perf_counter()
+        for i in range(workflows):
+            await asyncio.sleep(rng.expovariate(arrival_rate))
+            tenant = rng.choices(names, weights)[0]
+            plan = await planning.generate_plan({"agent_goal": f"Simulated goal {i}", "task": f"simulated task {i}"})
+            workflow_id = await workflow.initialize(
+                task_queue=plan["sub_task_queue"], actions=plan["actions"], context={"simulated": True}, tenant=tenant
+            )
+            submitted[workflow_id] = loop.time()
+            tenant_of[workflow_id] = tenant
+            running.append(asyncio.create_task(run(workflow_id)))
+
+        await asyncio.gather(*running)
+        await workflow.events.drain()
+        makespan = loop.time()
+        wall_seconds = time.perf_counter() - wall_started
+
+        snapshot_bytes = 0
+        if memory is not None:
+            await memory.flush()
+            memory.close()
+            snapshot_bytes = os.path.getsize(memory.storage_path)
+
+    latencies = [finished[w] - submitted[w] for w in finished]
+    waits = [started[w] - submitted[w] for w in started]
+    results = {
+        "simulated_seconds": round(makespan, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "simulated_seconds_per_sec": round(makespan / wall_seconds, 3) if wall_seconds else 0.0,
+        "workflows_per_sec": round(len(finished) / makespan, 3) if makespan else 0.0,
+        "failed_workflows": failed,
+        "failed_actions": sum(1 for record in workflow.action.action_history if record["status"] == "failed"),
+        "memory_snapshot_bytes": snapshot_bytes
+    }
+    results.update(summarize("workflow_latency", latencies))
+    results.update(summarize("scheduler_wait", waits))
+    for name in names:
+        results.update(summarize(f"tenant_{name}_latency", [finished[w] - submitted[w] for w in finished if tenant_of[w] == name]))
+    return results
+
+
+def run(args: argparse.Namespace) -> Dict[str, float]:
+    profile = LatencyProfile.from_dict(json.loads(args.profile)) if args.profile else LatencyProfile(seed=args.seed)
+    return run_simulated(simulate(
+        args.workflows, args.arrival_rate, args.capacity, parse_tenants(args.tenants), profile, args.seed, not args.no_memory
+    ))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent server simulation benchmark (virtual time)")
+    parser.add_argument("--workflows", type=int, default=2000, help="Workflows to simulate")
+    parser.add_argument("--arrival-rate", type=float, default=20.0, help="Workflow arrivals per simulated second")
+    parser.add_argument("--capacity", type=int, default=32, help="Workflows executing at once (0 for unlimited)")
+    parser.add_argument("--tenants", nargs="+", default=["default"], help="Tenants as name:weight")
+    parser.add_argument("--profile", help="Latency profile as JSON (see agent_server.simulation)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the arrival process (and of the default profile)")
+    parser.add_argument("--no-memory", action="store_true", help="Run the workflows without a Memory module")
+    add_arguments(parser)
+    args = parser.parse_args()
+    args.capacity = args.capacity or None
+
+    results = run(args)
+    report = make_report(
+        "simulation", results,
+        workflows=args.workflows, arrival_rate=args.arrival_rate, capacity=args.capacity,
+        tenants=args.tenants, profile=json.loads(args.profile) if args.profile else None, seed=args.seed
+    )
+    return finish(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Startup Benchmark
+
+Measures the cold-start cost of the agent server in fresh interpreters:
+
+- import time of agent_server.main (which builds the module-level app)
+- time to build a second app with create_app()
+- time until the first "/" and "/health" responses (in-process ASGI transport)
+
+Each run starts next to a memory_storage.json with --memory-entries stored
+executions, so regressions that make startup scale with stored history show up.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --memory-entries 50000 \\
+        --baseline benchmarks/baselines/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import add_arguments, finish, make_report
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a fresh interpreter per run; prints one JSON line with timings
+PROBE = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import agent_server.main as main
+import_seconds = time.perf_counter() - started
+
+started = time.perf_counter()
+app = main.create_app(include_a2a=False)
+create_app_seconds = time.perf_counter() - started
+
+timings = {"import_seconds": import_seconds, "create_app_seconds": create_app_seconds}
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+async def first_requests():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await client.get("/")
+        timings["first_root_seconds"] = time.perf_counter() - started
+        started = time.perf_counter()
+        await client.get("/health")
+        timings["first_health_seconds"] = time.perf_counter() - started
+
+if httpx is not None:
+    asyncio.run(first_requests())
+
+print(json.dumps(timings))
+"""
+
+
+def write_memory_file(directory: str, entries: int) -> None:
+    """Write a memory_storage.json with the given number of past executions"""
+    data = {
+        "long_term": {
+            "retrieval_docs": {},
+            "knowledge_database": {},
+            "past_executions": [
+                {"task": f"task {i}", "status": "completed", "result": {"confidence": 0.85}}
+                for i in range(entries)
+            ],
+            "task_results": {}
+        },
+        "short_term": {
+            "intermediate_outcomes": {},
+            "recent_interactions": [],
+            "context": {},
+            "chat_history": []
+        }
+    }
+    with open(os.path.join(directory, "memory_storage.json"), "w") as f:
+        json.dump(data, f)
+
+
+def run_probe(directory: str) -> dict:
+    """Run the startup probe once in a fresh interpreter"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=directory,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def collect(runs: int, memory_entries: int) -> dict:
+    """
+    Run the startup probe several times and take the median of each timing.
+
+    Args:
+        runs: Number of fresh-interpreter runs
+        memory_entries: Past executions in the memory file next to each run
+
+    Returns:
+        Median timings in milliseconds
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_memory_file(directory, memory_entries)
+        samples = [run_probe(directory) for _ in range(runs)]
+
+    results = {}
+    for metric in samples[0]:
+        results[metric.replace("_seconds", "_median_ms")] = round(
+            statistics.median(sample[metric] for sample in samples) * 1000, 3
+        )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent server startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh-interpreter runs")
+    parser.add_argument("--memory-entries", type=int, default=10000, help="Past executions in the memory file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    results = collect(args.runs, args.memory_entries)
+    report = make_report("startup", results, runs=args.runs, memory_entries=args.memory_entries)
+    return finish(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Benchmark Helpers
+
+Shared helpers for the benchmark scripts: timing, machine-readable result
+files and comparison against a stored baseline.
+
+Result files are JSON documents of the form:
+
+    {"benchmark": "<name>", "meta": {...}, "results": {"<metric>": <number>}}
+
+Metrics ending in "_per_sec" are treated as higher-is-better; every other
+metric (latencies, durations, bytes) is treated as lower-is-better.
+"""
+from typing import Dict, List, Any, Callable
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Compute a percentile of a list of samples (nearest-rank).
+
+    Args:
+        samples: The samples
+        pct: The percentile, between 0 and 100
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(prefix: str, samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples (in seconds) as milliseconds.
+
+    Args:
+        prefix: Metric name prefix
+        samples: Latency samples in seconds
+
+    Returns:
+        Dict with mean, p50, p95 and p99 in milliseconds
+    """
+    if not samples:
+        return {}
+    return {
+        f"{prefix}_mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        f"{prefix}_p50_ms": round(percentile(samples, 50) * 1000, 4),
+        f"{prefix}_p95_ms": round(percentile(samples, 95) * 1000, 4),
+        f"{prefix}_p99_ms": round(percentile(samples, 99) * 1000, 4)
+    }
+
+
+def time_calls(func: Callable[[], Any], iterations: int) -> List[float]:
+    """
+    Time repeated calls of a synchronous function.
+
+    Args:
+        func: The function to call
+        iterations: Number of calls
+
+    Returns:
+        Per-call durations in seconds
+    """
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def time_async_calls(func: Callable[[], Any], iterations: int) -> List[float]:
+    """
+    Time repeated awaits of a coroutine function.
+
+    Args:
+        func: The coroutine function to call
+        iterations: Number of calls
+
+    Returns:
+        Per-call durations in seconds
+    """
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def make_report(name: str, results: Dict[str, float], **meta: Any) -> Dict[str, Any]:
+    """
+    Build a machine-readable benchmark report.
+
+    Args:
+        name: Benchmark name
+        results: Metric values
+        **meta: Extra metadata (parameters of the run)
+
+    Returns:
+        The report dictionary
+    """
+    return {
+        "benchmark": name,
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            **meta
+        },
+        "results": results
+    }
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        results: Current metric values
+        baseline: Baseline metric values
+        tolerance: Allowed relative regression (0.2 = 20%)
+
+    Returns:
+        List of regressions, one dict per regressed metric
+    """
+    regressions = []
+    for metric, base in baseline.items():
+        current = results.get(metric)
+        if current is None or not base:
+            continue
+        if metric.endswith("_per_sec"):
+            change = (base - current) / base
+        else:
+            change = (current - base) / base
+        if change > tolerance:
+            regressions.append({
+                "metric": metric,
+                "baseline": base,
+                "current": current,
+                "regression_pct": round(change * 100, 2)
+            })
+    return regressions
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the common output and baseline arguments to a parser.
+
+    Args:
+        parser: The argument parser of a benchmark script
+    """
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against the report stored in this file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default: 0.2)")
+
+
+def finish(report: Dict[str, Any], args: argparse.Namespace) -> int:
+    """
+    Print and store a report and compare it against the baseline.
+
+    Args:
+        report: The report built by make_report()
+        args: Parsed arguments (see add_arguments())
+
+    Returns:
+        Process exit code: 1 if any metric regressed beyond the tolerance, else 0
+    """
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} not found; run with --save-baseline first", file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(report["results"], baseline.get("results", {}), args.tolerance)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['metric']}: {regression['baseline']} -> "
+            f"{regression['current']} (+{regression['regression_pct']}%)",
+            file=sys.stderr
+        )
+    return 1 if regressions else 0
+
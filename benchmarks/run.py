@@ -0,0 +1,70 @@
+"""
+Benchmark Suite Runner
+
+Runs the startup, micro, serialization, simulation and API benchmarks and writes one combined
+machine-readable report. With --baseline, every metric is compared against
+the stored baseline report and the process exits with status 1 when any
+metric regressed by more than --tolerance, so it can gate a deploy.
+
+Usage:
+    # Record a baseline on the reference machine
+    python -m benchmarks.run --baseline benchmarks/baseline.json --save-baseline
+
+    # Compare a candidate build against it
+    python -m benchmarks.run --baseline benchmarks/baseline.json --output bench_output.json
+"""
+import argparse
+import asyncio
+import sys
+
+from benchmarks import bench_api, bench_micro, bench_serialization, bench_simulation, bench_startup
+from benchmarks.common import add_arguments, finish, make_report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent server benchmark suite")
+    parser.add_argument("--suites", nargs="+", choices=["startup", "micro", "serialization", "simulation", "api"], default=["startup", "micro", "serialization", "simulation", "api"], help="Suites to run")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads for a fast smoke run")
+    parser.add_argument("--api-mode", nargs="+", choices=["asgi", "uvicorn"], default=["asgi"], help="API transports")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (uvicorn mode)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    iterations = 50 if args.quick else 200
+    workflows = 50 if args.quick else 200
+    concurrency = [1, 8] if args.quick else [1, 8, 32]
+    sizes = [100, 1000] if args.quick else [100, 1000, 10000]
+
+    results = {}
+    if "startup" in args.suites:
+        results.update(bench_startup.collect(runs=3 if args.quick else 5, memory_entries=10000))
+    if "micro" in args.suites:
+        micro_args = argparse.Namespace(sizes=sizes, iterations=iterations, tasks=3)
+        results.update(asyncio.run(bench_micro.run(micro_args)))
+    if "serialization" in args.suites:
+        serialization_args = argparse.Namespace(
+            tasks=10, memory_entries=1000 if args.quick else 10000, min_seconds=0.1 if args.quick else 0.5
+        )
+        results.update(bench_serialization.run(serialization_args))
+    if "simulation" in args.suites:
+        simulation_args = argparse.Namespace(
+            workflows=200 if args.quick else 2000, arrival_rate=20.0, capacity=32, tenants=["default"],
+            profile=None, seed=0, no_memory=False
+        )
+        results.update({f"simulation_{name}": value for name, value in bench_simulation.run(simulation_args).items()})
+    if "api" in args.suites:
+        api_args = argparse.Namespace(
+            mode=args.api_mode, concurrency=concurrency, workflows=workflows,
+            poll_interval=0.01, workers=args.workers, long_poll=False
+        )
+        results.update(asyncio.run(bench_api.run(api_args)))
+
+    report = make_report(
+        "suite", results,
+        suites=args.suites, quick=args.quick, api_mode=args.api_mode, workers=args.workers
+    )
+    return finish(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from agent_server.admission.admission import (
+    ADMISSIONS, DEFAULT_TENANT, AdmissionController, AdmissionRejected, TenantPolicy
+)
+
+
+def test_unknown_tenants_share_the_default_label():
+    controller = AdmissionController(
+        policies={"acme": TenantPolicy(rate=100, max_concurrent=4)},
+        default_policy=TenantPolicy(rate=50, max_concurrent=2)
+    )
+    for i in range(500):
+        controller.admit(f"header-value-{i}")
+        controller.release(f"header-value-{i}")
+    controller.admit("acme")
+
+    labels = {key[0] for key in ADMISSIONS.children}
+    assert not any(label.startswith("header-value-") for label in labels)
+    assert {"acme", DEFAULT_TENANT} <= labels
+    assert controller.in_flight == {"acme": 1}
+    assert controller.label_in_flight == {DEFAULT_TENANT: 0, "acme": 1}
+
+
+def test_unknown_tenants_keep_their_own_quota():
+    controller = AdmissionController(default_policy=TenantPolicy(max_concurrent=1))
+    controller.admit("alice")
+    with pytest.raises(AdmissionRejected):
+        controller.admit("alice")
+    controller.admit("bob")
+
+
+def test_idle_buckets_are_evicted_and_bounded():
+    controller = AdmissionController(default_policy=TenantPolicy(rate=1, burst=1), max_tenants=10)
+    for i in range(10):
+        controller.admit(f"tenant-{i}")
+        controller.release(f"tenant-{i}")
+    assert len(controller.buckets) == 10
+
+    # Over the cap, further unknown tenants share the default tenant's bucket
+    controller.admit("tenant-10")
+    with pytest.raises(AdmissionRejected):
+        controller.admit("tenant-11")
+    assert len(controller.buckets) == 11
+
+    # Refilled buckets are dropped, after which tenants get their own again
+    assert controller.evict_idle(time.monotonic() + 10) == 11
+    assert controller.buckets == {}
+    controller.admit("tenant-11")
+
+
+def test_unconfigured_tenants_are_scheduled_in_their_own_lanes():
+    async def main():
+        controller = AdmissionController(capacity=1)
+        served = []
+        hold = asyncio.Event()
+
+        async def run(tenant):
+            async with controller.slot(tenant):
+                served.append(tenant)
+                await asyncio.sleep(0)
+
+        async def holder():
+            async with controller.slot("alice"):
+                await hold.wait()
+
+        blocker = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        # alice floods the queue before bob asks for anything
+        tasks = [asyncio.create_task(run("alice")) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(run("bob")) for _ in range(3)]
+        await asyncio.sleep(0)
+        hold.set()
+        await asyncio.gather(blocker, *tasks)
+
+        assert served == ["alice", "bob", "alice", "bob", "alice", "bob"]
+        scheduler = controller.scheduler
+        assert scheduler.last_tags == {} and scheduler.queued_by_tenant == {} and scheduler.running_by_tenant == {}
+        assert scheduler.running_by_label == {DEFAULT_TENANT: 0} and scheduler.queued_by_label == {DEFAULT_TENANT: 0}
+
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+import asyncio
+import sys
+import threading
+import time
+
+from agent_server.analytics.analytics import ExecutionStore
+from agent_server.memory.memory import Memory
+from agent_server.state.state import SQLiteStateStore
+
+
+def test_snapshot_taken_while_appending_reloads(tmp_path):
+    store = ExecutionStore()
+    done = threading.Event()
+
+    def append():
+        for i in range(20000):
+            store.append({"timestamp": 1000.0 + i, "status": f"status-{i}", "agent": f"agent-{i % 7}", "duration": 1.0})
+        done.set()
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        writer = threading.Thread(target=append)
+        writer.start()
+        while not done.is_set():
+            reloaded = ExecutionStore.from_dict(store.to_dict())
+            records = reloaded.records()
+            if records:
+                assert records[-1]["status"] == f"status-{len(records) - 1}"
+        writer.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_store_mode_queries_only_read_new_rows(tmp_path):
+    async def main():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        memory = Memory(store=store)
+        other = Memory(store=store)
+        now = time.time()
+
+        def rows(agent, n):
+            return [{"timestamp": now, "agent": agent, "status": "completed", "duration": 1.0} for _ in range(n)]
+
+        await memory.set("past_executions", rows("executor", 3), "long_term")
+        first = await memory.query_executions(group_by=["agent"], metrics=["count"])
+
+        reads = []
+        original = store.memory_list_since
+
+        def memory_list_since(*args):
+            result = original(*args)
+            reads.append(len(result))
+            return result
+        store.memory_list_since = memory_list_since
+
+        # Rows written by another worker are picked up by the next query
+        await other.set("past_executions", rows("planner", 2), "long_term")
+        second = await memory.query_executions(group_by=["agent"], metrics=["count"])
+        third = await memory.query_executions(group_by=["agent"], metrics=["count"])
+
+        assert first == [{"agent": "executor", "count": 3}]
+        assert second == third == [{"agent": "executor", "count": 3}, {"agent": "planner", "count": 2}]
+        assert reads == [2, 0]
+
+    asyncio.run(main())
+
+
+def test_store_mode_retention_deletes_store_rows(tmp_path):
+    async def main():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        memory = Memory(store=store, storage_path=str(tmp_path / "memory.json"))
+        other = Memory(store=store)
+        day = 86400.0
+        old = [{"timestamp": 10 * day + 5, "agent": "old", "status": "completed"} for _ in range(3)]
+        recent = [{"timestamp": 12 * day + 5, "agent": "recent", "status": "completed"} for _ in range(2)]
+        await memory.set("past_executions", old + recent, "long_term")
+        assert len(await memory.query_executions(group_by=["agent"], metrics=["count"])) == 2
+
+        assert await memory.drop_executions(12 * day + 60) == 3
+
+        expected = [{"agent": "recent", "count": 2}]
+        assert await memory.query_executions(group_by=["agent"], metrics=["count"]) == expected
+        assert await other.query_executions(group_by=["agent"], metrics=["count"]) == expected
+        assert len(store.memory_get_list("long_term", "past_executions")) == 2
+        assert not (tmp_path / "memory.json").exists()
+
+    asyncio.run(main())
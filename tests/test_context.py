@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+import pytest
+
+from agent_server.main import create_app
+from agent_server.services import Services
+from agent_server.workflow.context import ContextAssembler, ContextPolicy, ResultsView, estimate_size
+from agent_server.workflow.workflow import CONTEXT_BYTES, Workflow
+
+
+def assemble_all(assembler, results, **kwargs):
+    contexts = []
+    for i, result in enumerate(results):
+        contexts.append(assembler.assemble("wf", {"goal": "g"}, {}, i, len(results), results, visible=range(i), **kwargs))
+        assembler.record_result("wf", result, i)
+    return contexts
+
+
+def test_default_policy_hands_out_views_without_copying():
+    results = [{"n": i} for i in range(50)]
+    assembler = ContextAssembler()
+    contexts = assemble_all(assembler, results)
+
+    last = contexts[-1]["previous_results"]
+    assert isinstance(last, ResultsView)
+    assert last.results is results
+    assert list(last) == results[:49]
+    assert last[-1] == {"n": 48}
+    assert contexts[-1]["goal"] == "g"
+
+
+def test_context_bytes_match_the_visible_results():
+    results = [{"n": i, "text": "x" * i} for i in range(20)]
+    assembler = ContextAssembler()
+    assemble_all(assembler, results)
+
+    stat = assembler.last_stat("wf")
+    assert stat["results_included"] == 19
+    assert stat["context_bytes"] == estimate_size({"goal": "g"}) + sum(estimate_size(r) for r in results[:19])
+
+
+def test_last_n_and_budget_policies():
+    results = [{"n": i} for i in range(10)]
+    contexts = assemble_all(ContextAssembler(ContextPolicy(last_n=3)), results)
+    assert list(contexts[-1]["previous_results"]) == results[6:9]
+
+    budget = estimate_size(results[0]) * 2
+    contexts = assemble_all(ContextAssembler(ContextPolicy(max_bytes=budget)), results)
+    assert list(contexts[-1]["previous_results"]) == results[7:9]
+
+
+def test_policy_from_env(monkeypatch):
+    monkeypatch.setenv("AGENT_SERVER_CONTEXT_POLICY", '{"last_n": 2, "max_tokens": 100}')
+    policy = ContextPolicy.from_env()
+    assert policy.last_n == 2
+    assert policy.byte_budget == 400
+
+    monkeypatch.delenv("AGENT_SERVER_CONTEXT_POLICY")
+    assert ContextPolicy.from_env().byte_budget is None
+
+
+def test_policy_from_dict_rejects_invalid_values():
+    assert ContextPolicy.from_dict({"last_n": 0, "dependencies_only": True, "max_bytes": 10}).max_bytes == 10
+    for data in ({"last_n": "x"}, {"max_bytes": -1}, {"max_tokens": 1.5}, {"last_n": True},
+                 {"dependencies_only": "yes"}, {"lastn": 3}, [1]):
+        with pytest.raises(ValueError):
+            ContextPolicy.from_dict(data)
+
+
+def test_execute_rejects_an_invalid_context_policy(tmp_path):
+    async def main():
+        services = Services(include_a2a=False, memory_path=str(tmp_path / "memory.json"))
+        app = create_app(services, include_a2a=False)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = [
+                await client.post("/execute", json={"agent_goal": "g", "task": "t", "context_policy": policy})
+                for policy in ({"last_n": "x"}, {"max_bytes": -1})
+            ]
+        await services.shutdown()
+        return responses
+
+    responses = asyncio.run(main())
+    assert [response.status_code for response in responses] == [422, 422]
+    assert "max_bytes" in responses[1].json()["detail"]
+
+
+def test_context_bytes_are_exported_per_node():
+    class EchoReasoning:
+        async def execute_task(self, task, context):
+            return {"task": task["task_description"]}
+
+    async def main():
+        workflow = Workflow()
+        workflow_id = await workflow.initialize(task_queue=[{"task_description": "a"}, {"task_description": "b"}], actions=[])
+        await workflow.execute(workflow_id, reasoning=EchoReasoning())
+        return [node["context_bytes"] for node in workflow.nodes[workflow_id]]
+
+    count, total = CONTEXT_BYTES.labels().count, CONTEXT_BYTES.labels().sum
+    context_bytes = asyncio.run(main())
+    assert CONTEXT_BYTES.labels().count == count + 2
+    assert CONTEXT_BYTES.labels().sum == total + sum(context_bytes)
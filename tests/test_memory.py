@@ -0,0 +1,112 @@
+import asyncio
+import gc
+import json
+import time
+import weakref
+
+import httpx
+
+from agent_server.main import create_app
+from agent_server.memory.memory import MEMORY_KEYS, Memory
+from agent_server.metrics.metrics import REGISTRY
+from agent_server.services import Services
+from agent_server.state.state import SQLiteStateStore
+
+
+def test_storage_is_loaded_lazily_off_the_constructor(tmp_path):
+    path = tmp_path / "memory.json"
+    path.write_text(json.dumps({"short_term": {"context": {"user": "alice"}}}))
+
+    memory = Memory(storage_path=str(path))
+    assert not memory.loaded
+
+    async def main():
+        assert await memory.get("user") == "alice"
+        assert memory.loaded
+
+    asyncio.run(main())
+
+
+def test_writes_while_saving_are_persisted(tmp_path):
+    path = tmp_path / "memory.json"
+
+    async def main():
+        memory = Memory(storage_path=str(path))
+        await memory.set("knowledge_database", {f"doc_{i}": "x" * 100 for i in range(20000)}, "long_term")
+        for i in range(500):
+            await memory.set("intermediate_outcomes", {f"task_{i}": {"n": i}}, "short_term")
+            await memory.set(f"key_{i}", i, "short_term")
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+        assert await memory.flush()
+        memory.close()
+
+    asyncio.run(main())
+
+    reloaded = Memory(storage_path=str(path), autoload=True)
+    assert len(reloaded.short_term_memory["intermediate_outcomes"]) == 500
+    assert reloaded.short_term_memory["key_499"] == 499
+    assert len(reloaded.long_term_memory["knowledge_database"]) == 20000
+
+
+def test_memory_endpoint_pages_long_term_past_executions(tmp_path):
+    async def main():
+        services = Services(include_a2a=False, memory_path=str(tmp_path / "memory.json"))
+        app = create_app(services, include_a2a=False)
+        memory = await services.get_memory()
+        now = time.time()
+        await memory.set("past_executions", [
+            {"timestamp": now + i, "workflow_id": "wf", "task": f"task {i}", "agent": "executor", "status": "completed", "duration": 0.1}
+            for i in range(5)
+        ], "long_term")
+        await memory.set("context", {"user": "alice"}, "short_term")
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.get("/memory/past_executions?limit=2")).json()
+            second = (await client.get(f"/memory/past_executions?limit=2&cursor={first['next_cursor']}")).json()
+            explicit = await client.get("/memory/past_executions?memory_type=long_term&limit=10")
+            missing = await client.get("/memory/past_executions?memory_type=short_term&limit=2")
+            invalid = await client.get("/memory/user?memory_type=medium_term")
+            user = (await client.get("/memory/user")).json()
+
+        assert [row["task"] for row in first["value"]] == ["task 0", "task 1"]
+        assert [row["task"] for row in second["value"]] == ["task 2", "task 3"]
+        assert len(explicit.json()["value"]) == 5 and explicit.json()["next_cursor"] is None
+        assert missing.status_code == 404
+        assert invalid.status_code == 400
+        assert user["value"] == "alice"
+        await services.shutdown()
+
+    asyncio.run(main())
+
+
+def test_key_gauge_reads_cached_store_counts(tmp_path):
+    async def main():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        memory = Memory(store=store)
+        await memory.set("user", "alice", "short_term")
+        await memory.set("context", {"topic": "x"}, "short_term")
+
+        def fail(*args):
+            raise AssertionError("store read at scrape time")
+        store.memory_keys = store.memory_key_count = fail
+
+        REGISTRY.render()
+        assert MEMORY_KEYS.labels("short_term").get() == 5
+        assert MEMORY_KEYS.labels("long_term").get() == 4
+
+    asyncio.run(main())
+
+
+def test_closed_memory_is_not_kept_alive(tmp_path):
+    async def main():
+        memory = Memory(storage_path=str(tmp_path / "memory.json"))
+        await memory.set("user", "alice", "short_term")
+        assert await memory.flush()
+        memory.close()
+        return weakref.ref(memory)
+
+    ref = asyncio.run(main())
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+
+from agent_server.main import create_app
+from agent_server.metrics.metrics import MetricsRegistry, timed
+from agent_server.services import Services
+
+
+def samples(text):
+    """Parse exposition text into {series: value}"""
+    parsed = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            parsed[series] = float(value)
+    return parsed
+
+
+def test_metrics_endpoint_reports_request_histograms_and_counters(tmp_path):
+    async def main():
+        services = Services(include_a2a=False, memory_path=str(tmp_path / "memory.json"))
+        app = create_app(services, include_a2a=False)
+        memory = await services.get_memory()
+        await memory.set("greeting", "hello", "short_term")
+        workflow_id = await services.workflow.initialize(task_queue=[{"task_description": "a"}], actions=[])
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            before = samples((await client.get("/metrics")).text)
+            assert (await client.get("/memory/greeting?memory_type=short_term")).status_code == 200
+            assert (await client.get(f"/status/{workflow_id}")).status_code == 200
+            scraped = await client.get("/metrics")
+        await services.shutdown()
+        return before, scraped
+
+    before, scraped = asyncio.run(main())
+    after = samples(scraped.text)
+    assert scraped.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE agent_memory_operation_seconds histogram" in scraped.text
+    assert "# TYPE agent_status_requests_total counter" in scraped.text
+
+    histogram = "agent_memory_operation_seconds"
+    labels = '{operation="get"}'
+    assert after[f"{histogram}_count{labels}"] == before.get(f"{histogram}_count{labels}", 0) + 1
+    assert after[f"{histogram}_sum{labels}"] > before.get(f"{histogram}_sum{labels}", 0)
+    buckets = [value for series, value in after.items() if series.startswith(f'{histogram}_bucket{{operation="get",le=')]
+    assert buckets == sorted(buckets)
+    assert after[f'{histogram}_bucket{{operation="get",le="+Inf"}}'] == after[f"{histogram}_count{labels}"]
+
+    counter = 'agent_status_requests_total{outcome="full"}'
+    assert after[counter] == before.get(counter, 0) + 1
+
+
+def test_timed_counts_errors_but_not_cancellations():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_seconds", "Test latency")
+    errors = registry.counter("test_errors_total", "Test errors")
+
+    @timed(latency, errors=errors.labels())
+    async def work(fail):
+        if fail:
+            raise RuntimeError("boom")
+        await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.create_task(work(False))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.gather(work(True), return_exceptions=True)
+
+    asyncio.run(main())
+    rendered = samples(registry.render())
+    assert rendered["test_seconds_count"] == 2
+    assert rendered["test_errors_total"] == 1
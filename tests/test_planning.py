@@ -0,0 +1,119 @@
+import asyncio
+
+from agent_server.planning.planning import Planning, flatten_plan, split_task
+from agent_server.workflow.workflow import Workflow
+
+
+def node(node_id, children=(), depends_on=(), parallelism=1):
+    return {
+        "id": node_id,
+        "task_description": node_id,
+        "responsible_agent": "executor" if not children else None,
+        "required_tool": None,
+        "expected_output": None,
+        "depends_on": list(depends_on),
+        "estimated_cost": 1.0,
+        "parallelism": parallelism,
+        "depth": 0,
+        "children": list(children)
+    }
+
+
+def test_split_task_only_splits_marked_lists():
+    assert split_task("Compare A; then B\nand summarize") == ["Compare A; then B\nand summarize"]
+    assert split_task("Do the following:\n- fetch A\n- fetch B\n  with retries\n1. report") == [
+        "fetch A", "fetch B with retries", "report"
+    ]
+    assert split_task("- only one item") == ["- only one item"]
+
+
+def test_flatten_plan_dependency_indices_and_parallelism():
+    fan_out = node("fan", [node("fan.0"), node("fan.1"), node("fan.2")], depends_on=["first"], parallelism=3)
+    plan = node("plan", [node("first"), fan_out, node("last", depends_on=["fan"])])
+    queue = flatten_plan(plan)
+
+    assert [task["id"] for task in queue] == ["first", "fan.0", "fan.1", "fan.2", "last"]
+    assert [task["depends_on"] for task in queue] == [[], [0], [0], [0], [1, 2, 3]]
+    assert [task["parallelism"] for task in queue] == [1, 3, 3, 3, 1]
+    assert [task["parallel_group"] for task in queue] == [None, "fan", "fan", "fan", None]
+
+
+def test_generate_plan_expands_explicit_subtasks_only():
+    planning = Planning()
+
+    async def main():
+        free_text = await planning.generate_plan({"task": "Research X; compare with Y", "agent_goal": "g"})
+        listed = await planning.generate_plan({"task": "Research", "subtasks": ["X", "Y", "Z"], "agent_goal": "g"})
+        return free_text, listed
+
+    free_text, listed = asyncio.run(main())
+    assert len(free_text["sub_task_queue"]) == 3 and free_text["parallelism"] == 1
+    assert len(listed["sub_task_queue"]) == 5 and listed["parallelism"] == 3
+    assert [task["depends_on"] for task in listed["sub_task_queue"]] == [[], [0], [0], [0], [1, 2, 3]]
+
+
+class RecordingReasoning:
+    def __init__(self, delays):
+        self.delays = delays
+        self.started = []
+        self.finished = []
+        self.seen = {}
+
+    async def execute_task(self, task, context):
+        name = task["task_description"]
+        self.started.append(name)
+        self.seen[name] = sorted(result["task"] for result in context["previous_results"])
+        await asyncio.sleep(self.delays.get(name, 0))
+        self.finished.append(name)
+        return {"task": name}
+
+
+def test_workflow_runs_the_dag_and_scopes_context_to_ancestors():
+    task_queue = [
+        {"task_description": "a", "depends_on": [], "parallelism": 2},
+        {"task_description": "b", "depends_on": [0], "parallelism": 2},
+        {"task_description": "c", "depends_on": [0], "parallelism": 2},
+        {"task_description": "d", "depends_on": [2], "parallelism": 2},
+        {"task_description": "e", "depends_on": [1, 3], "parallelism": 1}
+    ]
+    reasoning = RecordingReasoning({"b": 0.05})
+
+    async def main():
+        workflow = Workflow()
+        workflow_id = await workflow.initialize(task_queue=task_queue, actions=[])
+        return await workflow.execute(workflow_id, reasoning=reasoning)
+
+    result = asyncio.run(main())
+    assert result["status"] == "completed"
+    # c and d run while b is still in flight; e waits for both branches
+    assert reasoning.finished == ["a", "c", "d", "b", "e"]
+    # d finishes before b, but only sees its own ancestors
+    assert reasoning.seen == {"a": [], "b": ["a"], "c": ["a"], "d": ["a", "c"], "e": ["a", "b", "c", "d"]}
+
+
+def test_parallelism_hints_apply_per_group():
+    class ConcurrencyReasoning:
+        def __init__(self):
+            self.running = {}
+            self.peak = {}
+
+        async def execute_task(self, task, context):
+            group = task.get("parallel_group")
+            self.running[group] = self.running.get(group, 0) + 1
+            self.peak[group] = max(self.peak.get(group, 0), self.running[group])
+            await asyncio.sleep(0.01)
+            self.running[group] -= 1
+            return {"task": task["task_description"]}
+
+    # A wide fan-out next to independent tasks that should still run alone
+    task_queue = [{"task_description": f"w{i}", "depends_on": [], "parallelism": 4, "parallel_group": "wide"} for i in range(4)]
+    task_queue += [{"task_description": f"s{i}", "depends_on": [], "parallelism": 1} for i in range(3)]
+    reasoning = ConcurrencyReasoning()
+
+    async def main():
+        workflow = Workflow()
+        workflow_id = await workflow.initialize(task_queue=task_queue, actions=[])
+        return await workflow.execute(workflow_id, reasoning=reasoning)
+
+    assert asyncio.run(main())["status"] == "completed"
+    assert reasoning.peak == {"wide": 4, None: 1}
@@ -0,0 +1,61 @@
+import asyncio
+
+from agent_server.admission.admission import AdmissionController, TenantPolicy
+from agent_server.reasoning.research_cache import ResearchCache, normalize_query
+
+
+def make_research(user_id, calls):
+    async def research():
+        calls.append(user_id)
+        return f"session-{user_id}-{len(calls)}", {"summary": f"for {user_id}"}
+    return research
+
+
+def test_results_are_not_shared_between_users():
+    async def main():
+        cache = ResearchCache()
+        calls = []
+        alice, alice_outcome = await cache.get_or_research(normalize_query(" Rust  Async ", scope="alice"), make_research("alice", calls))
+        bob, bob_outcome = await cache.get_or_research(normalize_query("rust async", scope="bob"), make_research("bob", calls))
+        again, again_outcome = await cache.get_or_research(normalize_query("RUST async", scope="alice"), make_research("alice", calls))
+
+        assert (alice_outcome, bob_outcome, again_outcome) == ("miss", "miss", "hit")
+        assert calls == ["alice", "bob"]
+        assert bob.session_id.startswith("session-bob") and bob.result == {"summary": "for bob"}
+        assert again.session_id == alice.session_id
+
+    asyncio.run(main())
+
+
+def test_stale_refresh_runs_inside_the_admission_guard():
+    async def main():
+        admission = AdmissionController(default_policy=TenantPolicy(max_concurrent=1))
+        cache = ResearchCache(ttls={"moderate": 0.01}, stale_for=60)
+        key = normalize_query("query", scope="alice")
+        calls = []
+        seen_in_flight = []
+
+        async def research():
+            seen_in_flight.append(admission.in_flight.get("alice", 0))
+            return await make_research("alice", calls)()
+
+        def guard():
+            return admission.admitted("alice")
+
+        await cache.get_or_research(key, research, refresh_guard=guard)
+        await asyncio.sleep(0.02)
+
+        # A refresh the user's quota does not allow is skipped; the stale entry stays
+        admission.admit("alice")
+        entry, outcome = await cache.get_or_research(key, research, refresh_guard=guard)
+        await asyncio.sleep(0)
+        assert outcome == "stale" and len(calls) == 1
+        admission.release("alice")
+
+        entry, outcome = await cache.get_or_research(key, research, refresh_guard=guard)
+        await asyncio.sleep(0)
+        assert outcome == "stale" and len(calls) == 2
+        assert seen_in_flight == [0, 1]
+        assert admission.in_flight == {}
+
+    asyncio.run(main())
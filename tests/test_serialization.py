@@ -0,0 +1,26 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from agent_server.serialization.serialization import JSONSerializer, ORJSONSerializer
+
+pytest.importorskip("orjson")
+
+VALUES = [
+    {"at": datetime(2024, 1, 2, 3, 4, 5, 6), "utc": datetime(2024, 1, 2, tzinfo=timezone.utc), "day": date(2024, 1, 2)},
+    {1: "int", 2.5: "float", None: "none", False: "bool", date(2024, 1, 1): "date"},
+    {"nan": float("nan"), "inf": [float("inf"), float("-inf")], "nested": {"x": (1.5, float("nan"))}},
+    {"plain": ["ü", 1, None, True, {"a": []}]}
+]
+
+
+def test_json_fallback_matches_orjson():
+    for pretty in (False, True):
+        fallback, fast = JSONSerializer(pretty=pretty), ORJSONSerializer(pretty=pretty)
+        for value in VALUES:
+            assert fallback.dumps(value) == fast.dumps(value)
+
+
+def test_json_fallback_round_trips():
+    serializer = JSONSerializer()
+    assert serializer.loads(serializer.dumps({1: float("nan"), "at": date(2024, 1, 2)})) == {"1": None, "at": "2024-01-02"}
@@ -0,0 +1,35 @@
+import asyncio
+
+import httpx
+
+from agent_server.main import create_app
+from agent_server.services import Services
+
+
+def test_services_are_built_lazily_and_shut_down(tmp_path):
+    async def main():
+        services = Services(include_a2a=False, memory_path=str(tmp_path / "memory.json"))
+        app = create_app(services, include_a2a=False)
+        assert services._memory is None and services._workflow is None and services._reasoning is None
+
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                early = (await client.get("/health")).json()
+                # Health is answered without constructing anything
+                assert services._workflow is None and services._reasoning is None
+                await services.wait_ready()
+                ready = (await client.get("/health")).json()
+            memory = services._memory
+            await memory.set("user", "alice", "short_term")
+
+        assert early["services"]["workflow"] == "idle" and early["mode"] == "single_process"
+        assert early["services"]["a2a_research"] == "disabled"
+        assert ready["status"] == "ok" and ready["services"]["memory"] == "active"
+        assert "memory" in ready["warmup_seconds"]
+        # Shutdown stopped the warm-up and the memory writer after saving
+        assert services._warmup_task.done()
+        assert memory._writer is None
+        assert (tmp_path / "memory.json").exists()
+
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from agent_server.simulation.simulation import LatencyProfile, run_simulated
+from agent_server.workflow.workflow import Workflow
+
+PROFILE = {
+    "tasks": {"default": {"distribution": "lognormal", "median": 0.8, "sigma": 0.6, "failure_rate": 0.1}},
+    "triggers": {"default": {"distribution": "uniform", "low": 0.1, "high": 0.3}}
+}
+
+
+async def run_workflow(seed):
+    workflow = Workflow(latency=LatencyProfile.from_dict({**PROFILE, "seed": seed}))
+    task_queue = [{"task_description": f"task {i}", "depends_on": [], "parallelism": 3} for i in range(12)]
+    workflow_id = await workflow.initialize(task_queue=task_queue, actions=[])
+    result = await workflow.execute(workflow_id)
+    nodes = [(node["status"], node.get("duration")) for node in workflow.nodes[workflow_id]]
+    return result["status"], nodes, asyncio.get_running_loop().time()
+
+
+def test_profiles_with_one_seed_sample_the_same_delays():
+    first = LatencyProfile.from_dict({**PROFILE, "seed": 3})
+    second = LatencyProfile.from_dict({**PROFILE, "seed": 3})
+    model = first.task_model({})
+    samples = [(model.sample(first.rng), model.fails(first.rng)) for _ in range(50)]
+    assert samples == [(model.sample(second.rng), model.fails(second.rng)) for _ in range(50)]
+
+
+def test_same_seed_replays_the_same_workflow():
+    first = run_simulated(run_workflow(seed=7))
+    second = run_simulated(run_workflow(seed=7))
+    other = run_simulated(run_workflow(seed=8))
+
+    assert first == second
+    assert first[1] != other[1]
+    assert any(duration for _, duration in first[1])
+
+
+def test_virtual_time_advances_without_sleeping():
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(asyncio.sleep(3600), asyncio.sleep(60))
+        return loop.time() - start
+
+    started = time.perf_counter()
+    elapsed = run_simulated(main(), start=1000.0)
+    assert elapsed >= 3600
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+from agent_server.simulation.simulation import ConstantLatency, LatencyProfile
+from agent_server.state.state import LeaseLost, SQLiteStateStore
+from agent_server.workflow.workflow import Workflow
+
+
+def workflow_data(status="initialized"):
+    return {"id": "wf", "status": status, "task_queue": []}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteStateStore(str(tmp_path / "state.db"), lease_seconds=0.2)
+
+
+def test_expired_lease_is_reclaimed_and_not_renewed(store):
+    store.save_workflow("wf", workflow_data(), [])
+    assert store.claim_workflow("worker-a") == "wf"
+    assert store.claim_workflow("worker-b") is None
+    assert store.renew_lease("wf", "worker-a")
+
+    time.sleep(0.25)
+    assert not store.renew_lease("wf", "worker-a")
+    assert store.claim_workflow("worker-b") == "wf"
+    assert not store.renew_lease("wf", "worker-a")
+    assert store.renew_lease("wf", "worker-b")
+
+
+def test_stale_writer_is_rejected(store):
+    store.save_workflow("wf", workflow_data(), [])
+    store.claim_workflow("worker-a")
+    store.save_workflow("wf", workflow_data("running"), [], "worker-a")
+
+    time.sleep(0.25)
+    store.claim_workflow("worker-b")
+    version = store.save_workflow("wf", workflow_data("running"), [{"owner": "b"}], "worker-b")
+
+    with pytest.raises(LeaseLost):
+        store.save_workflow("wf", workflow_data("completed"), [{"owner": "a"}], "worker-a")
+    with pytest.raises(LeaseLost):
+        store.save_workflow("wf", workflow_data("completed"), [])
+
+    data, nodes, stored_version = store.load_workflow("wf")
+    assert (data["status"], nodes, stored_version) == ("running", [{"owner": "b"}], version)
+
+
+def test_lost_lease_cancels_the_execution(store):
+    async def main():
+        profile = LatencyProfile(default_task=ConstantLatency(5.0))
+        workflow = Workflow(store=store, worker_id="worker-a", latency=profile)
+        workflow_id = await workflow.initialize(
+            task_queue=[{"task_description": "slow"}, {"task_description": "never started"}], actions=[]
+        )
+        execution = asyncio.create_task(workflow.execute_with_lease(workflow_id))
+        await asyncio.sleep(0.1)
+
+        # Another worker takes the workflow over (as after an expired lease)
+        store._connect().execute("UPDATE workflows SET lease_owner = 'worker-b' WHERE id = ?", (workflow_id,))
+        version = store.workflow_version(workflow_id)
+
+        started = time.monotonic()
+        with pytest.raises(LeaseLost):
+            await execution
+        assert time.monotonic() - started < 1.0
+        assert store.workflow_version(workflow_id) == version
+        assert workflow_id not in workflow.owned
+        assert workflow_id not in workflow.active_workflows
+
+    asyncio.run(main())
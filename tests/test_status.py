@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+
+from agent_server.main import create_app
+from agent_server.services import Services
+from agent_server.simulation.simulation import ConstantLatency, LatencyProfile
+from agent_server.state.state import SQLiteStateStore
+from agent_server.workflow.workflow import Workflow
+
+
+def zero_latency():
+    return LatencyProfile(default_task=ConstantLatency(0), default_trigger=ConstantLatency(0))
+
+
+def test_status_etag_and_long_poll(tmp_path):
+    async def main():
+        services = Services(include_a2a=False, memory_path=str(tmp_path / "memory.json"))
+        services.latency = zero_latency()
+        app = create_app(services, include_a2a=False)
+        workflow = services.workflow
+        workflow_id = await workflow.initialize(task_queue=[{"task_description": "a"}], actions=[])
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get(f"/status/{workflow_id}")
+            etag = first.headers["etag"]
+            version = first.json()["version"]
+            not_modified = await client.get(f"/status/{workflow_id}", headers={"If-None-Match": etag})
+
+            # Times out on an unchanged workflow and reports the same version
+            timed_out = await client.get(f"/status/{workflow_id}?wait=0.05&since={version}")
+
+            # Wakes as soon as the workflow moves on
+            poll = asyncio.create_task(client.get(f"/status/{workflow_id}?wait=5&since={version}"))
+            await asyncio.sleep(0.05)
+            assert not poll.done()
+            await workflow.execute(workflow_id)
+            woken = await asyncio.wait_for(poll, 1)
+
+        assert first.status_code == 200 and etag == f'"{version}"'
+        assert not_modified.status_code == 304 and not_modified.headers["etag"] == etag
+        assert timed_out.status_code == 200 and timed_out.json()["version"] == version
+        assert woken.status_code == 200 and woken.json()["version"] > version
+        # No event is left behind once the waiters are gone
+        assert workflow._changed == {} and workflow._waiting == {}
+        await services.shutdown()
+
+    asyncio.run(main())
+
+
+def test_waiting_on_a_foreign_workflow_keeps_no_event(tmp_path):
+    async def main():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        owner = Workflow(store=store, latency=zero_latency())
+        other = Workflow(store=store, latency=zero_latency())
+        workflow_id = await owner.initialize(task_queue=[{"task_description": "a"}], actions=[])
+        version = await other.get_version(workflow_id)
+
+        assert await other.wait_for_change(workflow_id, version, timeout=0.05, poll_interval=0.01) == version
+        assert await other.wait_for_change("missing", 0, timeout=0.05) is None
+        assert other._changed == {} and other._waiting == {}
+
+    asyncio.run(main())
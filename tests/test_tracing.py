@@ -0,0 +1,38 @@
+import json
+import threading
+
+from agent_server.tracing.tracing import TRACE_EXPORTS_DROPPED, Tracer
+
+
+def test_export_uses_one_thread_and_drops_on_overflow(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(export_path=str(path), export_queue_size=4)
+    dropped = TRACE_EXPORTS_DROPPED.labels().value
+    threads = threading.active_count()
+
+    for i in range(100):
+        with tracer.span("root", trace_id=f"trace-{i}"):
+            with tracer.span("child"):
+                pass
+    tracer.flush()
+
+    lines = path.read_text().splitlines()
+    assert threading.active_count() - threads <= 1
+    assert len(lines) + TRACE_EXPORTS_DROPPED.labels().value - dropped == 100
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["root", "child"]
+
+
+def test_trace_index_is_evicted_with_the_ring_buffer():
+    tracer = Tracer(max_spans=3)
+    for i in range(3):
+        with tracer.span("root", trace_id=f"trace-{i}"):
+            with tracer.span("child"):
+                pass
+
+    # Children finish first: trace-0 was evicted entirely and trace-1 lost its child
+    assert set(tracer.traces) == {"trace-1", "trace-2"}
+    assert [span.name for span in tracer.get_spans("trace-1")] == ["root"]
+    assert [span.name for span in tracer.get_spans("trace-2")] == ["root", "child"]
+    assert tracer.get_spans("trace-0") == []
+    assert sum(len(spans) for spans in tracer.traces.values()) == len(tracer.buffer) == 3
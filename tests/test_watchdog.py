@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from agent_server.main import create_app
+from agent_server.services import Services
+from agent_server.simulation.simulation import ConstantLatency, LatencyProfile
+from agent_server.watchdog.watchdog import BlockingCallError, assert_no_blocking
+
+
+def test_assert_no_blocking_reports_a_blocking_call():
+    async def main():
+        async with assert_no_blocking(max_ms=50):
+            time.sleep(0.2)
+
+    with pytest.raises(BlockingCallError) as excinfo:
+        asyncio.run(main())
+    assert "main" in str(excinfo.value)
+
+
+def test_status_and_memory_do_not_block_the_loop(tmp_path):
+    async def main():
+        services = Services(include_a2a=False, memory_path=str(tmp_path / "memory.json"))
+        services.latency = LatencyProfile(default_task=ConstantLatency(0), default_trigger=ConstantLatency(0))
+        app = create_app(services, include_a2a=False)
+
+        memory = await services.get_memory()
+        await memory.set("context", {f"doc_{i}": {"text": "x" * 200} for i in range(5000)}, "short_term")
+        await memory.flush()
+
+        workflow = services.workflow
+        task_queue = [{"task_description": f"task {i}"} for i in range(500)]
+        workflow_id = await workflow.initialize(task_queue=task_queue, actions=[])
+        await workflow.execute(workflow_id)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async with assert_no_blocking(max_ms=100):
+                status = await client.get(f"/status/{workflow_id}?limit=50")
+                page = await client.get(f"/status/{workflow_id}?fields=status,total_tasks")
+                doc = await client.get("/memory/doc_42?fields=text")
+
+        assert status.status_code == 200 and len(status.json()["result"]) == 50
+        assert page.json() == {"status": "completed", "total_tasks": 500}
+        assert doc.status_code == 200
+        await services.shutdown()
+
+    asyncio.run(main())
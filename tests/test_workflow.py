@@ -0,0 +1,63 @@
+import asyncio
+
+from agent_server.action.action import Action
+from agent_server.simulation.simulation import ConstantLatency, LatencyProfile
+from agent_server.state.state import SQLiteStateStore
+from agent_server.workflow.workflow import Workflow
+
+
+def zero_latency():
+    return LatencyProfile(default_task=ConstantLatency(0), default_trigger=ConstantLatency(0))
+
+
+def test_triggered_actions_reach_the_final_write(tmp_path):
+    async def main():
+        calls = []
+
+        async def notify(task, parameters):
+            calls.append((task, parameters["event"]["type"]))
+            return {"status": "success", "message": "notified"}
+
+        action = Action(latency=zero_latency())
+        action.register_action("task_complete", notify)
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        workflow = Workflow(store=store, action=action, latency=zero_latency())
+        actions = [
+            {"action_trigger": "task_complete", "actual_task": "summarize"},
+            {"action_trigger": "node_completed", "actual_task": "log", "node_index": 0},
+            {"action_trigger": "workflow_failed", "actual_task": "alert"}
+        ]
+        workflow_id = await workflow.initialize(task_queue=[{"task_description": "a"}, {"task_description": "b"}], actions=actions)
+        await workflow.execute(workflow_id)
+        version = workflow.versions[workflow_id]
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        assert calls == [("summarize", "workflow_completed")]
+        # Triggers without a registered handler go to Action.execute's default handling
+        assert [record["trigger"] for record in action.get_history()] == ["node_completed", "task_complete"]
+
+        saved, _, saved_version = store.load_workflow(workflow_id)
+        responses = [entry.get("action_response") for entry in saved["actions"]]
+        assert responses[0] == {"status": "success", "message": "notified"}
+        assert responses[1]["message"] == "Executed action: log"
+        assert responses[2] is None
+        # The final write carries the responses; nothing is written after it
+        assert saved["status"] == "completed"
+        assert workflow.versions[workflow_id] == saved_version == version
+
+    asyncio.run(main())
+
+
+def test_actions_record_a_success_response_without_an_action_module():
+    async def main():
+        workflow = Workflow(latency=zero_latency())
+        actions = [{"action_trigger": "task_complete", "actual_task": "summarize"}]
+        workflow_id = await workflow.initialize(task_queue=[{"task_description": "a"}], actions=actions)
+        await workflow.execute(workflow_id)
+        assert workflow.active_workflows[workflow_id]["actions"][0]["action_response"] == {
+            "status": "success", "message": "Action executed"
+        }
+        assert workflow.dispatches == {}
+
+    asyncio.run(main())